@@ -4,6 +4,7 @@ import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from sessao_etl import atualizar_dimensao, carregar_dimensoes, chave_dimensao
 
 load_dotenv()
 
@@ -54,45 +55,49 @@ def extrair_categorias_dos_datasets() -> list[str]:
     return categorias
 
 
-def carregar_categorias_profissionais(conn, categorias: list[str]) -> None:
+def carregar_categorias_profissionais(conn, categorias: list[str], dimensoes: dict) -> None:
     if not categorias:
         print("Nenhuma categoria encontrada.")
         return
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    cur = conn.cursor()
 
-    cur.execute("SELECT nome FROM categoria_profissional;")
-    existentes = {row["nome"].strip().lower() for row in cur.fetchall()}
+    existentes = dimensoes["categoria"]
 
     novas = []
     for cat in categorias:
-        chave = cat.lower()
-        if chave not in existentes:
+        if chave_dimensao("categoria", cat) not in existentes:
             novas.append((cat,))
 
     if not novas:
         print("Nenhuma nova categoria para inserir.")
     else:
-        psycopg2.extras.execute_values(
+        inseridas = psycopg2.extras.execute_values(
             cur,
-            "INSERT INTO categoria_profissional (nome) VALUES %s;",
-            novas
+            "INSERT INTO categoria_profissional (nome) VALUES %s ON CONFLICT (nome) DO NOTHING RETURNING nome, id_categoria;",
+            novas,
+            fetch=True,
         )
         conn.commit()
+        atualizar_dimensao(dimensoes, "categoria", inseridas)
         print(f"Foram inseridas {len(novas)} novas categorias profissionais.")
 
     cur.close()
 
 
-def main():
+def executar(conn, dimensoes: dict):
     print("Extraindo categorias profissionais...")
     categorias = extrair_categorias_dos_datasets()
 
+    print("\nInserindo categorias na tabela categoria_profissional...")
+    carregar_categorias_profissionais(conn, categorias, dimensoes)
+    print("\nETL de categorias profissionais concluído.")
+
+
+def main():
     conn = get_conn()
     try:
-        print("\nInserindo categorias na tabela categoria_profissional...")
-        carregar_categorias_profissionais(conn, categorias)
-        print("\nETL de categorias profissionais concluído.")
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -1,9 +1,15 @@
 import os
+import time
 import psycopg2
 import psycopg2.extras
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, remover_duplicadas, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estado
+from entidades import canonicos
+from sessao_etl import avisar_nao_encontrados, carregar_dimensoes, resolver_ids
 
 load_dotenv()
 
@@ -11,6 +17,8 @@ DATASET_EQUIP_RA = "dirty_data_distribuição_geo_equipamentos.csv"
 
 ANO_PADRAO = 2025
 
+ETAPA = "EQUIPAMENTOS_REGISTRADOS"
+
 MAPEAMENTO_COLUNAS_EQUIP = {
     "qtd_gama_camara": "Gama Câmara",
     "qtd_mamografo_comando_simples": "Mamógrafo com Comando Simples",
@@ -33,109 +41,86 @@ MAPEAMENTO_COLUNAS_EQUIP = {
 }
 
 
-def limpar_nome_ra(nome: str) -> str:
-    if not isinstance(nome, str):
-        return None
-    n = nome.strip()
-    if not n:
-        return None
-    return n.title()
-
+def limpar_nomes_ra(nomes: pd.Series) -> pd.Series:
+    # nome canônico (entidades.py); RAs fora do índice ficam em title case
+    n = nomes.astype(str).str.strip()
+    n = n.where(n != "").str.title()
+    return canonicos("ra", n).fillna(n)
 
-def tratar_dataset_equipamento_por_ra() -> pd.DataFrame:
-    if not os.path.exists(DATASET_EQUIP_RA):
-        raise FileNotFoundError(f"Arquivo nao encontrado: {DATASET_EQUIP_RA}")
 
-    df = pd.read_csv(DATASET_EQUIP_RA)
+def equipamentos_largo_para_longo(
+    df: pd.DataFrame,
+    mapeamento: dict = MAPEAMENTO_COLUNAS_EQUIP,
+    ano: int = ANO_PADRAO,
+    coluna_ra: str = "ra",
+) -> pd.DataFrame:
+    # Exportação larga do CNES (uma linha por RA, uma coluna por tipo de
+    # equipamento) -> uma linha por (RA, tipo) com quantidade > 0.
+    # Tudo vetorizado: custo linear em linhas x colunas do arquivo.
+    if coluna_ra not in df.columns:
+        raise ValueError(f"Coluna '{coluna_ra}' nao encontrada. Colunas: {df.columns}")
 
-    if "ra" not in df.columns:
-        raise ValueError(f"Coluna 'ra' nao encontrada. Colunas: {df.columns}")
-
-    for col in MAPEAMENTO_COLUNAS_EQUIP.keys():
+    for col in mapeamento.keys():
         if col not in df.columns:
             raise ValueError(f"Coluna '{col}' do mapeamento nao existe no CSV. Colunas: {df.columns}")
 
-    df["nome_ra"] = df["ra"].astype(str).apply(limpar_nome_ra)
-
-    registros = []
-
-    for _, row in df.iterrows():
-        nome_ra = row["nome_ra"]
-        if not nome_ra:
-            continue
-
-        for col_csv, nome_tipo in MAPEAMENTO_COLUNAS_EQUIP.items():
-            valor = row[col_csv]
-
-            try:
-                qtd = int(valor)
-            except (ValueError, TypeError):
-                continue
+    colunas = list(mapeamento)
+    # int(valor) do código antigo: trunca e descarta o que não é número
+    numericas = df[colunas]
+    if not all(pd.api.types.is_numeric_dtype(t) for t in numericas.dtypes):
+        numericas = numericas.apply(pd.to_numeric, errors="coerce")
+    quantidades = np.trunc(numericas.to_numpy(dtype="float64", na_value=np.nan))
 
-            if qtd <= 0:
-                continue
+    nomes_ra = limpar_nomes_ra(df[coluna_ra])
 
-            registros.append(
-                {
-                    "nome_ra": nome_ra,
-                    "nome_equipamento": nome_tipo,
-                    "quantidade": qtd,
-                    "ano": ANO_PADRAO,
-                }
-            )
+    # np.nonzero percorre a matriz linha a linha: mesma ordem do laço antigo
+    # (linha do CSV, depois ordem do mapeamento)
+    linhas, cols = np.nonzero((quantidades > 0) & nomes_ra.notna().to_numpy()[:, None])
+    tipos = np.array([mapeamento[c] for c in colunas], dtype=object)
 
-    df_out = pd.DataFrame(registros)
-    return df_out
+    return pd.DataFrame({
+        "nome_ra": nomes_ra.to_numpy()[linhas],
+        "nome_equipamento": tipos[cols],
+        "quantidade": quantidades[linhas, cols].astype("int64"),
+        "ano": ano,
+    })
 
 
-def mapear_ids(conn, df: pd.DataFrame) -> pd.DataFrame:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-    cur.execute("SELECT id_ra, nome FROM regiao_administrativa;")
-    mapa_ra = {str(r["nome"]).strip().lower(): r["id_ra"] for r in cur.fetchall()}
+def tratar_dataset_equipamento_por_ra(caminho: str = DATASET_EQUIP_RA) -> pd.DataFrame:
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo nao encontrado: {caminho}")
 
-    cur.execute("SELECT id_tipo_equipamento, nome FROM tipo_equipamento;")
-    mapa_tipo = {str(r["nome"]).strip().lower(): r["id_tipo_equipamento"] for r in cur.fetchall()}
-
-    cur.close()
+    df = pd.read_csv(caminho)
+    return equipamentos_largo_para_longo(df)
 
-    def get_id_ra(nome):
-        if not isinstance(nome, str):
-            return None
-        return mapa_ra.get(nome.strip().lower())
 
-    def get_id_tipo(nome):
-        if not isinstance(nome, str):
-            return None
-        return mapa_tipo.get(nome.strip().lower())
-
-    df["id_ra"] = df["nome_ra"].apply(get_id_ra)
-    df["id_tipo_equipamento"] = df["nome_equipamento"].apply(get_id_tipo)
-
-    ras_erradas = df[df["id_ra"].isna()]["nome_ra"].unique()
-    if len(ras_erradas) > 0:
-        print("RAs nao encontradas em regiao_administrativa:")
-        for n in ras_erradas:
-            print("  ", n)
+def mapear_ids(df: pd.DataFrame, dimensoes: dict) -> pd.DataFrame:
+    df_ok, nao_encontrados = resolver_ids(
+        df,
+        dimensoes,
+        {"nome_ra": ("ra", "id_ra"), "nome_equipamento": ("tipo_equipamento", "id_tipo_equipamento")},
+    )
+    avisar_nao_encontrados(nao_encontrados)
 
-    tipos_errados = df[df["id_tipo_equipamento"].isna()]["nome_equipamento"].unique()
-    if len(tipos_errados) > 0:
-        print("Tipos de equipamento nao encontrados em tipo_equipamento:")
-        for n in tipos_errados:
-            print("  ", n)
+    return df_ok.astype({"quantidade": int, "ano": int})
 
-    df_ok = df.dropna(subset=["id_ra", "id_tipo_equipamento"]).copy()
-    df_ok["id_ra"] = df_ok["id_ra"].astype(int)
-    df_ok["id_tipo_equipamento"] = df_ok["id_tipo_equipamento"].astype(int)
-    df_ok["quantidade"] = df_ok["quantidade"].astype(int)
-    df_ok["ano"] = df_ok["ano"].astype(int)
 
-    return df_ok
+COLUNAS_EQUIPAMENTO_REGISTRADO = ["id_tipo_equipamento", "id_ra", "ano", "quantidade"]
+CHAVE_EQUIPAMENTO_REGISTRADO = ["id_tipo_equipamento", "id_ra", "ano"]
 
 
 def carregar_equipamento_registrado(conn, df: pd.DataFrame) -> None:
+    if usar_copy():
+        n = carregar_via_copy(
+            conn, "equipamento_registrado", COLUNAS_EQUIPAMENTO_REGISTRADO, df, CHAVE_EQUIPAMENTO_REGISTRADO
+        )
+        print(f"Foram carregados {n} registros em equipamento_registrado.")
+        return
+
+    inicio = time.perf_counter()
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
+    df = remover_duplicadas(df, CHAVE_EQUIPAMENTO_REGISTRADO, "equipamento_registrado")
     linhas = [
         (
             int(row["id_tipo_equipamento"]),
@@ -156,30 +141,41 @@ def carregar_equipamento_registrado(conn, df: pd.DataFrame) -> None:
         INSERT INTO equipamento_registrado
         (id_tipo_equipamento, id_ra, ano, quantidade)
         VALUES %s
-        """,
+        """ + clausula_upsert("equipamento_registrado", CHAVE_EQUIPAMENTO_REGISTRADO, COLUNAS_EQUIPAMENTO_REGISTRADO),
         linhas,
     )
     conn.commit()
     cur.close()
 
-    print(f"Foram inseridos {len(linhas)} registros em equipamento_registrado.")
+    relatar_carga("equipamento_registrado", len(linhas), inicio)
+    print(f"Foram carregados {len(linhas)} registros em equipamento_registrado.")
 
 
-def main():
+def executar(conn, dimensoes: dict):
+    sha = hash_arquivo(DATASET_EQUIP_RA)
+    if arquivo_inalterado(carregar_estado(conn, ETAPA), DATASET_EQUIP_RA, sha):
+        print("Dataset de equipamentos por RA sem alteração desde a última carga; nada a fazer.")
+        return
+
     print("Lendo e tratando dataset de equipamentos por RA...")
     df = tratar_dataset_equipamento_por_ra()
     print(f"Total de linhas apos tratamento: {len(df)}")
 
-    conn = get_conn()
-    try:
-        print("Mapeando ids de RA e tipo de equipamento...")
-        df_map = mapear_ids(conn, df)
-        print(f"Total de linhas apos mapeamento: {len(df_map)}")
+    print("Mapeando ids de RA e tipo de equipamento...")
+    df_map = mapear_ids(df, dimensoes)
+    print(f"Total de linhas apos mapeamento: {len(df_map)}")
+
+    print("Inserindo registros em equipamento_registrado...")
+    carregar_equipamento_registrado(conn, df_map)
+    registrar_estado(conn, ETAPA, DATASET_EQUIP_RA, sha, ANO_PADRAO, len(df_map))
+
+    print("ETL de equipamento_registrado concluido.")
 
-        print("Inserindo registros em equipamento_registrado...")
-        carregar_equipamento_registrado(conn, df_map)
 
-        print("ETL de equipamento_registrado concluido.")
+def main():
+    conn = get_conn()
+    try:
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -1,10 +1,15 @@
 import os
+import time
 import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import psycopg2
 import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, remover_duplicadas, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estados, ultimo_periodo
+from sessao_etl import carregar_dimensoes, obter_id
 
 load_dotenv()
 
@@ -12,6 +17,23 @@ BASE_DIR = "dirty_data_estados_espera_mamografia"
 
 NOME_EXAME = "Diagnostico Por Mamografia"
 
+ETAPA = "ESPERA"
+
+# processos usados na leitura dos arquivos por UF (1 = sem pool). Os CSVs de
+# hoje são pequenos e a leitura sequencial é mais rápida que subir o pool;
+# ETL_PROCESSOS > 1 só compensa com arquivos bem maiores
+PROCESSOS = int(os.getenv("ETL_PROCESSOS", "1"))
+
+COLUNAS_QTD_ESPERA = {
+    "qtd_0_10": "qtd_tempo_espera_0_10",
+    "qtd_11_20": "qtd_tempo_espera_11_20",
+    "qtd_21_30": "qtd_tempo_espera_21_30",
+    "qtd_30_mais": "qtd_tempo_espera_30_mais",
+}
+
+CHAVE_ESPERA = ["id_uf", "id_tipo_exame", "ano"]
+COLUNAS_ESPERA = CHAVE_ESPERA + list(COLUNAS_QTD_ESPERA.values())
+
 
 def extrair_sigla_uf_do_arquivo(caminho_arquivo: str) -> str:
     nome = os.path.basename(caminho_arquivo).lower()
@@ -73,46 +95,56 @@ def extrair_espera_de_arquivo(caminho_csv: str) -> pd.DataFrame:
     return df_pad
 
 
-def obter_id_uf_por_sigla(conn, sigla: str) -> int:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute(
-        "SELECT id_uf FROM unidade_da_federacao WHERE sigla = %s;",
-        (sigla,),
-    )
-    row = cur.fetchone()
-    cur.close()
+def processar_arquivo(arquivo: str) -> tuple:
+    # roda nos processos do pool: só leitura e validação, sem acesso ao banco
+    sigla = extrair_sigla_uf_do_arquivo(arquivo)
+    return sigla, extrair_espera_de_arquivo(arquivo)
 
-    if not row:
-        raise ValueError(f"Nao foi encontrado registro de UF com sigla '{sigla}'.")
-    return row["id_uf"]
 
+def extrair_arquivos(arquivos: list) -> tuple:
+    # devolve ({arquivo: (sigla, df)}, {arquivo: erro}); a ordem de conclusão não importa
+    resultados = {}
+    erros = {}
 
-def obter_id_tipo_exame(conn, nome_exame: str) -> int:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute(
-        "SELECT id_tipo_exame FROM tipo_exame WHERE lower(nome) = lower(%s);",
-        (nome_exame,),
-    )
-    row = cur.fetchone()
-    cur.close()
+    if PROCESSOS <= 1 or len(arquivos) <= 1:
+        for arquivo in arquivos:
+            try:
+                resultados[arquivo] = processar_arquivo(arquivo)
+            except Exception as e:
+                erros[arquivo] = e
+        return resultados, erros
+
+    with ProcessPoolExecutor(max_workers=min(PROCESSOS, len(arquivos))) as pool:
+        futuros = {pool.submit(processar_arquivo, arquivo): arquivo for arquivo in arquivos}
+        for futuro in as_completed(futuros):
+            arquivo = futuros[futuro]
+            try:
+                resultados[arquivo] = futuro.result()
+            except Exception as e:
+                erros[arquivo] = e
 
-    if not row:
-        raise ValueError(f"Nao foi encontrado tipo_exame com nome '{nome_exame}'.")
-    return row["id_tipo_exame"]
+    return resultados, erros
 
 
-def carregar_espera_exame(
-    conn,
-    df_espera: pd.DataFrame,
-    id_uf: int,
-    id_tipo_exame: int,
-    sigla_uf: str,
-) -> None:
+def carregar_espera_exame(conn, df_espera: pd.DataFrame) -> None:
+    # df_espera com id_uf, id_tipo_exame, ano e as colunas qtd_* de todas as UFs
+    if usar_copy():
+        df_carga = df_espera.rename(columns=COLUNAS_QTD_ESPERA)
+        n = carregar_via_copy(conn, "espera_exame", COLUNAS_ESPERA, df_carga, CHAVE_ESPERA)
+        if n == 0:
+            print("Nenhum dado de espera para inserir.")
+        else:
+            print(f"Foram inseridos ou atualizados {n} registros em espera_exame.")
+        return
 
+    inicio = time.perf_counter()
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
+    df_espera = remover_duplicadas(df_espera, ["id_uf", "id_tipo_exame", "ano"], "espera_exame")
     valores = []
     for _, row in df_espera.iterrows():
+        id_uf = int(row["id_uf"])
+        id_tipo_exame = int(row["id_tipo_exame"])
         ano = int(row["ano"])
         v0_10 = int(row["qtd_0_10"])
         v11_20 = int(row["qtd_11_20"])
@@ -122,7 +154,7 @@ def carregar_espera_exame(
         valores.append((id_uf, id_tipo_exame, ano, v0_10, v11_20, v21_30, v30_mais))
 
     if not valores:
-        print(f"Nenhum dado de espera para inserir para UF {sigla_uf}.")
+        print("Nenhum dado de espera para inserir.")
         cur.close()
         return
 
@@ -137,22 +169,17 @@ def carregar_espera_exame(
             qtd_tempo_espera_30_mais
         )
         VALUES %s
-        ON CONFLICT (id_uf, id_tipo_exame, ano)
-        DO UPDATE SET
-            qtd_tempo_espera_0_10   = EXCLUDED.qtd_tempo_espera_0_10,
-            qtd_tempo_espera_11_20  = EXCLUDED.qtd_tempo_espera_11_20,
-            qtd_tempo_espera_21_30  = EXCLUDED.qtd_tempo_espera_21_30,
-            qtd_tempo_espera_30_mais = EXCLUDED.qtd_tempo_espera_30_mais;
-    """
+    """ + clausula_upsert("espera_exame", CHAVE_ESPERA, COLUNAS_ESPERA)
 
     psycopg2.extras.execute_values(cur, query, valores)
     conn.commit()
     cur.close()
 
-    print(f"Foram inseridos ou atualizados {len(valores)} registros para UF {sigla_uf}.")
+    relatar_carga("espera_exame", len(valores), inicio)
+    print(f"Foram inseridos ou atualizados {len(valores)} registros em espera_exame.")
 
 
-def main():
+def executar(conn, dimensoes: dict):
     padrao = os.path.join(BASE_DIR, "mamografia_atend*.csv")
     arquivos = sorted(glob.glob(padrao))
 
@@ -164,25 +191,59 @@ def main():
     for a in arquivos:
         print(" ", os.path.basename(a))
 
-    conn = get_conn()
+    id_tipo = obter_id(dimensoes, "tipo_exame", NOME_EXAME)
+    estado = carregar_estado(conn, ETAPA)
 
-    try:
-        id_tipo = obter_id_tipo_exame(conn, NOME_EXAME)
+    hashes = {arquivo: hash_arquivo(arquivo) for arquivo in arquivos}
+    alterados = [a for a in arquivos if not arquivo_inalterado(estado, a, hashes[a])]
+    if len(alterados) < len(arquivos):
+        print(f"\n{len(arquivos) - len(alterados)} arquivos sem alteração desde a última carga foram pulados.")
 
-        for arquivo in arquivos:
-            try:
-                sigla = extrair_sigla_uf_do_arquivo(arquivo)
-                print(f"\nProcessando arquivo {os.path.basename(arquivo)} para UF {sigla}...")
+    # 1) leitura e validação em paralelo (um arquivo por processo)
+    inicio = time.perf_counter()
+    resultados, erros = extrair_arquivos(alterados)
+    print(f"\n{len(resultados)} arquivos lidos em {time.perf_counter() - inicio:.2f}s com até {PROCESSOS} processos.")
 
-                id_uf = obter_id_uf_por_sigla(conn, sigla)
-                df_esp = extrair_espera_de_arquivo(arquivo)
+    # 2) ids e filtro incremental, ainda por arquivo
+    blocos = []
+    estados_novos = []
+    for arquivo in alterados:
+        if arquivo not in resultados:
+            continue
+        sigla, df_esp = resultados[arquivo]
+        try:
+            id_uf = obter_id(dimensoes, "uf", sigla)
+        except ValueError as e:
+            erros[arquivo] = e
+            continue
 
-                carregar_espera_exame(conn, df_esp, id_uf, id_tipo, sigla)
+        # só os anos a partir do último carregado deste arquivo
+        ano_inicial = ultimo_periodo(estado, arquivo)
+        if ano_inicial is not None:
+            df_esp = df_esp[df_esp["ano"] >= ano_inicial]
 
-            except Exception as e:
-                print(f"Erro ao processar {arquivo}: {e}")
+        print(f"UF {sigla}: {len(df_esp)} registros de {os.path.basename(arquivo)}")
+        blocos.append(df_esp.assign(id_uf=id_uf, id_tipo_exame=id_tipo))
+
+        ano_final = int(df_esp["ano"].max()) if not df_esp.empty else None
+        estados_novos.append((arquivo, hashes[arquivo], ano_final, len(df_esp)))
 
-        print("\nETL de espera_exame concluido para todos os arquivos.")
+    for arquivo, erro in sorted(erros.items()):
+        print(f"Erro ao processar {arquivo}: {erro}")
+
+    # 3) uma única escrita para todas as UFs
+    if blocos:
+        carregar_espera_exame(conn, pd.concat(blocos, ignore_index=True))
+        registrar_estados(conn, ETAPA, estados_novos)
+
+    print("\nETL de espera_exame concluido para todos os arquivos.")
+
+
+def main():
+    conn = get_conn()
+
+    try:
+        executar(conn, carregar_dimensoes(conn))
 
     finally:
         conn.close()
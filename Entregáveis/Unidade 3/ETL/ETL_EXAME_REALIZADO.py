@@ -1,89 +1,30 @@
 import os
+import time
 import psycopg2
 import psycopg2.extras
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estado, ultimo_periodo
+from sessao_etl import carregar_dimensoes, obter_id
+from periodos import parse_ano_mes
 
 load_dotenv()
 
 CAMINHO_EXAMES = "dirty_data_qtd_mamografias_df.csv"  
 NOME_EXAME_MAMOGRAFIA = "Diagnostico Por Mamografia" 
 
-MAPA_MESES_EXTENSO = {
-    "JANEIRO": 1,
-    "FEVEREIRO": 2,
-    "MARCO": 3,
-    "ABRIL": 4,
-    "MAIO": 5,
-    "JUNHO": 6,
-    "JULHO": 7,
-    "AGOSTO": 8,
-    "SETEMBRO": 9,
-    "OUTUBRO": 10,
-    "NOVEMBRO": 11,
-    "DEZEMBRO": 12,
-}
-
-
-def parse_mes_ano(valor: str):
-    if pd.isna(valor):
-        return None, None
-
-    valor = str(valor).strip()
-    if "/" not in valor:
-        return None, None
-
-    mes_str, ano_str = valor.split("/", 1)
-    mes_str = mes_str.strip().upper()
-    ano_str = ano_str.strip()
-
-    mes = MAPA_MESES_EXTENSO.get(mes_str)
-    if mes is None:
-        return None, None
-
-    try:
-        ano = int(ano_str)
-    except ValueError:
-        return None, None
-
-    return ano, mes
-
-
-def carregar_id_uf_df(conn):
-    with conn.cursor() as cur:
-        cur.execute("SELECT id_uf FROM unidade_da_federacao WHERE sigla = %s", ("DF",))
-        row = cur.fetchone()
-        if not row:
-            raise RuntimeError("Não encontrei unidade_da_federacao com sigla = 'DF'.")
-        return row[0]
-
-
-def carregar_id_tipo_exame_mamografia(conn, nome_exame=NOME_EXAME_MAMOGRAFIA):
-    with conn.cursor() as cur:
-        cur.execute("SELECT id_tipo_exame FROM tipo_exame WHERE nome = %s", (nome_exame,))
-        row = cur.fetchone()
-        if not row:
-            raise RuntimeError(
-                f"Não encontrei tipo_exame com nome = '{nome_exame}'. "
-                f"Verifique o nome de cadastro na tabela tipo_exame."
-            )
-        return row[0]
+ETAPA = "EXAME_REALIZADO"
 
 
-def normalizar_quantidade(valor):
-    if pd.isna(valor):
-        return None
+def normalizar_quantidades(serie: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype("string").str.strip()
 
-    if isinstance(valor, str):
-        valor = valor.strip()
-        if valor == "":
-            return None
-
-    try:
-        return int(float(valor))
-    except (ValueError, TypeError):
-        return None
+    # trunca como int(float(valor)); vazio ou texto vira NaN
+    return np.trunc(pd.to_numeric(serie, errors="coerce").astype("float64"))
 
 
 def processar_dataset_exames(df, id_uf_df, id_tipo_exame):
@@ -92,21 +33,24 @@ def processar_dataset_exames(df, id_uf_df, id_tipo_exame):
     if "Exames" not in df.columns:
         raise RuntimeError("Coluna 'Exames' não encontrada no dataset de exames.")
 
-    registros = []
+    # conversão vetorizada de "JANEIRO/2020" e das quantidades
+    periodos = parse_ano_mes(df["Mes/Ano"])
+    validos = periodos.assign(quantidade=normalizar_quantidades(df["Exames"])).dropna()
 
-    for _, row in df.iterrows():
-        mes_ano_valor = row["Mes/Ano"]
-        ano, mes = parse_mes_ano(mes_ano_valor)
-        if ano is None or mes is None:
-            continue
+    n = len(validos)
+    return list(
+        zip(
+            [id_tipo_exame] * n,
+            validos["mes"].astype(int).tolist(),
+            validos["quantidade"].astype(int).tolist(),
+            [id_uf_df] * n,
+            validos["ano"].astype(int).tolist(),
+        )
+    )
 
-        quantidade = normalizar_quantidade(row["Exames"])
-        if quantidade is None:
-            continue
 
-        registros.append((id_tipo_exame, mes, quantidade, id_uf_df, ano))
-
-    return registros
+COLUNAS_EXAME = ["id_tipo_exame", "mes", "quantidade", "id_uf", "ano"]
+CHAVE_EXAME = ["id_tipo_exame", "id_uf", "ano", "mes"]
 
 
 def inserir_exames(conn, registros):
@@ -114,37 +58,63 @@ def inserir_exames(conn, registros):
         print("Nenhum registro para inserir em exame_realizado.")
         return
 
+    if usar_copy():
+        carregar_via_copy(conn, "exame_realizado", COLUNAS_EXAME, registros, CHAVE_EXAME)
+        print(f"Carregados {len(registros)} registros em exame_realizado.")
+        return
+
+    inicio = time.perf_counter()
     sql = """
         INSERT INTO exame_realizado (id_tipo_exame, mes, quantidade, id_uf, ano)
-        VALUES (%s, %s, %s, %s, %s);
-    """
+        VALUES (%s, %s, %s, %s, %s)
+    """ + clausula_upsert("exame_realizado", CHAVE_EXAME, COLUNAS_EXAME)
 
     with conn.cursor() as cur:
         psycopg2.extras.execute_batch(cur, sql, registros, page_size=1000)
     conn.commit()
-    print(f"Inseridos {len(registros)} registros em exame_realizado.")
+    relatar_carga("exame_realizado", len(registros), inicio)
+    print(f"Carregados {len(registros)} registros em exame_realizado.")
 
 
-def main():
-    conn = get_conn()
+def executar(conn, dimensoes: dict):
+    id_uf_df = obter_id(dimensoes, "uf", "DF")
+    id_tipo_exame_mamo = obter_id(dimensoes, "tipo_exame", NOME_EXAME_MAMOGRAFIA)
 
-    try:
-        id_uf_df = carregar_id_uf_df(conn)
-        id_tipo_exame_mamo = carregar_id_tipo_exame_mamografia(conn)
+    print(f"id_uf para DF: {id_uf_df}")
+    print(f"id_tipo_exame para {NOME_EXAME_MAMOGRAFIA}: {id_tipo_exame_mamo}")
+
+    if not os.path.exists(CAMINHO_EXAMES):
+        raise FileNotFoundError(f"Arquivo de exames não encontrado: {CAMINHO_EXAMES}")
+
+    estado = carregar_estado(conn, ETAPA)
+    sha = hash_arquivo(CAMINHO_EXAMES)
+    if arquivo_inalterado(estado, CAMINHO_EXAMES, sha):
+        print("Arquivo de exames sem alteração desde a última carga; nada a fazer.")
+        return
+
+    df = pd.read_csv(CAMINHO_EXAMES)
+    print("Colunas encontradas no CSV de exames:", df.columns.tolist())
 
-        print(f"id_uf para DF: {id_uf_df}")
-        print(f"id_tipo_exame para {NOME_EXAME_MAMOGRAFIA}: {id_tipo_exame_mamo}")
+    registros = processar_dataset_exames(df, id_uf_df, id_tipo_exame_mamo)
 
-        if not os.path.exists(CAMINHO_EXAMES):
-            raise FileNotFoundError(f"Arquivo de exames não encontrado: {CAMINHO_EXAMES}")
+    # só os meses a partir do último carregado (AAAAMM)
+    periodo_inicial = ultimo_periodo(estado, CAMINHO_EXAMES)
+    if periodo_inicial is not None:
+        registros = [r for r in registros if r[4] * 100 + r[1] >= periodo_inicial]
 
-        df = pd.read_csv(CAMINHO_EXAMES)
-        print("Colunas encontradas no CSV de exames:", df.columns.tolist())
+    print(f"Registros gerados a partir do dataset de exames: {len(registros)}")
 
-        registros = processar_dataset_exames(df, id_uf_df, id_tipo_exame_mamo)
-        print(f"Registros gerados a partir do dataset de exames: {len(registros)}")
+    inserir_exames(conn, registros)
 
-        inserir_exames(conn, registros)
+    periodo_final = max((r[4] * 100 + r[1] for r in registros), default=None)
+    registrar_estado(conn, ETAPA, CAMINHO_EXAMES, sha, periodo_final, len(registros))
+
+
+def main():
+    conn = get_conn()
+
+    try:
+        executar(conn, carregar_dimensoes(conn))
 
     finally:
         conn.close()
@@ -1,9 +1,14 @@
 import os
+import time
 import psycopg2
 import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, remover_duplicadas, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estado
+from entidades import canonicos
+from sessao_etl import avisar_nao_encontrados, carregar_dimensoes, resolver_ids
 
 load_dotenv()
 
@@ -11,11 +16,16 @@ DATASET_PATH = "dirty_data_pop_df_com_plano_saude_por_ra.csv"
 
 ANO_REFERENCIA = 2021
 
+ETAPA = "POPULACAO"
+
 COL_RA = "Local"
 COL_TOTAL = "Total"
 COL_COM_PLANO = "Sim"
 COL_SEM_PLANO = "Nao"
 
+COLUNAS_POPULACAO = ["id_ra", "ano", "populacao_total", "populacao_plano_saude", "populacao_sem_plano_saude"]
+CHAVE_POPULACAO = ["id_ra", "ano"]
+
 
 def limpar_nome_ra(nome: str) -> str:
     if not isinstance(nome, str):
@@ -40,7 +50,8 @@ def tratar_dataset_populacao(caminho: str) -> pd.DataFrame:
             raise ValueError(f"Coluna '{col}' nao encontrada no CSV. Ajuste as constantes COL_* no script.")
 
     df_out = pd.DataFrame()
-    df_out["nome_ra"] = df[COL_RA].astype(str).apply(limpar_nome_ra)
+    nomes_ra = df[COL_RA].astype(str).apply(limpar_nome_ra)
+    df_out["nome_ra"] = canonicos("ra", nomes_ra).fillna(nomes_ra)
 
     df_out["populacao_total"] = (
         pd.to_numeric(df[COL_TOTAL], errors="coerce")
@@ -69,26 +80,21 @@ def tratar_dataset_populacao(caminho: str) -> pd.DataFrame:
     return df_out
 
 
-def mapear_id_ra(conn, df: pd.DataFrame) -> pd.DataFrame:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT id_ra, nome FROM regiao_administrativa;")
-    rows = cur.fetchall()
-    cur.close()
-
-    mapa_ra = {r["nome"].strip().lower(): r["id_ra"] for r in rows}
-
-    df["id_ra"] = df["nome_ra"].str.lower().map(mapa_ra)
-
-    faltantes = df[df["id_ra"].isna()]["nome_ra"].unique()
-    if len(faltantes) > 0:
-        print("\nRAs nao encontradas no banco:")
-        for ra in faltantes:
-            print("  -", ra)
-
-    return df.dropna(subset=["id_ra"]).copy()
+def mapear_id_ra(df: pd.DataFrame, dimensoes: dict) -> pd.DataFrame:
+    df_ok, nao_encontrados = resolver_ids(df, dimensoes, {"nome_ra": ("ra", "id_ra")})
+    avisar_nao_encontrados(nao_encontrados)
+    return df_ok
 
 
 def inserir_populacao(conn, df: pd.DataFrame):
+    if usar_copy():
+        df_carga = df.rename(columns={"populacao_com_plano_saude": "populacao_plano_saude"})
+        n = carregar_via_copy(conn, "populacao", COLUNAS_POPULACAO, df_carga, CHAVE_POPULACAO)
+        print(f"Foram carregadas {n} linhas na tabela populacao.")
+        return
+
+    inicio = time.perf_counter()
+    df = remover_duplicadas(df, CHAVE_POPULACAO, "populacao")
     valores = [
         (
             int(row["id_ra"]),
@@ -110,29 +116,40 @@ def inserir_populacao(conn, df: pd.DataFrame):
         """
         INSERT INTO populacao
         (id_ra, ano, populacao_total, populacao_plano_saude, populacao_sem_plano_saude)
-        VALUES %s;
-        """,
+        VALUES %s
+        """ + clausula_upsert("populacao", CHAVE_POPULACAO, COLUNAS_POPULACAO),
         valores,
     )
     conn.commit()
     cur.close()
 
-    print(f"Foram inseridas {len(valores)} linhas na tabela populacao.")
+    relatar_carga("populacao", len(valores), inicio)
+    print(f"Foram carregadas {len(valores)} linhas na tabela populacao.")
 
 
-def main():
+def executar(conn, dimensoes: dict):
+    sha = hash_arquivo(DATASET_PATH)
+    if arquivo_inalterado(carregar_estado(conn, ETAPA), DATASET_PATH, sha):
+        print("Dataset de populacao sem alteração desde a última carga; nada a fazer.")
+        return
+
     print("Tratando dataset de populacao por RA...")
     df = tratar_dataset_populacao(DATASET_PATH)
     print(f"Linhas apos tratamento: {len(df)}")
 
+    print("Mapeando id_ra...")
+    df_mapeado = mapear_id_ra(df, dimensoes)
+    print(f"Linhas apos mapeamento: {len(df_mapeado)}")
+
+    inserir_populacao(conn, df_mapeado)
+    registrar_estado(conn, ETAPA, DATASET_PATH, sha, ANO_REFERENCIA, len(df_mapeado))
+    print("ETL de populacao concluido.")
+
+
+def main():
     conn = get_conn()
     try:
-        print("Mapeando id_ra...")
-        df_mapeado = mapear_id_ra(conn, df)
-        print(f"Linhas apos mapeamento: {len(df_mapeado)}")
-
-        inserir_populacao(conn, df_mapeado)
-        print("ETL de populacao concluido.")
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -1,12 +1,20 @@
 import os
+import time
 import psycopg2
 import psycopg2.extras
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estado, ultimo_periodo
+from sessao_etl import carregar_dimensoes, obter_id, resolver_ids
+from periodos import parse_ano_mes
 
 load_dotenv()
 
+ETAPA = "PROFISSIONAIS"
+
 DATASETS_PROFISSIONAIS = [
     {
         "caminho": "dirty_data_historico_anual_numero_medicos_radiologistas_e_diagnostico_imagem_SUS - cnes.csv",
@@ -25,120 +33,69 @@ DATASETS_PROFISSIONAIS = [
     },
 ]
 
-MAPA_MESES = {
-    "jan.": 1,
-    "fev.": 2,
-    "mar.": 3,
-    "abr.": 4,
-    "mai.": 5,
-    "jun.": 6,
-    "jul.": 7,
-    "ago.": 8,
-    "set.": 9,
-    "out.": 10,
-    "nov.": 11,
-    "dez.": 12,
-}
-
-
-def parse_ano_mes(valor: str):
-    if pd.isna(valor):
-        return None, None
-
-    valor = str(valor).strip()
-    if "/" not in valor:
-        return None, None
-
-    ano_str, mes_str = valor.split("/", 1)
-    ano_str = ano_str.strip()
-    mes_str = mes_str.strip().lower()
-
-    if not mes_str.endswith("."):
-        mes_str = mes_str + "."
-
-    try:
-        ano = int(ano_str)
-    except ValueError:
-        return None, None
-
-    mes = MAPA_MESES.get(mes_str)
-    if mes is None:
-        return None, None
-
-    return ano, mes
-
-
-def carregar_id_uf_df(conn):
-    with conn.cursor() as cur:
-        cur.execute("SELECT id_uf FROM unidade_da_federacao WHERE sigla = %s", ("DF",))
-        row = cur.fetchone()
-        if not row:
-            raise RuntimeError("Não encontrei unidade_da_federacao com sigla = 'DF'.")
-        return row[0]
-
-
-def carregar_mapa_categorias(conn):
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-        cur.execute("SELECT id_categoria, nome FROM categoria_profissional;")
-        linhas = cur.fetchall()
-
-    mapa = {}
-    for linha in linhas:
-        nome = linha["nome"].strip()
-        mapa[nome] = linha["id_categoria"]
-
-    return mapa
-
-
-def normalizar_quantidade(valor):
-    if pd.isna(valor):
-        return None
 
+def normalizar_quantidades(serie: pd.Series) -> pd.Series:
     # Alguns CSVs podem vir como string, vamos limpar espaços
-    if isinstance(valor, str):
-        valor = valor.strip()
-        if valor == "":
-            return None
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype("string").str.strip()
 
-    try:
-        # Muitos desses dados são inteiros mesmo
-        return int(float(valor))
-    except (ValueError, TypeError):
-        return None
+    # Muitos desses dados são inteiros mesmo (trunca como int(float(valor)))
+    return np.trunc(pd.to_numeric(serie, errors="coerce").astype("float64"))
 
 
-def processar_dataset(df, config, id_uf_df, mapa_categorias):
+def processar_dataset(df, config, id_uf_df, dimensoes):
     col_periodo = config["coluna_periodo"]
     colunas_ignorar = config["colunas_ignorar"]
 
     if col_periodo not in df.columns:
         raise RuntimeError(f"Coluna de período '{col_periodo}' não encontrada no dataset {config['caminho']}")
 
-    registros = []
+    # cada coluna do CSV é uma categoria; as que não existem na dimensão são ignoradas
+    colunas_categoria = pd.DataFrame({"coluna": [c for c in df.columns if c not in colunas_ignorar]})
+    encontradas, nao_encontradas = resolver_ids(
+        colunas_categoria, dimensoes, {"coluna": ("categoria", "id_categoria")}
+    )
+    for nome_categoria in nao_encontradas["valor"]:
+        print(f"[AVISO] Categoria '{nome_categoria.strip()}' não encontrada em categoria_profissional. Coluna ignorada.")
 
-    colunas_categoria = [c for c in df.columns if c not in colunas_ignorar]
+    ids_categoria = dict(zip(encontradas["coluna"], encontradas["id_categoria"]))
 
-    for _, row in df.iterrows():
-        periodo_valor = row[col_periodo]
-        ano, mes = parse_ano_mes(periodo_valor)
-        if ano is None or mes is None:
-            continue
+    if not ids_categoria:
+        return []
+
+    # período e quantidades convertidos de uma vez para a coluna inteira
+    periodos = parse_ano_mes(df[col_periodo])
 
-        for coluna_cat in colunas_categoria:
-            nome_categoria = coluna_cat.strip()
-            id_categoria = mapa_categorias.get(nome_categoria)
+    quantidades = pd.DataFrame({c: normalizar_quantidades(df[c]) for c in ids_categoria})
+    quantidades = quantidades.assign(ano=periodos["ano"], mes=periodos["mes"])
+    quantidades = quantidades.dropna(subset=["ano", "mes"])
 
-            if id_categoria is None:
-                print(f"[AVISO] Categoria '{nome_categoria}' não encontrada em categoria_profissional. Linha ignorada.")
-                continue
+    longo = quantidades.melt(
+        id_vars=["ano", "mes"],
+        var_name="coluna",
+        value_name="quantidade",
+        ignore_index=False,
+    ).dropna(subset=["quantidade"])
 
-            quantidade = normalizar_quantidade(row[coluna_cat])
-            if quantidade is None:
-                continue
+    # mesma ordem do processamento linha a linha (linha do CSV, depois coluna)
+    longo = longo.assign(
+        ordem_coluna=longo["coluna"].map({c: i for i, c in enumerate(ids_categoria)})
+    )
+    longo = longo.rename_axis("linha").sort_values(["linha", "ordem_coluna"])
 
-            registros.append((id_categoria, id_uf_df, ano, mes, quantidade))
+    return list(
+        zip(
+            longo["coluna"].map(ids_categoria).astype(int).tolist(),
+            [id_uf_df] * len(longo),
+            longo["ano"].astype(int).tolist(),
+            longo["mes"].astype(int).tolist(),
+            longo["quantidade"].astype(int).tolist(),
+        )
+    )
 
-    return registros
+
+COLUNAS_PROFISSIONAL = ["id_categoria", "id_uf", "ano", "mes", "quantidade"]
+CHAVE_PROFISSIONAL = ["id_categoria", "id_uf", "ano", "mes"]
 
 
 def inserir_profissionais(conn, registros):
@@ -146,43 +103,72 @@ def inserir_profissionais(conn, registros):
         print("Nenhum registro para inserir em profissional_registrado.")
         return
 
+    if usar_copy():
+        carregar_via_copy(conn, "profissional_registrado", COLUNAS_PROFISSIONAL, registros, CHAVE_PROFISSIONAL)
+        print(f"Carregados {len(registros)} registros em profissional_registrado.")
+        return
+
+    inicio = time.perf_counter()
     sql = """
         INSERT INTO profissional_registrado (id_categoria, id_uf, ano, mes, quantidade)
-        VALUES (%s, %s, %s, %s, %s);
-    """
+        VALUES (%s, %s, %s, %s, %s)
+    """ + clausula_upsert("profissional_registrado", CHAVE_PROFISSIONAL, COLUNAS_PROFISSIONAL)
 
     with conn.cursor() as cur:
         psycopg2.extras.execute_batch(cur, sql, registros, page_size=1000)
     conn.commit()
-    print(f"Inseridos {len(registros)} registros em profissional_registrado.")
+    relatar_carga("profissional_registrado", len(registros), inicio)
+    print(f"Carregados {len(registros)} registros em profissional_registrado.")
 
 
-def main():
-    conn = get_conn()
+def executar(conn, dimensoes: dict):
+    id_uf_df = obter_id(dimensoes, "uf", "DF")
 
-    try:
-        id_uf_df = carregar_id_uf_df(conn)
-        mapa_categorias = carregar_mapa_categorias(conn)
+    print(f"id_uf para DF: {id_uf_df}")
+    print(f"Categorias carregadas: {len(dimensoes['categoria'])}")
+
+    estado = carregar_estado(conn, ETAPA)
+    registros_totais = []
+    estados_novos = []
 
-        print(f"id_uf para DF: {id_uf_df}")
-        print(f"Categorias carregadas: {len(mapa_categorias)}")
+    for config in DATASETS_PROFISSIONAIS:
+        caminho = config["caminho"]
+        print(f"\nProcessando dataset: {caminho}")
 
-        registros_totais = []
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+
+        sha = hash_arquivo(caminho)
+        if arquivo_inalterado(estado, caminho, sha):
+            print("Arquivo sem alteração desde a última carga; pulando.")
+            continue
 
-        for config in DATASETS_PROFISSIONAIS:
-            caminho = config["caminho"]
-            print(f"\nProcessando dataset: {caminho}")
+        df = pd.read_csv(caminho)
 
-            if not os.path.exists(caminho):
-                raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+        registros = processar_dataset(df, config, id_uf_df, dimensoes)
 
-            df = pd.read_csv(caminho)
+        # só os meses a partir do último carregado deste arquivo (AAAAMM)
+        periodo_inicial = ultimo_periodo(estado, caminho)
+        if periodo_inicial is not None:
+            registros = [r for r in registros if r[2] * 100 + r[3] >= periodo_inicial]
 
-            registros = processar_dataset(df, config, id_uf_df, mapa_categorias)
-            print(f"Registros gerados a partir de {caminho}: {len(registros)}")
-            registros_totais.extend(registros)
+        print(f"Registros gerados a partir de {caminho}: {len(registros)}")
+        registros_totais.extend(registros)
 
-        inserir_profissionais(conn, registros_totais)
+        periodo_final = max((r[2] * 100 + r[3] for r in registros), default=None)
+        estados_novos.append((caminho, sha, periodo_final, len(registros)))
+
+    inserir_profissionais(conn, registros_totais)
+
+    for caminho, sha, periodo_final, linhas in estados_novos:
+        registrar_estado(conn, ETAPA, caminho, sha, periodo_final, linhas)
+
+
+def main():
+    conn = get_conn()
+
+    try:
+        executar(conn, carregar_dimensoes(conn))
 
     finally:
         conn.close()
@@ -4,6 +4,8 @@ import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from entidades import canonicos
+from sessao_etl import atualizar_dimensao, carregar_dimensoes, chave_dimensao, obter_id
 
 load_dotenv()
 
@@ -55,7 +57,8 @@ def extrair_ras_unicas() -> pd.DataFrame:
     todas_ras = todas_ras.str.strip()
     todas_ras = todas_ras.replace("", pd.NA).dropna()
 
-    todas_ras = todas_ras.str.title()
+    # nome canônico (entidades.py); RAs fora do índice ficam como antes, em title case
+    todas_ras = canonicos("ra", todas_ras).fillna(todas_ras.str.title())
 
     df_ras = pd.DataFrame({"nome_ra": todas_ras})
     df_ras = df_ras.drop_duplicates().sort_values("nome_ra").reset_index(drop=True)
@@ -64,30 +67,34 @@ def extrair_ras_unicas() -> pd.DataFrame:
 
 
 
-ID_UF_DF = 4
+SIGLA_UF_DF = "DF"
 
-def carregar_regioes_administrativas(conn, df_ras: pd.DataFrame) -> None:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def carregar_regioes_administrativas(conn, df_ras: pd.DataFrame, dimensoes: dict) -> None:
+    cur = conn.cursor()
 
-    cur.execute("SELECT nome FROM regiao_administrativa WHERE id_uf = %s;", (ID_UF_DF,))
-    existentes = {row["nome"] for row in cur.fetchall()}
+    # id do DF vem da dimensão de UFs (a ordem de inserção não é fixa)
+    id_uf_df = obter_id(dimensoes, "uf", SIGLA_UF_DF)
+    existentes = dimensoes["ra"]
 
     novas_linhas = []
-    for _, row in df_ras.iterrows():
-        nome_ra = row["nome_ra"].strip()
-        if nome_ra not in existentes:
-            novas_linhas.append((nome_ra, ID_UF_DF))
+    for nome_ra in df_ras["nome_ra"].str.strip():
+        if chave_dimensao("ra", nome_ra) not in existentes:
+            novas_linhas.append((nome_ra, id_uf_df))
 
     if novas_linhas:
-        psycopg2.extras.execute_values(
+        inseridas = psycopg2.extras.execute_values(
             cur,
             """
             INSERT INTO regiao_administrativa (nome, id_uf)
             VALUES %s
+            ON CONFLICT (id_uf, nome) DO NOTHING
+            RETURNING nome, id_ra
             """,
             novas_linhas,
+            fetch=True,
         )
         conn.commit()
+        atualizar_dimensao(dimensoes, "ra", inseridas)
         print(f"Foram inseridas {len(novas_linhas)} novas RAs.")
     else:
         print("Nenhuma nova RA para inserir.")
@@ -95,15 +102,19 @@ def carregar_regioes_administrativas(conn, df_ras: pd.DataFrame) -> None:
     cur.close()
 
 
-def main():
+def executar(conn, dimensoes: dict):
     print("Extraindo RAs unicas a partir dos datasets...")
     df_ras = extrair_ras_unicas()
     print(f"Total de RAs unicas encontradas: {len(df_ras)}")
 
+    carregar_regioes_administrativas(conn, df_ras, dimensoes)
+    print("ETL de Região Administrativa concluído.")
+
+
+def main():
     conn = get_conn()
     try:
-        carregar_regioes_administrativas(conn, df_ras)
-        print("ETL de Região Administrativa concluído.")
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -4,6 +4,8 @@ import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from entidades import canonicos
+from sessao_etl import atualizar_dimensao, carregar_dimensoes, chave_dimensao
 
 load_dotenv()
 
@@ -28,7 +30,8 @@ def tratar_dataset_tipo_equipamento() -> pd.DataFrame:
         if c not in df.columns:
             raise ValueError(f"Coluna '{c}' nao encontrada no CSV. Colunas: {df.columns}")
 
-    df["nome"] = df["equipamento"].astype(str).str.strip()
+    nomes = df["equipamento"].astype(str).str.strip()
+    df["nome"] = canonicos("tipo_equipamento", nomes).fillna(nomes)
 
     df["existentes"] = pd.to_numeric(df["existentes"], errors="coerce").fillna(0).astype(int)
     df["existentes_SUS"] = pd.to_numeric(df["existentes_SUS"], errors="coerce").fillna(0).astype(int)
@@ -56,19 +59,17 @@ def tratar_dataset_tipo_equipamento() -> pd.DataFrame:
     return df_out
 
 
-def carregar_tipo_equipamento(conn, df: pd.DataFrame) -> None:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def carregar_tipo_equipamento(conn, df: pd.DataFrame, dimensoes: dict) -> None:
+    cur = conn.cursor()
 
-    cur.execute("SELECT id_tipo_equipamento, nome FROM tipo_equipamento;")
-    rows = cur.fetchall()
-    existentes = {str(r["nome"]).strip().lower(): r["id_tipo_equipamento"] for r in rows}
+    existentes = dimensoes["tipo_equipamento"]
 
     insercoes = []
     atualizacoes = []
 
     for _, row in df.iterrows():
         nome = row["nome"].strip()
-        chave = nome.lower()
+        chave = chave_dimensao("tipo_equipamento", nome)
 
         q_pub = int(row["quantidade_publico"])
         q_priv = int(row["quantidade_privado"])
@@ -99,45 +100,60 @@ def carregar_tipo_equipamento(conn, df: pd.DataFrame) -> None:
             )
 
     if insercoes:
-        psycopg2.extras.execute_values(
+        inseridos = psycopg2.extras.execute_values(
             cur,
             """
             INSERT INTO tipo_equipamento
             (nome, descricao, quantidade_publico, quantidade_privado,
              quantidade_funcionando_sus, quantidade_parado_sus)
             VALUES %s
+            ON CONFLICT (nome) DO NOTHING
+            RETURNING nome, id_tipo_equipamento
             """,
             insercoes,
+            fetch=True,
         )
+        atualizar_dimensao(dimensoes, "tipo_equipamento", inseridos)
         print(f"Foram inseridos {len(insercoes)} novos tipos de equipamento.")
 
     if atualizacoes:
-        cur.executemany(
+        # um único UPDATE para todos os tipos; linhas sem mudança não são regravadas
+        psycopg2.extras.execute_values(
+            cur,
             """
-            UPDATE tipo_equipamento
-            SET quantidade_publico = %s,
-                quantidade_privado = %s,
-                quantidade_funcionando_sus = %s,
-                quantidade_parado_sus = %s
-            WHERE id_tipo_equipamento = %s
+            UPDATE tipo_equipamento AS t
+            SET quantidade_publico = v.q_pub,
+                quantidade_privado = v.q_priv,
+                quantidade_funcionando_sus = v.q_func,
+                quantidade_parado_sus = v.q_parado
+            FROM (VALUES %s) AS v (q_pub, q_priv, q_func, q_parado, id_tipo)
+            WHERE t.id_tipo_equipamento = v.id_tipo
+              AND (t.quantidade_publico, t.quantidade_privado,
+                   t.quantidade_funcionando_sus, t.quantidade_parado_sus)
+                  IS DISTINCT FROM (v.q_pub, v.q_priv, v.q_func, v.q_parado)
             """,
             atualizacoes,
+            page_size=len(atualizacoes),
         )
-        print(f"Foram atualizados {len(atualizacoes)} tipos de equipamento existentes.")
+        print(f"Foram atualizados {cur.rowcount} de {len(atualizacoes)} tipos de equipamento existentes.")
 
     conn.commit()
     cur.close()
 
 
-def main():
+def executar(conn, dimensoes: dict):
     print("Lendo e tratando dataset de equipamentos por tipo (nivel DF)...")
     df = tratar_dataset_tipo_equipamento()
     print(f"Total de linhas no dataset: {len(df)}")
 
+    carregar_tipo_equipamento(conn, df, dimensoes)
+    print("ETL de tipo_equipamento concluido com sucesso.")
+
+
+def main():
     conn = get_conn()
     try:
-        carregar_tipo_equipamento(conn, df)
-        print("ETL de tipo_equipamento concluido com sucesso.")
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -5,6 +5,8 @@ import psycopg2.extras
 import pandas as pd
 from dotenv import load_dotenv
 from config_db import get_conn
+from entidades import canonicos
+from sessao_etl import atualizar_dimensao, carregar_dimensoes, chave_dimensao
 
 load_dotenv()
 
@@ -55,7 +57,8 @@ def extrair_tipos_exame() -> pd.DataFrame:
 
     nomes_limpos.extend(TIPOS_EXAME_FIXOS)
 
-    df_out = pd.DataFrame({"nome_exame": nomes_limpos})
+    nomes_limpos = pd.Series(nomes_limpos, dtype="string")
+    df_out = pd.DataFrame({"nome_exame": canonicos("tipo_exame", nomes_limpos).fillna(nomes_limpos)})
     
     df_out = df_out.drop_duplicates().sort_values("nome_exame").reset_index(drop=True)
 
@@ -63,25 +66,25 @@ def extrair_tipos_exame() -> pd.DataFrame:
 
 
 
-def carregar_tipos_exame(conn, df_exames: pd.DataFrame):
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def carregar_tipos_exame(conn, df_exames: pd.DataFrame, dimensoes: dict):
+    cur = conn.cursor()
 
-    cur.execute("SELECT nome FROM tipo_exame;")
-    existentes = {row["nome"] for row in cur.fetchall()}
+    existentes = dimensoes["tipo_exame"]
 
     novas = []
-    for _, row in df_exames.iterrows():
-        nome = row["nome_exame"]
-        if nome not in existentes:
+    for nome in df_exames["nome_exame"]:
+        if chave_dimensao("tipo_exame", nome) not in existentes:
             novas.append((nome, None))
 
     if novas:
-        psycopg2.extras.execute_values(
+        inseridas = psycopg2.extras.execute_values(
             cur,
-            "INSERT INTO tipo_exame (nome, descricao) VALUES %s;",
-            novas
+            "INSERT INTO tipo_exame (nome, descricao) VALUES %s ON CONFLICT (nome) DO NOTHING RETURNING nome, id_tipo_exame;",
+            novas,
+            fetch=True,
         )
         conn.commit()
+        atualizar_dimensao(dimensoes, "tipo_exame", inseridas)
         print(f"Foram inseridos {len(novas)} tipos de exame.")
     else:
         print("Nenhum tipo novo para inserir.")
@@ -89,14 +92,18 @@ def carregar_tipos_exame(conn, df_exames: pd.DataFrame):
     cur.close()
 
 
-def main():
+def executar(conn, dimensoes: dict):
     print("Extraindo tipos de exame a partir dos nomes das colunas...")
     df_exames = extrair_tipos_exame()
     print(df_exames)
 
+    carregar_tipos_exame(conn, df_exames, dimensoes)
+
+
+def main():
     conn = get_conn()
     try:
-        carregar_tipos_exame(conn, df_exames)
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
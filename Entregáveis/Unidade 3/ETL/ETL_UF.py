@@ -1,6 +1,7 @@
 import psycopg2
 import psycopg2.extras
 from config_db import get_conn
+from sessao_etl import atualizar_dimensao, carregar_dimensoes, chave_dimensao
 
 UFS = [
     ("Acre", "AC"),
@@ -33,27 +34,30 @@ UFS = [
 ]
 
 
-def carregar_ufs(conn):
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def carregar_ufs(conn, dimensoes: dict):
+    cur = conn.cursor()
 
-    cur.execute("SELECT sigla FROM unidade_da_federacao;")
-    existentes = {row["sigla"] for row in cur.fetchall()}
+    existentes = dimensoes["uf"]
 
     novas_linhas = []
     for nome, sigla in UFS:
-        if sigla not in existentes:
+        if chave_dimensao("uf", sigla) not in existentes:
             novas_linhas.append((nome, sigla))
 
     if novas_linhas:
-        psycopg2.extras.execute_values(
+        inseridas = psycopg2.extras.execute_values(
             cur,
             """
             INSERT INTO unidade_da_federacao (nome, sigla)
             VALUES %s
+            ON CONFLICT (sigla) DO NOTHING
+            RETURNING sigla, id_uf
             """,
             novas_linhas,
+            fetch=True,
         )
         conn.commit()
+        atualizar_dimensao(dimensoes, "uf", inseridas)
         print(f"Foram inseridas {len(novas_linhas)} novas UFs.")
     else:
         print("Nenhuma UF nova para inserir.")
@@ -61,11 +65,15 @@ def carregar_ufs(conn):
     cur.close()
 
 
+def executar(conn, dimensoes: dict):
+    carregar_ufs(conn, dimensoes)
+    print("ETL de UFs concluído.")
+
+
 def main():
     conn = get_conn()
     try:
-        carregar_ufs(conn)
-        print("ETL de UFs concluído.")
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -1,10 +1,14 @@
 import os
+import time
 import psycopg2
 import psycopg2.extras
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 from config_db import get_conn
+from carga_copy import carregar_via_copy, clausula_upsert, relatar_carga, remover_duplicadas, usar_copy
+from estado_etl import arquivo_inalterado, carregar_estado, hash_arquivo, registrar_estado
+from sessao_etl import atualizar_dimensao, avisar_nao_encontrados, carregar_dimensoes, resolver_ids
 
 load_dotenv()
 
@@ -12,6 +16,12 @@ DATASET_PATH = "dirty_data_dataset_usabilidade_dataSUS_WAVE.csv"
 
 DATA_COLETA_FIXA = "2025-11-16"
 
+ETAPA = "WAVE"
+
+COLUNAS_METRICA_WAVE = ["id_pagina", "data_coleta", "errors", "contrast_errors", "alerts", "aim_score"]
+# uma medição por página (url) e data de coleta; URLs repetidas no CSV ficam com a última linha
+CHAVE_METRICA_WAVE = ["id_pagina", "data_coleta"]
+
 def classificar_sistema(url: str) -> str:
     if not isinstance(url, str):
         return "DATASUS"
@@ -68,104 +78,106 @@ def tratar_dataset_wave(caminho_csv: str) -> pd.DataFrame:
     return df
 
 
-def carregar_paginas(conn, df_wave: pd.DataFrame) -> None:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-    cur.execute("SELECT id_pagina, url FROM pagina_portal;")
-    existentes = cur.fetchall()
-    urls_existentes = {row["url"]: row["id_pagina"] for row in existentes}
+def carregar_paginas(conn, df_wave: pd.DataFrame, dimensoes: dict) -> None:
+    existentes = dimensoes["pagina"]
 
-    novas_linhas = []
-    for _, row in df_wave.drop_duplicates(subset=["url"]).iterrows():
-        url = row["url"]
-        sistema = row["sistema"]
-        if url not in urls_existentes:
-            nome = url
-            novas_linhas.append((nome, url, sistema))
+    paginas = df_wave.drop_duplicates(subset=["url"])
+    paginas = paginas[~paginas["url"].isin(existentes.keys())]
+    # o nome da página é a própria URL
+    novas_linhas = list(zip(paginas["url"], paginas["url"], paginas["sistema"]))
 
     if novas_linhas:
-        psycopg2.extras.execute_values(
-            cur,
-            """
-            INSERT INTO pagina_portal (nome, url, sistema)
-            VALUES %s
-            """,
-            novas_linhas,
-        )
+        with conn.cursor() as cur:
+            inseridas = psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO pagina_portal (nome, url, sistema)
+                VALUES %s
+                ON CONFLICT (url) DO NOTHING
+                RETURNING url, id_pagina
+                """,
+                novas_linhas,
+                fetch=True,
+            )
         conn.commit()
+        atualizar_dimensao(dimensoes, "pagina", inseridas)
         print(f"Foram inseridas {len(novas_linhas)} novas paginas em pagina_portal.")
     else:
         print("Nenhuma nova pagina para inserir em pagina_portal.")
 
-    cur.close()
-
 
-def carregar_metricas_wave(conn, df_wave: pd.DataFrame) -> None:
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def carregar_metricas_wave(conn, df_wave: pd.DataFrame, dimensoes: dict) -> None:
+    df_carga, nao_encontradas = resolver_ids(df_wave, dimensoes, {"url": ("pagina", "id_pagina")})
+    avisar_nao_encontrados(nao_encontradas)
 
-    cur.execute("SELECT id_pagina, url FROM pagina_portal;")
-    paginas = cur.fetchall()
-    mapa_url_id = {row["url"]: row["id_pagina"] for row in paginas}
-
-    linhas_metricas = []
-    urls_sem_id = set()
-
-    for _, row in df_wave.iterrows():
-        url = row["url"]
-        id_pagina = mapa_url_id.get(url)
-
-        if id_pagina is None:
-            urls_sem_id.add(url)
-            continue
+    df_carga = df_carga.assign(data_coleta=DATA_COLETA_FIXA).fillna(
+        {"errors": 0, "contrast_errors": 0, "alerts": 0}
+    )
 
-        linha = (
-            id_pagina,
-            DATA_COLETA_FIXA,
-            int(row["errors"]) if not pd.isna(row["errors"]) else 0,
-            int(row["contrast_errors"])
-            if not pd.isna(row["contrast_errors"])
-            else 0,
-            int(row["alerts"]) if not pd.isna(row["alerts"]) else 0,
-            float(row["aim_score"]) if not pd.isna(row["aim_score"]) else None,
+    if usar_copy():
+        n = carregar_via_copy(conn, "metrica_wave", COLUNAS_METRICA_WAVE, df_carga, CHAVE_METRICA_WAVE)
+        if n:
+            print(f"Foram carregados {n} registros em metrica_wave.")
+        else:
+            print("Nenhuma metrica para inserir em metrica_wave.")
+        return
+
+    inicio = time.perf_counter()
+    # o ON CONFLICT não aceita a mesma página duas vezes no mesmo comando
+    df_carga = remover_duplicadas(df_carga, CHAVE_METRICA_WAVE, "metrica_wave")
+    aim_score = df_carga["aim_score"].astype(object).where(df_carga["aim_score"].notna(), None)
+    linhas_metricas = list(
+        zip(
+            df_carga["id_pagina"].tolist(),
+            df_carga["data_coleta"].tolist(),
+            df_carga["errors"].astype(int).tolist(),
+            df_carga["contrast_errors"].astype(int).tolist(),
+            df_carga["alerts"].astype(int).tolist(),
+            aim_score.tolist(),
         )
-        linhas_metricas.append(linha)
-
-    if urls_sem_id:
-        print("Atencao: existem URLs sem id_pagina mapeado em pagina_portal:")
-        for u in urls_sem_id:
-            print(" -", u)
+    )
 
     if linhas_metricas:
-        psycopg2.extras.execute_values(
-            cur,
-            """
-            INSERT INTO metrica_wave
-                (id_pagina, data_coleta, errors, contrast_errors, alerts, aim_score)
-            VALUES %s
-            """,
-            linhas_metricas,
-        )
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO metrica_wave
+                    (id_pagina, data_coleta, errors, contrast_errors, alerts, aim_score)
+                VALUES %s
+                """ + clausula_upsert("metrica_wave", CHAVE_METRICA_WAVE, COLUNAS_METRICA_WAVE),
+                linhas_metricas,
+            )
         conn.commit()
-        print(f"Foram inseridos {len(linhas_metricas)} registros em metrica_wave.")
+        relatar_carga("metrica_wave", len(linhas_metricas), inicio)
+        print(f"Foram carregados {len(linhas_metricas)} registros em metrica_wave.")
     else:
         print("Nenhuma metrica para inserir em metrica_wave.")
 
-    cur.close()
 
+def executar(conn, dimensoes: dict):
+    sha = hash_arquivo(DATASET_PATH)
+    if arquivo_inalterado(carregar_estado(conn, ETAPA), DATASET_PATH, sha):
+        print("Dataset WAVE sem alteração desde a última carga; nada a fazer.")
+        return
 
-def main():
     print("Lendo e tratando dataset WAVE...")
     df_wave = tratar_dataset_wave(DATASET_PATH)
 
-    conn = get_conn()
-    try:
-        print("Carregando paginas...")
-        carregar_paginas(conn, df_wave)
+    print("Carregando paginas...")
+    carregar_paginas(conn, df_wave, dimensoes)
 
-        print("Carregando metricas WAVE...")
-        carregar_metricas_wave(conn, df_wave)
+    print("Carregando metricas WAVE...")
+    carregar_metricas_wave(conn, df_wave, dimensoes)
+    registrar_estado(conn, ETAPA, DATASET_PATH, sha, None, len(df_wave))
 
-        print("ETL WAVE concluido com sucesso.")
+    print("ETL WAVE concluido com sucesso.")
+
+
+def main():
+    conn = get_conn()
+    try:
+        executar(conn, carregar_dimensoes(conn))
     finally:
         conn.close()
 
@@ -0,0 +1,89 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from ETL_EQUIPAMENTOS_REGISTRADOS import ANO_PADRAO, MAPEAMENTO_COLUNAS_EQUIP, equipamentos_largo_para_longo
+
+# Micro-benchmark da transformação larga -> longa dos equipamentos por RA:
+# laço com iterrows (implementação anterior) x versão vetorizada (NumPy).
+# Não acessa o banco. Para executar (precisa do config_db.py no PYTHONPATH,
+# como os demais scripts de ETL):
+#   python benchmark_equipamentos_ra.py            (33, 1.000 e 20.000 RAs)
+#   python benchmark_equipamentos_ra.py 100000     (tamanhos escolhidos)
+
+TAMANHOS_PADRAO = [33, 1_000, 20_000]
+REPETICOES = 3
+
+
+def referencia_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    # cópia da versão anterior de tratar_dataset_equipamento_por_ra
+    def limpar_nome_ra(nome):
+        if not isinstance(nome, str):
+            return None
+        n = nome.strip()
+        if not n:
+            return None
+        return n.title()
+
+    df = df.assign(nome_ra=df["ra"].astype(str).apply(limpar_nome_ra))
+
+    registros = []
+    for _, row in df.iterrows():
+        nome_ra = row["nome_ra"]
+        if not isinstance(nome_ra, str):
+            continue
+
+        for col_csv, nome_tipo in MAPEAMENTO_COLUNAS_EQUIP.items():
+            try:
+                qtd = int(row[col_csv])
+            except (ValueError, TypeError):
+                continue
+
+            if qtd <= 0:
+                continue
+
+            registros.append(
+                {"nome_ra": nome_ra, "nome_equipamento": nome_tipo, "quantidade": qtd, "ano": ANO_PADRAO}
+            )
+
+    return pd.DataFrame(registros)
+
+
+def gerar_dataset(n_ras: int, semente: int = 0) -> pd.DataFrame:
+    # mesmo formato do CSV do CNES: muitas células zeradas, algumas vazias
+    rng = np.random.default_rng(semente)
+    dados = {"ra": [f" ra {i} " for i in range(n_ras)]}
+    for col in MAPEAMENTO_COLUNAS_EQUIP:
+        valores = rng.choice([0, 0, 0, 1, 2, 5, 12, np.nan], n_ras).astype("float64")
+        dados[col] = valores
+    return pd.DataFrame(dados)
+
+
+def medir(funcao, df: pd.DataFrame) -> tuple:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+
+    print(f"{'RAs':>8} {'linhas':>9} {'iterrows (s)':>13} {'numpy (s)':>10} {'ganho':>8}")
+    for n_ras in tamanhos:
+        df = gerar_dataset(n_ras)
+
+        t_antigo, antigo = medir(referencia_iterrows, df)
+        t_novo, novo = medir(equipamentos_largo_para_longo, df)
+
+        # mesmo contrato de saída (colunas, ordem e valores)
+        pd.testing.assert_frame_equal(antigo, novo, check_dtype=False)
+
+        print(f"{n_ras:>8} {len(novo):>9} {t_antigo:>13.4f} {t_novo:>10.4f} {t_antigo / t_novo:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import io
+import os
+import time
+import pandas as pd
+from psycopg2 import sql
+
+# Carga em massa das tabelas de fatos: o DataFrame é enviado com
+# COPY FROM STDIN (CSV) para uma tabela temporária e depois mesclado na
+# tabela de destino com um único INSERT ... SELECT ... ON CONFLICT pela chave
+# natural (restrições UNIQUE do MER_Fisico_Radiologia_DF.sql).
+# ETL_METODO_CARGA=insert volta ao caminho antigo (execute_values/execute_batch),
+# para comparar as duas cargas pelo relatório de linhas/s.
+
+METODO_CARGA = os.getenv("ETL_METODO_CARGA", "copy").strip().lower()
+
+
+def usar_copy() -> bool:
+    return METODO_CARGA == "copy"
+
+
+def relatar_carga(tabela: str, linhas: int, inicio: float, metodo: str = METODO_CARGA, alteradas=None) -> None:
+    segundos = time.perf_counter() - inicio
+    taxa = linhas / segundos if segundos > 0 else float("inf")
+    resumo = f"[{metodo}] {tabela}: {linhas} linhas em {segundos:.3f}s ({taxa:,.0f} linhas/s)"
+    if alteradas is not None:
+        resumo += f", {alteradas} novas ou alteradas"
+    print(resumo)
+
+
+def clausula_upsert(tabela: str, chave: list, colunas: list) -> str:
+    # atualiza só o que mudou: reexecutar a carga com os mesmos dados não grava nada
+    valores = [c for c in colunas if c not in chave]
+    if not valores:
+        return f"ON CONFLICT ({', '.join(chave)}) DO NOTHING"
+
+    atribuicoes = ", ".join(f"{c} = EXCLUDED.{c}" for c in valores)
+    atuais = ", ".join(f"{tabela}.{c}" for c in valores)
+    novos = ", ".join(f"EXCLUDED.{c}" for c in valores)
+    return (
+        f"ON CONFLICT ({', '.join(chave)}) DO UPDATE SET {atribuicoes} "
+        f"WHERE ({atuais}) IS DISTINCT FROM ({novos})"
+    )
+
+
+def remover_duplicadas(df: pd.DataFrame, chave: list, tabela: str) -> pd.DataFrame:
+    # o ON CONFLICT não aceita a mesma chave duas vezes no mesmo comando; vale a última linha
+    duplicadas = df.duplicated(subset=chave, keep="last")
+    if duplicadas.any():
+        print(f"[AVISO] {tabela}: {int(duplicadas.sum())} linhas com chave repetida; mantida a última.")
+        return df[~duplicadas]
+    return df
+
+
+def carregar_via_copy(conn, tabela: str, colunas: list, dados, chave: list) -> int:
+    # dados: DataFrame com as colunas da tabela ou lista de tuplas na ordem de colunas
+    if isinstance(dados, pd.DataFrame):
+        df = dados[colunas]
+    else:
+        df = pd.DataFrame(dados, columns=colunas)
+
+    if df.empty:
+        return 0
+
+    df = remover_duplicadas(df, chave, tabela)
+
+    inicio = time.perf_counter()
+
+    # inteiros que vieram como float (ex.: ids após map) precisam sair sem ".0"
+    buffer = io.StringIO()
+    df.convert_dtypes().to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    staging = sql.Identifier(f"stg_{tabela}")
+    lista = sql.SQL(", ").join(sql.Identifier(c) for c in colunas)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA;").format(
+                staging, lista, sql.Identifier(tabela)
+            )
+        )
+        cur.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(staging, lista),
+            buffer,
+        )
+        cur.execute(
+            sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} {};").format(
+                sql.Identifier(tabela), lista, lista, staging,
+                sql.SQL(clausula_upsert(tabela, chave, colunas)),
+            )
+        )
+        alteradas = cur.rowcount
+    conn.commit()
+
+    relatar_carga(tabela, len(df), inicio, "copy", alteradas)
+    return len(df)
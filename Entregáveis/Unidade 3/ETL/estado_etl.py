@@ -0,0 +1,75 @@
+import hashlib
+import os
+import psycopg2.extras
+
+# Carga incremental: a tabela etl_estado guarda, por arquivo de origem, o hash
+# do conteúdo e o último período carregado (AAAAMM para séries mensais,
+# AAAA para anuais). Arquivo com o mesmo hash é pulado; arquivo alterado
+# carrega só a partir do último período (que é recarregado, pois a fonte
+# costuma revisar o mês mais recente; os upserts tornam isso seguro).
+# ETL_CARGA_COMPLETA=1 (ou executar_etl.py --completo) ignora o estado.
+
+CARGA_COMPLETA = os.getenv("ETL_CARGA_COMPLETA", "0").strip() == "1"
+
+
+def hash_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def carregar_estado(conn, etapa: str) -> dict:
+    # arquivo -> {"sha256": ..., "ultimo_periodo": ...}, uma consulta por etapa
+    if CARGA_COMPLETA:
+        return {}
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT arquivo, sha256, ultimo_periodo FROM etl_estado WHERE etapa = %s;",
+            (etapa,),
+        )
+        return {
+            arquivo: {"sha256": sha, "ultimo_periodo": periodo}
+            for arquivo, sha, periodo in cur.fetchall()
+        }
+
+
+def arquivo_inalterado(estado: dict, caminho: str, sha256: str) -> bool:
+    anterior = estado.get(caminho)
+    return anterior is not None and anterior["sha256"] == sha256
+
+
+def ultimo_periodo(estado: dict, caminho: str):
+    anterior = estado.get(caminho)
+    return anterior["ultimo_periodo"] if anterior else None
+
+
+def registrar_estado(conn, etapa: str, caminho: str, sha256: str, periodo, linhas: int) -> None:
+    registrar_estados(conn, etapa, [(caminho, sha256, periodo, linhas)])
+
+
+def registrar_estados(conn, etapa: str, arquivos: list) -> None:
+    # arquivos: tuplas (caminho, sha256, periodo, linhas), gravadas em um só comando;
+    # periodo None mantém o último período já registrado (nenhum período novo)
+    if not arquivos:
+        return
+
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            INSERT INTO etl_estado (arquivo, etapa, sha256, ultimo_periodo, linhas, carregado_em)
+            VALUES %s
+            ON CONFLICT (arquivo) DO UPDATE SET
+                etapa          = EXCLUDED.etapa,
+                sha256         = EXCLUDED.sha256,
+                ultimo_periodo = COALESCE(EXCLUDED.ultimo_periodo, etl_estado.ultimo_periodo),
+                linhas         = EXCLUDED.linhas,
+                carregado_em   = EXCLUDED.carregado_em;
+            """,
+            [(caminho, etapa, sha, periodo, linhas) for caminho, sha, periodo, linhas in arquivos],
+            template="(%s, %s, %s, %s, %s, now())",
+        )
+    conn.commit()
@@ -0,0 +1,89 @@
+import sys
+import time
+from dotenv import load_dotenv
+
+import ETL_UF
+import ETL_RA
+import ETL_TIPO_EXAME
+import ETL_TIPO_EQUIPAMENTO
+import ETL_CATEGORIA_PROFISSIONAL
+import ETL_POPULACAO_DF_PLANO_SAUDE
+import ETL_EQUIPAMENTOS_REGISTRADOS
+import ETL_PROFISSIONAIS_REGISTRADOS
+import ETL_EXAME_REALIZADO
+import ETL_ESPERA_EXAMES
+import ETL_WAVE
+import estado_etl
+from sessao_etl import carregar_dimensoes, criar_pool
+from visoes_kpi import VISOES_KPI, atualizar_visoes_kpi
+
+load_dotenv()
+
+# Executa todos os scripts de ETL em uma única sessão: uma conexão do pool e
+# as dimensões (UF, RA, tipo_exame, tipo_equipamento, categoria) lidas uma vez.
+# Ao fim da carga, as views materializadas dos KPIs do painel são atualizadas.
+# Rodar a partir da pasta dos arquivos (Base de Dados/Dirty Data):
+#   python ../../ETL/executar_etl.py            (todas as etapas)
+#   python ../../ETL/executar_etl.py ESPERA WAVE (só as etapas indicadas)
+#   python ../../ETL/executar_etl.py --completo (recarrega mesmo arquivos sem alteração)
+
+# dimensões primeiro: os fatos dependem dos ids que elas criam
+ETAPAS = {
+    "UF": ETL_UF,
+    "RA": ETL_RA,
+    "TIPO_EXAME": ETL_TIPO_EXAME,
+    "TIPO_EQUIPAMENTO": ETL_TIPO_EQUIPAMENTO,
+    "CATEGORIA_PROFISSIONAL": ETL_CATEGORIA_PROFISSIONAL,
+    "POPULACAO": ETL_POPULACAO_DF_PLANO_SAUDE,
+    "EQUIPAMENTOS_REGISTRADOS": ETL_EQUIPAMENTOS_REGISTRADOS,
+    "PROFISSIONAIS": ETL_PROFISSIONAIS_REGISTRADOS,
+    "EXAME_REALIZADO": ETL_EXAME_REALIZADO,
+    "ESPERA": ETL_ESPERA_EXAMES,
+    "WAVE": ETL_WAVE,
+}
+
+
+def executar_etapas(pool, conn, nomes: list) -> None:
+    inicio_total = time.perf_counter()
+    dimensoes = carregar_dimensoes(conn)
+
+    for nome in nomes:
+        print(f"\n=== {nome} ===")
+        inicio = time.perf_counter()
+        try:
+            ETAPAS[nome].executar(conn, dimensoes)
+        except Exception:
+            conn.rollback()
+            print(f"Erro na etapa {nome}; etapas seguintes não foram executadas.")
+            raise
+        print(f"=== {nome} concluida em {time.perf_counter() - inicio:.2f}s ===")
+
+    print("\n=== KPIs ===")
+    atualizar_visoes_kpi(pool, conn)
+
+    print(f"\nETL completo em {time.perf_counter() - inicio_total:.2f}s")
+
+
+def main():
+    argumentos = sys.argv[1:]
+    if "--completo" in argumentos:
+        argumentos.remove("--completo")
+        estado_etl.CARGA_COMPLETA = True
+
+    nomes = [n.upper() for n in argumentos] or list(ETAPAS)
+    desconhecidas = [n for n in nomes if n not in ETAPAS]
+    if desconhecidas:
+        raise SystemExit(f"Etapas desconhecidas: {desconhecidas}. Opções: {list(ETAPAS)}")
+
+    # uma conexão para as etapas e uma por view de KPI, atualizadas em paralelo
+    pool = criar_pool(maxconn=1 + len(VISOES_KPI))
+    conn = pool.getconn()
+    try:
+        executar_etapas(pool, conn, nomes)
+    finally:
+        pool.putconn(conn)
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
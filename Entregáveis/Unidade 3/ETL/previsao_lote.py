@@ -0,0 +1,413 @@
+import hashlib
+import importlib
+import os
+import signal
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from config_db import get_conn
+from carga_copy import carregar_via_copy
+
+load_dotenv()
+
+# Previsão em lote de todas as séries mensais de exame_realizado (uma por UF e
+# tipo de exame): SARIMAX com o regressor Pandemia gera a previsão dos
+# próximos meses. Cada série é uma tarefa de um pool de processos, com tempo
+# limite próprio, e séries sem alteração desde o último ajuste são puladas.
+# A busca completa das ordens (auto_arima do pmdarima) só roda na primeira vez:
+# depois as ordens gravadas em modelo_previsao são reajustadas direto, e só
+# quando o AIC por mês ou o teste de Ljung-Box dos resíduos pioram as ordens
+# vizinhas (±1) são testadas. Resultados em modelo_previsao e previsao_exame
+# (migracao_005 e migracao_006). Precisa do pmdarima e do statsmodels.
+# Para executar (por exemplo, toda noite depois do executar_etl.py):
+#   python previsao_lote.py                    (só séries novas ou alteradas)
+#   python previsao_lote.py --todas            (reajusta todas)
+#   python previsao_lote.py --busca-completa   (ignora as ordens gravadas)
+# PREVISAO_TEMPO_LIMITE: segundos por série (padrão 120); ETL_PROCESSOS: processos.
+
+PROCESSOS = int(os.getenv("ETL_PROCESSOS", str(os.cpu_count() or 1)))
+TEMPO_LIMITE_SERIE = int(os.getenv("PREVISAO_TEMPO_LIMITE", "120"))
+
+HORIZONTE_PREVISAO = 12
+PERIODO_SAZONAL = 12
+
+# com menos de três anos a sazonalidade anual não é estimável
+MESES_MINIMOS = 36
+
+# usados dentro de escolher_modelo; carregados no início de cada processo
+BIBLIOTECAS_AJUSTE = ["pmdarima", "statsmodels.tsa.statespace.sarimax"]
+
+# o reajuste com as ordens anteriores é aceito se o AIC por mês não subir mais
+# que isto em relação ao último ajuste e o Ljung-Box não rejeitar resíduos
+# independentes ao nível abaixo
+TOLERANCIA_AIC_MES = 0.05
+NIVEL_LJUNG_BOX = 0.05
+DEFASAGENS_LJUNG_BOX = 24
+
+# limites das ordens testadas na vizinhança (os mesmos padrões do auto_arima)
+MAX_ORDEM = 5
+MAX_ORDEM_SAZONAL = 2
+
+# mesmos meses de src/previsao.py (Pandemia = 1 no CSV de mamografias do DF)
+INICIO_PANDEMIA = pd.Timestamp("2020-05-01")
+FIM_PANDEMIA = pd.Timestamp("2020-09-01")
+
+SQL_SERIES = """
+    SELECT id_uf, id_tipo_exame, ano, mes, quantidade
+    FROM exame_realizado
+    ORDER BY id_uf, id_tipo_exame, ano, mes;
+"""
+
+SQL_MODELOS = """
+    SELECT id_uf, id_tipo_exame, p, d, q, p_sazonal, d_sazonal, q_sazonal,
+           aic, bic, ljung_box_p, meses, sha256_serie
+    FROM modelo_previsao;
+"""
+
+CHAVE_MODELO = ["id_uf", "id_tipo_exame"]
+ORDENS = ["p", "d", "q", "p_sazonal", "d_sazonal", "q_sazonal"]
+COLUNAS_MODELO = CHAVE_MODELO + ORDENS + [
+    "periodo", "aic", "bic", "ljung_box_p", "busca", "meses", "ultimo_ano", "ultimo_mes",
+    "sha256_serie", "status", "segundos", "ajustado_em",
+]
+
+CHAVE_PREVISAO = ["id_uf", "id_tipo_exame", "ano", "mes"]
+COLUNAS_PREVISAO = CHAVE_PREVISAO + ["quantidade_prevista", "limite_inferior", "limite_superior"]
+
+
+class TempoEsgotado(Exception):
+    pass
+
+
+@contextmanager
+def limite_de_tempo(segundos: int):
+    # SIGALRM interrompe o ajuste no processo que o executa; sem ele
+    # (Windows) a série roda até o fim
+    if segundos <= 0 or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def estourou(signum, frame):
+        raise TempoEsgotado(f"mais de {segundos}s")
+
+    anterior = signal.signal(signal.SIGALRM, estourou)
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+
+def consultar(conn, sql: str) -> pd.DataFrame:
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        colunas = [c.name for c in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=colunas)
+
+
+def montar_series(df: pd.DataFrame) -> dict:
+    # (id_uf, id_tipo_exame) -> Series mensal contínua (mês sem registro = 0)
+    df = df.assign(data=pd.to_datetime(dict(year=df["ano"], month=df["mes"], day=1)))
+    series = {}
+    for chave, grupo in df.groupby(CHAVE_MODELO, sort=True):
+        serie = grupo.set_index("data")["quantidade"].astype(float)
+        series[chave] = serie.asfreq("MS", fill_value=0.0)
+    return series
+
+
+def pandemia(datas: pd.DatetimeIndex) -> np.ndarray:
+    return ((datas >= INICIO_PANDEMIA) & (datas <= FIM_PANDEMIA)).astype(float).reshape(-1, 1)
+
+
+def hash_serie(serie: pd.Series) -> str:
+    conteudo = serie.to_csv(header=False, date_format="%Y-%m")
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def ordens_anteriores(anterior):
+    # ((p, d, q), (P, D, Q, 12)) do último ajuste bem-sucedido, ou None
+    if anterior is None or anterior["p"] is None:
+        return None
+    return (
+        (anterior["p"], anterior["d"], anterior["q"]),
+        (anterior["p_sazonal"], anterior["d_sazonal"], anterior["q_sazonal"], PERIODO_SAZONAL),
+    )
+
+
+def vizinhas(ordem: tuple, ordem_sazonal: tuple) -> list:
+    # ordens a ±1 em p, q, P e Q (diferenciações fixas), dentro dos limites
+    p, d, q = ordem
+    P, D, Q, m = ordem_sazonal
+    candidatas = []
+    for dp, dq, dP, dQ in [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0),
+                           (0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1)]:
+        novas = (p + dp, q + dq, P + dP, Q + dQ)
+        if min(novas) < 0 or max(novas[:2]) > MAX_ORDEM or max(novas[2:]) > MAX_ORDEM_SAZONAL:
+            continue
+        candidatas.append(((novas[0], d, novas[1]), (novas[2], D, novas[3], m)))
+    return candidatas
+
+
+def ajustar_ordens(serie: pd.Series, exog, ordem: tuple, ordem_sazonal: tuple):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    return SARIMAX(serie, exog=exog, order=ordem, seasonal_order=ordem_sazonal).fit(disp=False)
+
+
+def ljung_box(ajuste) -> float:
+    # p-valor na maior defasagem (resíduos padronizados, sem o período de aquecimento)
+    defasagens = min(DEFASAGENS_LJUNG_BOX, ajuste.nobs // 5)
+    return float(ajuste.test_serial_correlation("ljungbox", lags=defasagens)[0, 1, -1])
+
+
+def degradou(ajuste, anterior) -> bool:
+    # AIC cresce com o número de meses: compara-se o AIC por mês
+    if ljung_box(ajuste) < NIVEL_LJUNG_BOX:
+        return True
+    if anterior["aic"] is None:
+        return False
+    return ajuste.aic / ajuste.nobs - anterior["aic"] / anterior["meses"] > TOLERANCIA_AIC_MES
+
+
+def escolher_modelo(serie: pd.Series, exog, anterior, busca_completa: bool):
+    # (ajuste, busca): reaproveita as ordens anteriores sempre que possível
+    ordens = None if busca_completa else ordens_anteriores(anterior)
+
+    if ordens is None:
+        import pmdarima as pm
+
+        busca = pm.auto_arima(
+            serie.to_numpy(),
+            X=exog,
+            m=PERIODO_SAZONAL,
+            seasonal=True,
+            stepwise=True,
+            suppress_warnings=True,
+            error_action="ignore",
+        )
+        return ajustar_ordens(serie, exog, busca.order, busca.seasonal_order), "completa"
+
+    ajuste = ajustar_ordens(serie, exog, *ordens)
+    if not degradou(ajuste, anterior):
+        return ajuste, "reajuste"
+
+    # a vizinhança só substitui as ordens anteriores se tiver AIC menor
+    melhor = ajuste
+    for ordem, ordem_sazonal in vizinhas(*ordens):
+        try:
+            candidato = ajustar_ordens(serie, exog, ordem, ordem_sazonal)
+        except Exception:
+            continue
+        if candidato.aic < melhor.aic:
+            melhor = candidato
+    return melhor, "vizinhanca"
+
+
+def ajustar_serie(chave: tuple, serie: pd.Series, anterior, tempo_limite: int, busca_completa: bool = False) -> dict:
+    # roda nos processos do pool: só cálculo, sem acesso ao banco
+    inicio = time.perf_counter()
+    exog = pandemia(serie.index)
+    # série que começa depois da pandemia: regressor todo zero fica de fora
+    usar_exog = bool(exog.any())
+
+    try:
+        with limite_de_tempo(tempo_limite), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            ajuste, busca = escolher_modelo(serie, exog if usar_exog else None, anterior, busca_completa)
+
+            datas = pd.date_range(serie.index[-1] + pd.DateOffset(months=1), periods=HORIZONTE_PREVISAO, freq="MS")
+            futuro = np.zeros((HORIZONTE_PREVISAO, 1)) if usar_exog else None
+            previsao = ajuste.get_forecast(steps=HORIZONTE_PREVISAO, exog=futuro).summary_frame(alpha=0.05)
+            ljung_box_p = ljung_box(ajuste)
+    except TempoEsgotado as e:
+        return {"chave": chave, "status": "tempo_esgotado", "erro": str(e), "segundos": time.perf_counter() - inicio}
+    except Exception as e:
+        return {"chave": chave, "status": "erro", "erro": str(e), "segundos": time.perf_counter() - inicio}
+
+    p, d, q = ajuste.model.order
+    p_sazonal, d_sazonal, q_sazonal, _ = ajuste.model.seasonal_order
+    return {
+        "chave": chave,
+        "status": "ok",
+        "busca": busca,
+        "ordens": dict(p=p, d=d, q=q, p_sazonal=p_sazonal, d_sazonal=d_sazonal, q_sazonal=q_sazonal),
+        "aic": float(ajuste.aic),
+        "bic": float(ajuste.bic),
+        "ljung_box_p": ljung_box_p,
+        "previsao": pd.DataFrame({
+            "ano": datas.year,
+            "mes": datas.month,
+            "quantidade_prevista": previsao["mean"].to_numpy(),
+            "limite_inferior": previsao["mean_ci_lower"].to_numpy(),
+            "limite_superior": previsao["mean_ci_upper"].to_numpy(),
+        }),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def carregar_bibliotecas() -> None:
+    # importa as bibliotecas de ajuste uma vez por processo, antes de qualquer
+    # tempo limite: um SIGALRM no meio do import deixaria o módulo pela metade
+    # e todas as séries seguintes do processo falhariam
+    for modulo in BIBLIOTECAS_AJUSTE:
+        importlib.import_module(modulo)
+
+
+def ajustar_series(tarefas: list, busca_completa: bool = False) -> list:
+    # tarefas: (chave, série, modelo anterior ou None); uma série por processo
+    if PROCESSOS <= 1 or len(tarefas) <= 1:
+        carregar_bibliotecas()
+        return [
+            ajustar_serie(chave, serie, anterior, TEMPO_LIMITE_SERIE, busca_completa)
+            for chave, serie, anterior in tarefas
+        ]
+
+    resultados = []
+    with ProcessPoolExecutor(max_workers=min(PROCESSOS, len(tarefas)), initializer=carregar_bibliotecas) as pool:
+        futuros = {
+            pool.submit(ajustar_serie, chave, serie, anterior, TEMPO_LIMITE_SERIE, busca_completa): chave
+            for chave, serie, anterior in tarefas
+        }
+        for futuro in as_completed(futuros):
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                # processo do pool encerrado (ex.: falta de memória)
+                resultados.append({"chave": futuros[futuro], "status": "erro", "erro": str(e), "segundos": 0.0})
+    return resultados
+
+
+def linha_modelo(resultado: dict, serie: pd.Series, anterior) -> dict:
+    # falha mantém as ordens, os critérios, os meses e o hash do último ajuste
+    # bem-sucedido (o AIC por mês de degradou usa o aic e os meses juntos):
+    # se a série mudou, ela é tentada de novo na próxima execução
+    id_uf, id_tipo_exame = resultado["chave"]
+    linha = {"id_uf": id_uf, "id_tipo_exame": id_tipo_exame, "periodo": PERIODO_SAZONAL, "meses": len(serie)}
+
+    if resultado["status"] == "ok":
+        linha.update(
+            resultado["ordens"],
+            aic=resultado["aic"],
+            bic=resultado["bic"],
+            ljung_box_p=resultado["ljung_box_p"],
+            busca=resultado["busca"],
+            sha256_serie=hash_serie(serie),
+        )
+    elif resultado["status"] == "curta":
+        # só volta a ser avaliada quando a série mudar
+        linha.update({c: None for c in ORDENS + ["aic", "bic", "ljung_box_p", "busca"]}, sha256_serie=hash_serie(serie))
+    else:
+        anterior = anterior or {}
+        linha.update({c: anterior.get(c) for c in ORDENS + ["aic", "bic", "ljung_box_p", "sha256_serie"]}, busca=None)
+        if anterior.get("meses") is not None:
+            linha["meses"] = anterior["meses"]
+
+    linha.update(
+        ultimo_ano=serie.index[-1].year,
+        ultimo_mes=serie.index[-1].month,
+        status=resultado["status"],
+        segundos=round(resultado["segundos"], 3),
+        ajustado_em=pd.Timestamp.now().floor("s"),
+    )
+    return linha
+
+
+def gravar_resultados(conn, linhas_modelo: list, previsoes: list) -> None:
+    # modelos primeiro (a previsão referencia modelo_previsao)
+    carregar_via_copy(conn, "modelo_previsao", COLUNAS_MODELO, pd.DataFrame(linhas_modelo), CHAVE_MODELO)
+
+    if not previsoes:
+        return
+
+    # a previsão de cada série reajustada substitui a anterior inteira
+    # (meses que viraram histórico saem), na mesma transação da carga
+    df = pd.concat(previsoes, ignore_index=True)
+    chaves = df[CHAVE_MODELO].drop_duplicates()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM previsao_exame pe
+            USING unnest(%s::int[], %s::int[]) AS s(id_uf, id_tipo_exame)
+            WHERE pe.id_uf = s.id_uf AND pe.id_tipo_exame = s.id_tipo_exame;
+            """,
+            (chaves["id_uf"].tolist(), chaves["id_tipo_exame"].tolist()),
+        )
+    carregar_via_copy(conn, "previsao_exame", COLUNAS_PREVISAO, df, CHAVE_PREVISAO)
+
+
+def executar(conn, todas: bool = False, busca_completa: bool = False) -> None:
+    inicio_total = time.perf_counter()
+
+    series = montar_series(consultar(conn, SQL_SERIES))
+    # (id_uf, id_tipo_exame) -> último modelo gravado (ordens, critérios e hash),
+    # com os tipos do banco (ordens int ou None)
+    with conn.cursor() as cur:
+        cur.execute(SQL_MODELOS)
+        colunas = [c.name for c in cur.description]
+        anteriores = {(linha[0], linha[1]): dict(zip(colunas, linha)) for linha in cur.fetchall()}
+    conn.rollback()
+
+    tarefas = []
+    linhas_modelo = []
+    inalteradas = 0
+    for chave, serie in series.items():
+        anterior = anteriores.get(chave)
+        if not todas and anterior is not None and anterior["sha256_serie"] == hash_serie(serie):
+            inalteradas += 1
+            continue
+        if len(serie) < MESES_MINIMOS:
+            linhas_modelo.append(linha_modelo({"chave": chave, "status": "curta", "segundos": 0.0}, serie, anterior))
+            continue
+        tarefas.append((chave, serie, anterior))
+
+    print(f"{len(series)} séries: {len(tarefas)} para ajustar, {inalteradas} sem alteração, "
+          f"{len(linhas_modelo)} curtas demais (< {MESES_MINIMOS} meses).")
+
+    inicio = time.perf_counter()
+    resultados = ajustar_series(tarefas, busca_completa)
+    print(f"{len(resultados)} séries ajustadas em {time.perf_counter() - inicio:.2f}s "
+          f"com até {PROCESSOS} processos (limite de {TEMPO_LIMITE_SERIE}s por série).")
+    buscas = pd.Series([r["busca"] for r in resultados if r["status"] == "ok"], dtype=object)
+    if not buscas.empty:
+        print("Ordens: " + ", ".join(f"{n} {b}" for b, n in buscas.value_counts().items()))
+
+    previsoes = []
+    for resultado in sorted(resultados, key=lambda r: r["chave"]):
+        chave = resultado["chave"]
+        linhas_modelo.append(linha_modelo(resultado, series[chave], anteriores.get(chave)))
+
+        if resultado["status"] == "ok":
+            previsoes.append(resultado["previsao"].assign(id_uf=chave[0], id_tipo_exame=chave[1]))
+            o = resultado["ordens"]
+            print(f"  {chave}: ({o['p']},{o['d']},{o['q']})({o['p_sazonal']},{o['d_sazonal']},{o['q_sazonal']},12) "
+                  f"AIC {resultado['aic']:.1f}, Ljung-Box p={resultado['ljung_box_p']:.2f} "
+                  f"({resultado['busca']}) em {resultado['segundos']:.2f}s")
+        else:
+            print(f"  [AVISO] {chave}: {resultado['status']} ({resultado['erro']}); mantida a previsão anterior.")
+
+    if linhas_modelo:
+        gravar_resultados(conn, linhas_modelo, previsoes)
+
+    print(f"\nPrevisão em lote concluída em {time.perf_counter() - inicio_total:.2f}s")
+
+
+def main():
+    conn = get_conn()
+    try:
+        executar(
+            conn,
+            todas="--todas" in sys.argv[1:] or "--busca-completa" in sys.argv[1:],
+            busca_completa="--busca-completa" in sys.argv[1:],
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import threading
+import numpy as np
+import pandas as pd
+from psycopg2.pool import PoolError
+from config_db import get_conn
+from entidades import ENTIDADES, chave_entidade, normalizar_nome
+
+# Sessão compartilhada dos scripts de ETL: pool de conexões e tabelas de
+# dimensão carregadas uma vez em dicionários (chave normalizada -> id).
+# A chave normalizada ignora espaços, maiúsculas e acentos e, para as
+# entidades de entidades.py, também os apelidos ("Itapoa", "Riacho Fundo Ii"
+# e "Riacho Fundo II" resolvem para o mesmo id); os ids das colunas de um
+# DataFrame são resolvidos de uma vez por merge em resolver_ids.
+
+CONSULTAS_DIMENSOES = {
+    "uf": "SELECT sigla, id_uf FROM unidade_da_federacao;",
+    "ra": "SELECT nome, id_ra FROM regiao_administrativa;",
+    "tipo_exame": "SELECT nome, id_tipo_exame FROM tipo_exame;",
+    "tipo_equipamento": "SELECT nome, id_tipo_equipamento FROM tipo_equipamento;",
+    "categoria": "SELECT nome, id_categoria FROM categoria_profissional;",
+    "pagina": "SELECT url, id_pagina FROM pagina_portal;",
+}
+
+# URLs são comparadas exatamente como estão gravadas
+DIMENSOES_CHAVE_EXATA = {"pagina"}
+
+
+class PoolETL:
+    # pool de conexões entre threads com a interface do psycopg2 (getconn,
+    # putconn, closeall); as conexões são abertas por config_db.get_conn, com
+    # a mesma configuração dos scripts, que não expõe o DSN
+    def __init__(self, minconn: int, maxconn: int):
+        self.maxconn = maxconn
+        self._livres = [get_conn() for _ in range(minconn)]
+        self._em_uso = {}
+        self._trava = threading.Lock()
+
+    def getconn(self):
+        with self._trava:
+            if self._livres:
+                conn = self._livres.pop()
+            elif len(self._em_uso) < self.maxconn:
+                conn = get_conn()
+            else:
+                raise PoolError("Pool de conexões esgotado.")
+            self._em_uso[id(conn)] = conn
+            return conn
+
+    def putconn(self, conn) -> None:
+        with self._trava:
+            self._em_uso.pop(id(conn), None)
+            if conn.closed:
+                return
+            # transação pendente não volta para o pool
+            conn.rollback()
+            self._livres.append(conn)
+
+    def closeall(self) -> None:
+        with self._trava:
+            for conn in self._livres + list(self._em_uso.values()):
+                if not conn.closed:
+                    conn.close()
+            self._livres = []
+            self._em_uso = {}
+
+
+def criar_pool(minconn: int = 1, maxconn: int = 4) -> PoolETL:
+    return PoolETL(minconn, maxconn)
+
+
+def chave_dimensao(dimensao: str, valor):
+    # RA, UF e tipos de exame/equipamento usam a chave do nome canônico
+    # (entidades.py), então apelidos e grafias antigas caem no mesmo id
+    if dimensao in DIMENSOES_CHAVE_EXATA:
+        return valor
+    if dimensao in ENTIDADES:
+        return chave_entidade(dimensao, valor)
+    return normalizar_nome(valor)
+
+
+def chaves_dimensao(dimensao: str, valores: pd.Series) -> pd.Series:
+    # chave_dimensao para a coluna inteira, calculada uma vez por valor distinto
+    if dimensao in DIMENSOES_CHAVE_EXATA:
+        return valores.astype("string")
+
+    categorias = valores.astype("string").astype("category")
+    chaves = [chave_dimensao(dimensao, c) for c in categorias.cat.categories]
+    chaves = np.array(chaves + [None], dtype=object)
+    return pd.Series(chaves[categorias.cat.codes.to_numpy()], index=valores.index, dtype="string")
+
+
+def carregar_dimensoes(conn) -> dict:
+    dimensoes = {}
+    with conn.cursor() as cur:
+        for nome, sql in CONSULTAS_DIMENSOES.items():
+            cur.execute(sql)
+            dimensoes[nome] = {chave_dimensao(nome, valor): id_ for valor, id_ in cur.fetchall()}
+    return dimensoes
+
+
+def atualizar_dimensao(dimensoes: dict, nome: str, linhas) -> None:
+    # linhas (nome, id) devolvidas pelo INSERT ... RETURNING dos scripts de dimensão
+    dimensoes[nome].update({chave_dimensao(nome, valor): id_ for valor, id_ in linhas})
+
+
+def obter_id(dimensoes: dict, nome: str, valor: str) -> int:
+    id_ = dimensoes[nome].get(chave_dimensao(nome, valor))
+    if id_ is None:
+        raise ValueError(f"Nao foi encontrado registro em {nome} para '{valor}'.")
+    return id_
+
+
+def resolver_ids(df: pd.DataFrame, dimensoes: dict, colunas: dict) -> tuple:
+    # colunas: coluna do df -> (dimensão, coluna de id a criar),
+    # ex.: {"nome_ra": ("ra", "id_ra")}.
+    # Devolve (linhas com todos os ids encontrados, ids como int;
+    #          DataFrame dimensao/valor/linhas com o que não foi encontrado).
+    resolvido = df
+    faltantes = []
+
+    for coluna, (dimensao, coluna_id) in colunas.items():
+        chaves = chaves_dimensao(dimensao, resolvido[coluna])
+
+        tabela = pd.DataFrame({
+            "_chave": pd.Series(list(dimensoes[dimensao].keys()), dtype="string"),
+            coluna_id: pd.Series(list(dimensoes[dimensao].values()), dtype="Int64"),
+        })
+        mesclado = (
+            pd.DataFrame({"_chave": chaves.to_numpy()})
+            .merge(tabela, on="_chave", how="left", validate="many_to_one")
+        )
+        resolvido = resolvido.assign(**{coluna_id: mesclado[coluna_id].to_numpy()})
+
+        sem_id = resolvido.loc[resolvido[coluna_id].isna(), coluna]
+        if not sem_id.empty:
+            contagem = sem_id.value_counts(dropna=False, sort=False)
+            faltantes.append(pd.DataFrame({
+                "dimensao": dimensao,
+                "valor": contagem.index,
+                "linhas": contagem.to_numpy(),
+            }))
+
+    ids = [coluna_id for _, coluna_id in colunas.values()]
+    resolvido = resolvido.dropna(subset=ids).astype({c: "int64" for c in ids})
+
+    if faltantes:
+        nao_encontrados = pd.concat(faltantes, ignore_index=True)
+    else:
+        nao_encontrados = pd.DataFrame({"dimensao": [], "valor": [], "linhas": []})
+    return resolvido, nao_encontrados
+
+
+def avisar_nao_encontrados(nao_encontrados: pd.DataFrame) -> None:
+    for dimensao, grupo in nao_encontrados.groupby("dimensao", sort=False):
+        print(f"[AVISO] Valores sem registro em {dimensao} (linhas descartadas):")
+        for valor, linhas in zip(grupo["valor"], grupo["linhas"]):
+            print(f"   {valor} ({linhas} linhas)")
@@ -0,0 +1,187 @@
+import sys
+from dotenv import load_dotenv
+from config_db import get_conn
+from entidades import grafias
+
+load_dotenv()
+
+# Verificação dos planos das consultas do painel (src/banco.py) depois da
+# migracao_003_indices_particoes.sql: toda leitura das tabelas de fatos deve
+# ser um Index Only Scan, e um filtro por ano deve tocar uma única partição.
+# Com as poucas linhas de teste o planejador prefere varrer a tabela inteira,
+# então a varredura sequencial é desligada na transação: o que se verifica é
+# que existe um índice capaz de responder à consulta sozinho.
+# Para executar (sai com código 1 se algum plano regredir):
+#   python verificar_planos.py
+
+TABELAS_FATOS = [
+    "exame_realizado",
+    "profissional_registrado",
+    "espera_exame",
+    "equipamento_registrado",
+    "populacao",
+    "metrica_wave",
+]
+
+NOME_EXAME_MAMOGRAFIA = "Diagnóstico por Mamografia"
+
+# mesmas consultas de src/banco.py; alterações devem ser feitas nos dois
+CONSULTAS = {
+    "exames_mensais": (
+        """
+        SELECT make_date(er.ano, er.mes, 1) AS "DATE", SUM(er.quantidade) AS "Exames"
+        FROM exame_realizado er
+        JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+        JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+        WHERE uf.sigla = %s AND lower(te.nome) = ANY(%s)
+        GROUP BY er.ano, er.mes
+        ORDER BY er.ano, er.mes;
+        """,
+        ("DF", grafias("tipo_exame", NOME_EXAME_MAMOGRAFIA)),
+    ),
+    "profissionais": (
+        """
+        SELECT cp.nome AS categoria, pr.ano, pr.mes, SUM(pr.quantidade) AS quantidade
+        FROM profissional_registrado pr
+        JOIN categoria_profissional cp ON cp.id_categoria = pr.id_categoria
+        JOIN unidade_da_federacao uf ON uf.id_uf = pr.id_uf
+        WHERE uf.sigla = %s
+        GROUP BY cp.nome, pr.ano, pr.mes
+        ORDER BY pr.ano, pr.mes;
+        """,
+        ("DF",),
+    ),
+    "espera_nacional": (
+        """
+        SELECT uf.sigla AS "UF", ee.ano,
+               ee.qtd_tempo_espera_0_10, ee.qtd_tempo_espera_11_20,
+               ee.qtd_tempo_espera_21_30, ee.qtd_tempo_espera_30_mais
+        FROM espera_exame ee
+        JOIN unidade_da_federacao uf ON uf.id_uf = ee.id_uf
+        JOIN tipo_exame te ON te.id_tipo_exame = ee.id_tipo_exame
+        WHERE lower(te.nome) = ANY(%s)
+        ORDER BY uf.sigla, ee.ano;
+        """,
+        (grafias("tipo_exame", NOME_EXAME_MAMOGRAFIA),),
+    ),
+    "equipamentos_ra": (
+        """
+        SELECT ra.nome AS ra, te.nome AS equipamento, SUM(er.quantidade) AS quantidade
+        FROM regiao_administrativa ra
+        LEFT JOIN equipamento_registrado er
+               ON er.id_ra = ra.id_ra
+              AND er.ano = (SELECT MAX(ano) FROM equipamento_registrado)
+        LEFT JOIN tipo_equipamento te ON te.id_tipo_equipamento = er.id_tipo_equipamento
+        GROUP BY ra.nome, te.nome;
+        """,
+        (),
+    ),
+    "populacao_ra": (
+        """
+        SELECT ra.nome, p.populacao_total, p.populacao_sem_plano_saude, p.populacao_plano_saude
+        FROM populacao p
+        JOIN regiao_administrativa ra ON ra.id_ra = p.id_ra
+        WHERE p.ano = (SELECT MAX(ano) FROM populacao);
+        """,
+        (),
+    ),
+    "wave": (
+        """
+        SELECT pp.id_pagina, pp.url, mw.errors, mw.contrast_errors, mw.alerts, mw.aim_score
+        FROM metrica_wave mw
+        JOIN pagina_portal pp ON pp.id_pagina = mw.id_pagina
+        WHERE mw.data_coleta = (SELECT MAX(data_coleta) FROM metrica_wave)
+        ORDER BY pp.id_pagina;
+        """,
+        (),
+    ),
+}
+
+# (consulta, parâmetros, tabela particionada, partições esperadas)
+CONSULTAS_PODA = {
+    "exames_um_ano": (
+        "SELECT SUM(quantidade) FROM exame_realizado WHERE id_uf = %s AND ano = %s;",
+        (1, 2020),
+        "exame_realizado",
+        1,
+    ),
+    "profissionais_um_ano": (
+        "SELECT SUM(quantidade) FROM profissional_registrado WHERE id_uf = %s AND ano = %s;",
+        (1, 2020),
+        "profissional_registrado",
+        1,
+    ),
+}
+
+
+def tabela_de(relacao: str):
+    # partições (exame_realizado_2020, ..._outros) contam como a tabela mãe
+    for tabela in TABELAS_FATOS:
+        if relacao == tabela or relacao.startswith(tabela + "_"):
+            return tabela
+    return None
+
+
+def varreduras(plano: dict) -> list:
+    # (tipo do nó, relação) de todos os nós que leem uma tabela
+    nos = []
+    pilha = [plano]
+    while pilha:
+        no = pilha.pop()
+        if "Relation Name" in no:
+            nos.append((no["Node Type"], no["Relation Name"]))
+        pilha.extend(no.get("Plans", []))
+    return nos
+
+
+def explicar(cur, sql: str, parametros: tuple) -> list:
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, parametros)
+    return varreduras(cur.fetchone()[0][0]["Plan"])
+
+
+def verificar(conn) -> list:
+    falhas = []
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off;")
+        cur.execute("SET LOCAL enable_bitmapscan = off;")
+
+        for nome, (sql, parametros) in CONSULTAS.items():
+            nos = [(tipo, rel) for tipo, rel in explicar(cur, sql, parametros) if tabela_de(rel)]
+            ruins = [(tipo, rel) for tipo, rel in nos if tipo != "Index Only Scan"]
+            status = "OK" if nos and not ruins else "FALHOU"
+            print(f"[{status}] {nome}: {len(nos)} leituras de fatos, {len(ruins)} fora do índice")
+            for tipo, rel in ruins:
+                print(f"    {rel}: {tipo}")
+            if status != "OK":
+                falhas.append(nome)
+
+        for nome, (sql, parametros, tabela, esperadas) in CONSULTAS_PODA.items():
+            # a própria tabela mãe na leitura quer dizer que ela não está particionada
+            particoes = {
+                rel for _, rel in explicar(cur, sql, parametros)
+                if tabela_de(rel) == tabela and rel != tabela
+            }
+            status = "OK" if len(particoes) == esperadas else "FALHOU"
+            print(f"[{status}] {nome}: {len(particoes)} partições lidas (esperado {esperadas})")
+            if status != "OK":
+                falhas.append(nome)
+
+    conn.rollback()
+    return falhas
+
+
+def main():
+    conn = get_conn()
+    try:
+        falhas = verificar(conn)
+    finally:
+        conn.close()
+
+    if falhas:
+        print(f"\nPlanos com regressão: {falhas}")
+        sys.exit(1)
+    print("\nTodas as consultas do painel leem as tabelas de fatos só pelos índices.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Views materializadas dos KPIs do painel (migracao_004_visoes_kpi.sql),
+# atualizadas pelo executar_etl.py ao fim de cada carga. Cada view é
+# atualizada em uma conexão própria do pool, todas ao mesmo tempo, com
+# REFRESH ... CONCURRENTLY: o painel continua lendo a versão anterior até o
+# fim da atualização.
+
+VISOES_KPI = [
+    "kpi_exame_mais_requisitado",
+    "kpi_ra_mais_vulneravel",
+    "kpi_mes_com_mais_mamografias",
+    "kpi_links_sem_https",
+]
+
+
+def visoes_existentes(conn) -> dict:
+    # view -> já populada (o CONCURRENTLY exige uma primeira carga sem ele)
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT matviewname, ispopulated FROM pg_matviews WHERE matviewname = ANY(%s);",
+            (VISOES_KPI,),
+        )
+        visoes = dict(cur.fetchall())
+    conn.rollback()
+    return visoes
+
+
+def atualizar_visao(pool, visao: str, populada: bool) -> float:
+    inicio = time.perf_counter()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            modo = "CONCURRENTLY " if populada else ""
+            cur.execute(f"REFRESH MATERIALIZED VIEW {modo}{visao};")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+    return time.perf_counter() - inicio
+
+
+def atualizar_visoes_kpi(pool, conn) -> None:
+    visoes = visoes_existentes(conn)
+    faltantes = [v for v in VISOES_KPI if v not in visoes]
+    if faltantes:
+        print(f"[AVISO] Views de KPI inexistentes (aplicar migracao_004_visoes_kpi.sql): {faltantes}")
+
+    with ThreadPoolExecutor(max_workers=max(len(visoes), 1)) as executor:
+        tarefas = {
+            visao: executor.submit(atualizar_visao, pool, visao, populada)
+            for visao, populada in visoes.items()
+        }
+        for visao, tarefa in tarefas.items():
+            print(f"{visao} atualizada em {tarefa.result():.2f}s")
@@ -2,7 +2,9 @@
 CREATE TABLE unidade_da_federacao (
     id_uf        SERIAL PRIMARY KEY,
     sigla        VARCHAR(2) NOT NULL,	
-    nome         VARCHAR(100) NOT NULL
+    nome         VARCHAR(100) NOT NULL,
+    CONSTRAINT unq_uf_sigla
+        UNIQUE (sigla)
 );
 
 -- Tabela de regiões administrativas
@@ -12,31 +14,41 @@ CREATE TABLE regiao_administrativa (
     id_uf        INTEGER      NOT NULL,
     CONSTRAINT fk_ra_uf
         FOREIGN KEY (id_uf)
-        REFERENCES unidade_da_federacao (id_uf)
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT unq_ra_uf_nome
+        UNIQUE (id_uf, nome)
 );
 
 -- Tipos de exame (mamografia, raio X, etc.)
 CREATE TABLE tipo_exame (
     id_tipo_exame  SERIAL PRIMARY KEY,
     nome           VARCHAR(100) NOT NULL,
-    descricao      TEXT
+    descricao      TEXT,
+    CONSTRAINT unq_tipo_exame_nome
+        UNIQUE (nome)
 );
 
--- Produção de exames por tipo, região e período
+-- Produção de exames por tipo, região e período (particionada por ano).
+-- A chave natural começa por UF e tipo e inclui a quantidade: a série mensal
+-- do painel (uma UF, um tipo, todos os meses) é lida só do índice.
 CREATE TABLE exame_realizado (
-    id_exame                SERIAL PRIMARY KEY,
+    id_exame                SERIAL,
     id_tipo_exame           INTEGER   NOT NULL,
     id_uf                   INTEGER   NOT NULL,
     ano                     SMALLINT  NOT NULL,
     mes                     SMALLINT  NOT NULL,
     quantidade              INTEGER   NOT NULL,
+    CONSTRAINT pk_exame_realizado
+        PRIMARY KEY (id_exame, ano),
     CONSTRAINT fk_exame_tipo
         FOREIGN KEY (id_tipo_exame)
         REFERENCES tipo_exame (id_tipo_exame),
     CONSTRAINT fk_exame_uf
         FOREIGN KEY (id_uf)
-        REFERENCES unidade_da_federacao (id_uf)
-);
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT unq_exame_uf_tipo_periodo
+        UNIQUE (id_uf, id_tipo_exame, ano, mes) INCLUDE (quantidade)
+) PARTITION BY RANGE (ano);
 
 -- Tipos de equipamento (mamógrafo, tomógrafo, etc.)
 CREATE TABLE tipo_equipamento (
@@ -46,23 +58,32 @@ CREATE TABLE tipo_equipamento (
     quantidade_publico   INTEGER   NOT NULL,
     quantidade_privado   INTEGER   NOT NULL,
     quantidade_funcionando_sus INTEGER NOT NULL,
-    quantidade_parado_sus    INTEGER   NOT NULL
+    quantidade_parado_sus    INTEGER   NOT NULL,
+    CONSTRAINT unq_tipo_equipamento_nome
+        UNIQUE (nome)
 );
 
 -- Registro agregado de equipamentos por RA e ano
 CREATE TABLE equipamento_registrado (
     id_registro          SERIAL PRIMARY KEY,
     id_tipo_equipamento  INTEGER   NOT NULL,
-    id_uf                INTEGER   NOT NULL,
+    id_ra                INTEGER   NOT NULL,
     ano                  SMALLINT  NOT NULL,
+    quantidade           INTEGER   NOT NULL,
     CONSTRAINT fk_equip_tipo
         FOREIGN KEY (id_tipo_equipamento)
         REFERENCES tipo_equipamento (id_tipo_equipamento),
-    CONSTRAINT fk_equip_uf
-        FOREIGN KEY (id_uf)
-        REFERENCES unidade_da_federacao (id_uf)
+    CONSTRAINT fk_equip_ra
+        FOREIGN KEY (id_ra)
+        REFERENCES regiao_administrativa (id_ra),
+    CONSTRAINT unq_equip_tipo_ra_ano
+        UNIQUE (id_tipo_equipamento, id_ra, ano)
 );
 
+-- painel lê só o ano mais recente
+CREATE INDEX idx_equip_ano
+    ON equipamento_registrado (ano, id_ra, id_tipo_equipamento) INCLUDE (quantidade);
+
 -- População por região administrativa e ano
 CREATE TABLE populacao (
     id_pop              SERIAL PRIMARY KEY,
@@ -73,19 +94,27 @@ CREATE TABLE populacao (
     populacao_sem_plano_saude INTEGER NOT NULL,
     CONSTRAINT fk_pop_ra
         FOREIGN KEY (id_ra)
-        REFERENCES regiao_administrativa (id_ra)
+        REFERENCES regiao_administrativa (id_ra),
+    CONSTRAINT unq_pop_ra_ano
+        UNIQUE (id_ra, ano)
 );
 
+CREATE INDEX idx_pop_ano
+    ON populacao (ano, id_ra) INCLUDE (populacao_total, populacao_plano_saude, populacao_sem_plano_saude);
+
 -- Categorias profissionais (técnico, auxiliar, radiologista etc.)
 CREATE TABLE categoria_profissional (
     id_categoria  SERIAL PRIMARY KEY,
     nome          VARCHAR(100) NOT NULL,
-    descricao     TEXT
+    descricao     TEXT,
+    CONSTRAINT unq_categoria_nome
+        UNIQUE (nome)
 );
 
--- Quantidade de profissionais por categoria, RA e ano
+-- Quantidade de profissionais por categoria, UF e mês (particionada por ano);
+-- a chave natural começa pela UF, o filtro das consultas do painel
 CREATE TABLE profissional_registrado (
-    id_prof       SERIAL PRIMARY KEY,
+    id_prof       SERIAL,
     id_categoria  INTEGER   NOT NULL,
     id_uf         INTEGER   NOT NULL,
     ano           SMALLINT  NOT NULL,
@@ -96,15 +125,21 @@ CREATE TABLE profissional_registrado (
         REFERENCES categoria_profissional (id_categoria),
     CONSTRAINT fk_prof_uf
         FOREIGN KEY (id_uf)
-        REFERENCES unidade_da_federacao (id_uf)
-);
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT pk_profissional_registrado
+        PRIMARY KEY (id_prof, ano),
+    CONSTRAINT unq_prof_uf_categoria_periodo
+        UNIQUE (id_uf, id_categoria, ano, mes) INCLUDE (quantidade)
+) PARTITION BY RANGE (ano);
 
 -- Páginas do portal (DataSUS, TABNET etc.)
 CREATE TABLE pagina_portal (
     id_pagina  SERIAL PRIMARY KEY,
-    nome       VARCHAR(150) NOT NULL,
+    nome       TEXT         NOT NULL,
     url        TEXT         NOT NULL,
-    sistema    VARCHAR(100) NOT NULL
+    sistema    VARCHAR(100) NOT NULL,
+    CONSTRAINT unq_pagina_url
+        UNIQUE (url)
 );
 
 -- Métricas de acessibilidade WAVE por página e data de coleta
@@ -118,9 +153,16 @@ CREATE TABLE metrica_wave (
     aim_score      NUMERIC(4,2),
     CONSTRAINT fk_wave_pagina
         FOREIGN KEY (id_pagina)
-        REFERENCES pagina_portal (id_pagina)
+        REFERENCES pagina_portal (id_pagina),
+    CONSTRAINT unq_wave_pagina_coleta
+        UNIQUE (id_pagina, data_coleta)
+        INCLUDE (errors, contrast_errors, alerts, aim_score)
 );
 
+-- painel lê só a coleta mais recente (as duas ordens cobrem a consulta)
+CREATE INDEX idx_wave_coleta
+    ON metrica_wave (data_coleta, id_pagina) INCLUDE (errors, contrast_errors, alerts, aim_score);
+
 CREATE TABLE espera_exame (
     id_espera               SERIAL PRIMARY KEY,
     id_uf                   INTEGER NOT NULL,
@@ -136,6 +178,209 @@ CREATE TABLE espera_exame (
     CONSTRAINT fk_espera_tipo
         FOREIGN KEY (id_tipo_exame)
         REFERENCES tipo_exame (id_tipo_exame),
-    CONSTRAINT unq_espera_uf_exame_ano
-        UNIQUE (id_uf, id_tipo_exame, ano)
+    CONSTRAINT unq_espera_exame_uf_ano
+        UNIQUE (id_tipo_exame, id_uf, ano)
+        INCLUDE (qtd_tempo_espera_0_10, qtd_tempo_espera_11_20, qtd_tempo_espera_21_30, qtd_tempo_espera_30_mais)
+);
+
+-- Estado da carga incremental do ETL: hash do arquivo de origem e último
+-- período carregado (AAAAMM para séries mensais, AAAA para anuais)
+CREATE TABLE etl_estado (
+    arquivo         TEXT        PRIMARY KEY,
+    etapa           VARCHAR(50) NOT NULL,
+    sha256          CHAR(64)    NOT NULL,
+    ultimo_periodo  INTEGER,
+    linhas          INTEGER     NOT NULL,
+    carregado_em    TIMESTAMP   NOT NULL DEFAULT now()
+);
+
+-- Partições anuais das tabelas de fatos mensais (a partição DEFAULT recebe
+-- anos fora do intervalo; novos anos: SELECT criar_particoes_ano(...))
+CREATE OR REPLACE FUNCTION criar_particoes_ano(tabela TEXT, ano_inicial INTEGER, ano_final INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    ano INTEGER;
+BEGIN
+    FOR ano IN ano_inicial..ano_final LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%s) TO (%s);',
+            tabela || '_' || ano, tabela, ano, ano + 1
+        );
+    END LOOP;
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT;', tabela || '_outros', tabela);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT criar_particoes_ano('exame_realizado', 2005, 2035);
+SELECT criar_particoes_ano('profissional_registrado', 2005, 2035);
+
+-- Views materializadas dos KPIs do painel (src/funcoes.py), uma linha por KPI,
+-- atualizadas pelo executar_etl.py com REFRESH MATERIALIZED VIEW CONCURRENTLY
+
+-- grupo de exames de imagem mais realizado no DF no ano mais recente e a
+-- variação em relação ao ano anterior (a mamografia é um procedimento do grupo
+-- de radiologia e não entra na comparação entre grupos)
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_exame_mais_requisitado AS
+WITH anual AS (
+    SELECT er.ano, te.id_tipo_exame, te.nome AS subgrupo, SUM(er.quantidade) AS quantidade
+    FROM exame_realizado er
+    JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+    JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+    WHERE uf.sigla = 'DF'
+      AND lower(te.nome) NOT IN ('diagnostico por mamografia', 'diagnóstico por mamografia', 'mamografia')
+    GROUP BY er.ano, te.id_tipo_exame, te.nome
+),
+topo AS (
+    SELECT *
+    FROM anual
+    WHERE ano = (SELECT MAX(ano) FROM anual)
+    ORDER BY quantidade DESC, id_tipo_exame
+    LIMIT 1
+)
+SELECT t.ano,
+       t.subgrupo,
+       t.quantidade,
+       t.ano - 1 AS ano_anterior,
+       a.quantidade AS quantidade_anterior,
+       (t.quantidade - a.quantidade) * 100.0 / NULLIF(a.quantidade, 0) AS variacao_percentual
+FROM topo t
+LEFT JOIN anual a ON a.ano = t.ano - 1 AND a.id_tipo_exame = t.id_tipo_exame;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_exame_mais_requisitado
+    ON kpi_exame_mais_requisitado (ano);
+
+-- RA mais vulnerável: menor soma de posições entre o total de equipamentos
+-- (menos = pior) e a proporção da população sem plano de saúde (mais = pior)
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_ra_mais_vulneravel AS
+WITH equipamentos AS (
+    -- a carga só grava quantidades > 0: RA sem equipamento entra com total 0
+    SELECT ra.id_ra, COALESCE(SUM(er.quantidade), 0) AS total_equipamentos
+    FROM regiao_administrativa ra
+    JOIN unidade_da_federacao uf ON uf.id_uf = ra.id_uf
+    LEFT JOIN equipamento_registrado er
+           ON er.id_ra = ra.id_ra
+          AND er.ano = (SELECT MAX(ano) FROM equipamento_registrado)
+    WHERE uf.sigla = 'DF'
+    GROUP BY ra.id_ra
+),
+sem_plano AS (
+    SELECT id_ra, populacao_sem_plano_saude::float8 / NULLIF(populacao_total, 0) AS prop_sem_plano
+    FROM populacao
+    WHERE ano = (SELECT MAX(ano) FROM populacao)
+),
+posicoes AS (
+    SELECT e.id_ra,
+           e.total_equipamentos,
+           s.prop_sem_plano,
+           RANK() OVER (ORDER BY e.total_equipamentos)
+             + CASE WHEN s.prop_sem_plano IS NOT NULL
+                    THEN RANK() OVER (ORDER BY s.prop_sem_plano DESC NULLS LAST)
+               END AS score
+    FROM equipamentos e
+    LEFT JOIN sem_plano s ON s.id_ra = e.id_ra
+)
+SELECT p.id_ra, ra.nome AS ra, p.total_equipamentos, p.prop_sem_plano
+FROM posicoes p
+JOIN regiao_administrativa ra ON ra.id_ra = p.id_ra
+WHERE p.score IS NOT NULL
+ORDER BY p.score, ra.nome COLLATE "C"
+LIMIT 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_ra_mais_vulneravel
+    ON kpi_ra_mais_vulneravel (id_ra);
+
+-- mês com mais mamografias no DF no ano mais recente e o mês de maior volume
+-- do ano anterior
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_mes_com_mais_mamografias AS
+WITH mensal AS (
+    SELECT er.ano, er.mes, SUM(er.quantidade) AS exames
+    FROM exame_realizado er
+    JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+    JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+    WHERE uf.sigla = 'DF'
+      AND lower(te.nome) IN ('diagnostico por mamografia', 'diagnóstico por mamografia', 'mamografia')
+    GROUP BY er.ano, er.mes
+),
+topo AS (
+    SELECT DISTINCT ON (ano) ano, mes, exames
+    FROM mensal
+    ORDER BY ano, exames DESC, mes
+)
+SELECT a.ano,
+       a.mes,
+       a.exames,
+       a.ano - 1 AS ano_anterior,
+       p.mes AS mes_anterior,
+       p.exames AS exames_anterior
+FROM topo a
+LEFT JOIN topo p ON p.ano = a.ano - 1
+WHERE a.ano = (SELECT MAX(ano) FROM mensal);
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_mes_com_mais_mamografias
+    ON kpi_mes_com_mais_mamografias (ano);
+
+-- páginas do portal sem HTTPS na coleta WAVE mais recente
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_links_sem_https AS
+SELECT mw.data_coleta,
+       COUNT(*) AS total,
+       COUNT(*) FILTER (WHERE lower(btrim(pp.url, E' \t\r\n')) NOT LIKE 'https://%') AS sem_https,
+       COUNT(*) FILTER (WHERE lower(btrim(pp.url, E' \t\r\n')) NOT LIKE 'https://%') * 100.0 / COUNT(*) AS perc_sem_https
+FROM metrica_wave mw
+JOIN pagina_portal pp ON pp.id_pagina = mw.id_pagina
+WHERE mw.data_coleta = (SELECT MAX(data_coleta) FROM metrica_wave)
+GROUP BY mw.data_coleta;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_links_sem_https
+    ON kpi_links_sem_https (data_coleta);
+
+-- Previsão em lote (ETL/previsao_lote.py): modelo escolhido por série mensal
+-- de exame_realizado (UF x tipo de exame) e a previsão dos próximos meses
+
+-- Modelo SARIMAX escolhido por série; status: ok, tempo_esgotado, erro, curta;
+-- busca: completa (auto_arima), reajuste (ordens anteriores), vizinhanca (ordens ±1)
+CREATE TABLE modelo_previsao (
+    id_uf           INTEGER          NOT NULL,
+    id_tipo_exame   INTEGER          NOT NULL,
+    p               SMALLINT,
+    d               SMALLINT,
+    q               SMALLINT,
+    p_sazonal       SMALLINT,
+    d_sazonal       SMALLINT,
+    q_sazonal       SMALLINT,
+    periodo         SMALLINT         NOT NULL DEFAULT 12,
+    aic             DOUBLE PRECISION,
+    bic             DOUBLE PRECISION,
+    ljung_box_p     DOUBLE PRECISION,
+    busca           VARCHAR(20),
+    meses           INTEGER          NOT NULL,
+    ultimo_ano      SMALLINT         NOT NULL,
+    ultimo_mes      SMALLINT         NOT NULL,
+    sha256_serie    CHAR(64),
+    status          VARCHAR(20)      NOT NULL,
+    segundos        DOUBLE PRECISION NOT NULL,
+    ajustado_em     TIMESTAMP        NOT NULL DEFAULT now(),
+    CONSTRAINT pk_modelo_previsao
+        PRIMARY KEY (id_uf, id_tipo_exame),
+    CONSTRAINT fk_modelo_previsao_uf
+        FOREIGN KEY (id_uf)
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT fk_modelo_previsao_tipo
+        FOREIGN KEY (id_tipo_exame)
+        REFERENCES tipo_exame (id_tipo_exame)
+);
+
+-- Previsão mensal por série, com o intervalo de 95%
+CREATE TABLE previsao_exame (
+    id_uf               INTEGER          NOT NULL,
+    id_tipo_exame       INTEGER          NOT NULL,
+    ano                 SMALLINT         NOT NULL,
+    mes                 SMALLINT         NOT NULL,
+    quantidade_prevista DOUBLE PRECISION NOT NULL,
+    limite_inferior     DOUBLE PRECISION,
+    limite_superior     DOUBLE PRECISION,
+    CONSTRAINT pk_previsao_exame
+        PRIMARY KEY (id_uf, id_tipo_exame, ano, mes),
+    CONSTRAINT fk_previsao_modelo
+        FOREIGN KEY (id_uf, id_tipo_exame)
+        REFERENCES modelo_previsao (id_uf, id_tipo_exame)
 );
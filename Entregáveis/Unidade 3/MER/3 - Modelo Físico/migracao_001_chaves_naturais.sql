@@ -0,0 +1,82 @@
+-- Migração para bancos criados antes das restrições UNIQUE do
+-- MER_Fisico_Radiologia_DF.sql. Remove as linhas duplicadas pelas cargas
+-- repetidas (fica a de maior id, a mais recente) e cria as chaves naturais
+-- usadas pelo ON CONFLICT dos scripts de ETL.
+-- Executar uma vez: psql -d <banco> -f migracao_001_chaves_naturais.sql
+
+BEGIN;
+
+-- nome da página recebe a URL inteira, que passa de 150 caracteres
+ALTER TABLE pagina_portal ALTER COLUMN nome TYPE TEXT;
+
+-- Fatos duplicados
+DELETE FROM exame_realizado a
+USING exame_realizado b
+WHERE a.id_exame < b.id_exame
+  AND a.id_tipo_exame = b.id_tipo_exame
+  AND a.id_uf = b.id_uf
+  AND a.ano = b.ano
+  AND a.mes = b.mes;
+
+DELETE FROM equipamento_registrado a
+USING equipamento_registrado b
+WHERE a.id_registro < b.id_registro
+  AND a.id_tipo_equipamento = b.id_tipo_equipamento
+  AND a.id_ra = b.id_ra
+  AND a.ano = b.ano;
+
+DELETE FROM populacao a
+USING populacao b
+WHERE a.id_pop < b.id_pop
+  AND a.id_ra = b.id_ra
+  AND a.ano = b.ano;
+
+DELETE FROM profissional_registrado a
+USING profissional_registrado b
+WHERE a.id_prof < b.id_prof
+  AND a.id_categoria = b.id_categoria
+  AND a.id_uf = b.id_uf
+  AND a.ano = b.ano
+  AND a.mes = b.mes;
+
+DELETE FROM metrica_wave a
+USING metrica_wave b
+WHERE a.id_wave < b.id_wave
+  AND a.id_pagina = b.id_pagina
+  AND a.data_coleta = b.data_coleta;
+
+-- Chaves naturais
+ALTER TABLE unidade_da_federacao
+    ADD CONSTRAINT unq_uf_sigla UNIQUE (sigla);
+
+ALTER TABLE regiao_administrativa
+    ADD CONSTRAINT unq_ra_uf_nome UNIQUE (id_uf, nome);
+
+ALTER TABLE tipo_exame
+    ADD CONSTRAINT unq_tipo_exame_nome UNIQUE (nome);
+
+ALTER TABLE tipo_equipamento
+    ADD CONSTRAINT unq_tipo_equipamento_nome UNIQUE (nome);
+
+ALTER TABLE categoria_profissional
+    ADD CONSTRAINT unq_categoria_nome UNIQUE (nome);
+
+ALTER TABLE pagina_portal
+    ADD CONSTRAINT unq_pagina_url UNIQUE (url);
+
+ALTER TABLE exame_realizado
+    ADD CONSTRAINT unq_exame_tipo_uf_periodo UNIQUE (id_tipo_exame, id_uf, ano, mes);
+
+ALTER TABLE equipamento_registrado
+    ADD CONSTRAINT unq_equip_tipo_ra_ano UNIQUE (id_tipo_equipamento, id_ra, ano);
+
+ALTER TABLE populacao
+    ADD CONSTRAINT unq_pop_ra_ano UNIQUE (id_ra, ano);
+
+ALTER TABLE profissional_registrado
+    ADD CONSTRAINT unq_prof_categoria_uf_periodo UNIQUE (id_categoria, id_uf, ano, mes);
+
+ALTER TABLE metrica_wave
+    ADD CONSTRAINT unq_wave_pagina_coleta UNIQUE (id_pagina, data_coleta);
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Tabela de estado da carga incremental (estado_etl.py).
+-- Executar uma vez: psql -d <banco> -f migracao_002_estado_etl.sql
+
+CREATE TABLE IF NOT EXISTS etl_estado (
+    arquivo         TEXT        PRIMARY KEY,
+    etapa           VARCHAR(50) NOT NULL,
+    sha256          CHAR(64)    NOT NULL,
+    ultimo_periodo  INTEGER,
+    linhas          INTEGER     NOT NULL,
+    carregado_em    TIMESTAMP   NOT NULL DEFAULT now()
+);
@@ -0,0 +1,118 @@
+-- Índices de cobertura para as consultas do painel (src/banco.py) e
+-- particionamento anual das tabelas de fatos mensais (exame_realizado e
+-- profissional_registrado), como no MER_Fisico_Radiologia_DF.sql.
+-- As tabelas mensais são recriadas como particionadas e os dados copiados;
+-- os ids e a sequência de cada tabela são mantidos.
+-- Executar uma vez (depois da migracao_001): psql -d <banco> -f migracao_003_indices_particoes.sql
+-- Conferir os planos depois: python ETL/verificar_planos.py
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION criar_particoes_ano(tabela TEXT, ano_inicial INTEGER, ano_final INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    ano INTEGER;
+BEGIN
+    FOR ano IN ano_inicial..ano_final LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%s) TO (%s);',
+            tabela || '_' || ano, tabela, ano, ano + 1
+        );
+    END LOOP;
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT;', tabela || '_outros', tabela);
+END;
+$$ LANGUAGE plpgsql;
+
+-- exame_realizado
+ALTER TABLE exame_realizado RENAME TO exame_realizado_antiga;
+ALTER TABLE exame_realizado_antiga DROP CONSTRAINT unq_exame_tipo_uf_periodo;
+
+CREATE TABLE exame_realizado (
+    id_exame                INTEGER   NOT NULL DEFAULT nextval('exame_realizado_id_exame_seq'),
+    id_tipo_exame           INTEGER   NOT NULL,
+    id_uf                   INTEGER   NOT NULL,
+    ano                     SMALLINT  NOT NULL,
+    mes                     SMALLINT  NOT NULL,
+    quantidade              INTEGER   NOT NULL,
+    CONSTRAINT pk_exame_realizado
+        PRIMARY KEY (id_exame, ano),
+    CONSTRAINT fk_exame_tipo
+        FOREIGN KEY (id_tipo_exame)
+        REFERENCES tipo_exame (id_tipo_exame),
+    CONSTRAINT fk_exame_uf
+        FOREIGN KEY (id_uf)
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT unq_exame_uf_tipo_periodo
+        UNIQUE (id_uf, id_tipo_exame, ano, mes) INCLUDE (quantidade)
+) PARTITION BY RANGE (ano);
+
+SELECT criar_particoes_ano('exame_realizado', 2005, 2035);
+
+INSERT INTO exame_realizado (id_exame, id_tipo_exame, id_uf, ano, mes, quantidade)
+SELECT id_exame, id_tipo_exame, id_uf, ano, mes, quantidade
+FROM exame_realizado_antiga;
+
+ALTER SEQUENCE exame_realizado_id_exame_seq OWNED BY exame_realizado.id_exame;
+DROP TABLE exame_realizado_antiga;
+
+-- profissional_registrado
+ALTER TABLE profissional_registrado RENAME TO profissional_registrado_antiga;
+ALTER TABLE profissional_registrado_antiga DROP CONSTRAINT unq_prof_categoria_uf_periodo;
+
+CREATE TABLE profissional_registrado (
+    id_prof       INTEGER   NOT NULL DEFAULT nextval('profissional_registrado_id_prof_seq'),
+    id_categoria  INTEGER   NOT NULL,
+    id_uf         INTEGER   NOT NULL,
+    ano           SMALLINT  NOT NULL,
+    mes           SMALLINT  NOT NULL,
+    quantidade    INTEGER   NOT NULL,
+    CONSTRAINT fk_prof_cat
+        FOREIGN KEY (id_categoria)
+        REFERENCES categoria_profissional (id_categoria),
+    CONSTRAINT fk_prof_uf
+        FOREIGN KEY (id_uf)
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT pk_profissional_registrado
+        PRIMARY KEY (id_prof, ano),
+    CONSTRAINT unq_prof_uf_categoria_periodo
+        UNIQUE (id_uf, id_categoria, ano, mes) INCLUDE (quantidade)
+) PARTITION BY RANGE (ano);
+
+SELECT criar_particoes_ano('profissional_registrado', 2005, 2035);
+
+INSERT INTO profissional_registrado (id_prof, id_categoria, id_uf, ano, mes, quantidade)
+SELECT id_prof, id_categoria, id_uf, ano, mes, quantidade
+FROM profissional_registrado_antiga;
+
+ALTER SEQUENCE profissional_registrado_id_prof_seq OWNED BY profissional_registrado.id_prof;
+DROP TABLE profissional_registrado_antiga;
+
+-- espera_exame: chave natural começando pelo tipo de exame (filtro do painel)
+ALTER TABLE espera_exame DROP CONSTRAINT unq_espera_uf_exame_ano;
+ALTER TABLE espera_exame
+    ADD CONSTRAINT unq_espera_exame_uf_ano
+        UNIQUE (id_tipo_exame, id_uf, ano)
+        INCLUDE (qtd_tempo_espera_0_10, qtd_tempo_espera_11_20, qtd_tempo_espera_21_30, qtd_tempo_espera_30_mais);
+
+-- metrica_wave: chave natural cobrindo as métricas
+ALTER TABLE metrica_wave DROP CONSTRAINT unq_wave_pagina_coleta;
+ALTER TABLE metrica_wave
+    ADD CONSTRAINT unq_wave_pagina_coleta
+        UNIQUE (id_pagina, data_coleta)
+        INCLUDE (errors, contrast_errors, alerts, aim_score);
+
+-- consultas do painel que leem só o ano/coleta mais recente
+CREATE INDEX IF NOT EXISTS idx_equip_ano
+    ON equipamento_registrado (ano, id_ra, id_tipo_equipamento) INCLUDE (quantidade);
+
+CREATE INDEX IF NOT EXISTS idx_pop_ano
+    ON populacao (ano, id_ra) INCLUDE (populacao_total, populacao_plano_saude, populacao_sem_plano_saude);
+
+CREATE INDEX IF NOT EXISTS idx_wave_coleta
+    ON metrica_wave (data_coleta, id_pagina) INCLUDE (errors, contrast_errors, alerts, aim_score);
+
+COMMIT;
+
+-- estatísticas e mapa de visibilidade atualizados para os planos index-only
+VACUUM ANALYZE exame_realizado, profissional_registrado, espera_exame,
+               equipamento_registrado, populacao, metrica_wave;
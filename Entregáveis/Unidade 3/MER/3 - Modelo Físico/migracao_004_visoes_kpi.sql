@@ -0,0 +1,125 @@
+-- Views materializadas com os quatro KPIs do topo do painel (src/funcoes.py),
+-- uma linha por KPI. São atualizadas pelo executar_etl.py ao fim de cada carga
+-- (REFRESH MATERIALIZED VIEW CONCURRENTLY, que usa os índices únicos abaixo
+-- e não bloqueia a leitura do painel durante a atualização).
+-- Executar uma vez (depois da migracao_003): psql -d <banco> -f migracao_004_visoes_kpi.sql
+
+BEGIN;
+
+-- grupo de exames de imagem mais realizado no DF no ano mais recente e a
+-- variação em relação ao ano anterior (a mamografia é um procedimento do grupo
+-- de radiologia e não entra na comparação entre grupos)
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_exame_mais_requisitado AS
+WITH anual AS (
+    SELECT er.ano, te.id_tipo_exame, te.nome AS subgrupo, SUM(er.quantidade) AS quantidade
+    FROM exame_realizado er
+    JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+    JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+    WHERE uf.sigla = 'DF'
+      AND lower(te.nome) NOT IN ('diagnostico por mamografia', 'diagnóstico por mamografia', 'mamografia')
+    GROUP BY er.ano, te.id_tipo_exame, te.nome
+),
+topo AS (
+    SELECT *
+    FROM anual
+    WHERE ano = (SELECT MAX(ano) FROM anual)
+    ORDER BY quantidade DESC, id_tipo_exame
+    LIMIT 1
+)
+SELECT t.ano,
+       t.subgrupo,
+       t.quantidade,
+       t.ano - 1 AS ano_anterior,
+       a.quantidade AS quantidade_anterior,
+       (t.quantidade - a.quantidade) * 100.0 / NULLIF(a.quantidade, 0) AS variacao_percentual
+FROM topo t
+LEFT JOIN anual a ON a.ano = t.ano - 1 AND a.id_tipo_exame = t.id_tipo_exame;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_exame_mais_requisitado
+    ON kpi_exame_mais_requisitado (ano);
+
+-- RA mais vulnerável: menor soma de posições entre o total de equipamentos
+-- (menos = pior) e a proporção da população sem plano de saúde (mais = pior)
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_ra_mais_vulneravel AS
+WITH equipamentos AS (
+    -- a carga só grava quantidades > 0: RA sem equipamento entra com total 0
+    SELECT ra.id_ra, COALESCE(SUM(er.quantidade), 0) AS total_equipamentos
+    FROM regiao_administrativa ra
+    JOIN unidade_da_federacao uf ON uf.id_uf = ra.id_uf
+    LEFT JOIN equipamento_registrado er
+           ON er.id_ra = ra.id_ra
+          AND er.ano = (SELECT MAX(ano) FROM equipamento_registrado)
+    WHERE uf.sigla = 'DF'
+    GROUP BY ra.id_ra
+),
+sem_plano AS (
+    SELECT id_ra, populacao_sem_plano_saude::float8 / NULLIF(populacao_total, 0) AS prop_sem_plano
+    FROM populacao
+    WHERE ano = (SELECT MAX(ano) FROM populacao)
+),
+posicoes AS (
+    SELECT e.id_ra,
+           e.total_equipamentos,
+           s.prop_sem_plano,
+           RANK() OVER (ORDER BY e.total_equipamentos)
+             + CASE WHEN s.prop_sem_plano IS NOT NULL
+                    THEN RANK() OVER (ORDER BY s.prop_sem_plano DESC NULLS LAST)
+               END AS score
+    FROM equipamentos e
+    LEFT JOIN sem_plano s ON s.id_ra = e.id_ra
+)
+SELECT p.id_ra, ra.nome AS ra, p.total_equipamentos, p.prop_sem_plano
+FROM posicoes p
+JOIN regiao_administrativa ra ON ra.id_ra = p.id_ra
+WHERE p.score IS NOT NULL
+ORDER BY p.score, ra.nome COLLATE "C"
+LIMIT 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_ra_mais_vulneravel
+    ON kpi_ra_mais_vulneravel (id_ra);
+
+-- mês com mais mamografias no DF no ano mais recente e o mês de maior volume
+-- do ano anterior
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_mes_com_mais_mamografias AS
+WITH mensal AS (
+    SELECT er.ano, er.mes, SUM(er.quantidade) AS exames
+    FROM exame_realizado er
+    JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+    JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+    WHERE uf.sigla = 'DF'
+      AND lower(te.nome) IN ('diagnostico por mamografia', 'diagnóstico por mamografia', 'mamografia')
+    GROUP BY er.ano, er.mes
+),
+topo AS (
+    SELECT DISTINCT ON (ano) ano, mes, exames
+    FROM mensal
+    ORDER BY ano, exames DESC, mes
+)
+SELECT a.ano,
+       a.mes,
+       a.exames,
+       a.ano - 1 AS ano_anterior,
+       p.mes AS mes_anterior,
+       p.exames AS exames_anterior
+FROM topo a
+LEFT JOIN topo p ON p.ano = a.ano - 1
+WHERE a.ano = (SELECT MAX(ano) FROM mensal);
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_mes_com_mais_mamografias
+    ON kpi_mes_com_mais_mamografias (ano);
+
+-- páginas do portal sem HTTPS na coleta WAVE mais recente
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_links_sem_https AS
+SELECT mw.data_coleta,
+       COUNT(*) AS total,
+       COUNT(*) FILTER (WHERE lower(btrim(pp.url, E' \t\r\n')) NOT LIKE 'https://%') AS sem_https,
+       COUNT(*) FILTER (WHERE lower(btrim(pp.url, E' \t\r\n')) NOT LIKE 'https://%') * 100.0 / COUNT(*) AS perc_sem_https
+FROM metrica_wave mw
+JOIN pagina_portal pp ON pp.id_pagina = mw.id_pagina
+WHERE mw.data_coleta = (SELECT MAX(data_coleta) FROM metrica_wave)
+GROUP BY mw.data_coleta;
+
+CREATE UNIQUE INDEX IF NOT EXISTS unq_kpi_links_sem_https
+    ON kpi_links_sem_https (data_coleta);
+
+COMMIT;
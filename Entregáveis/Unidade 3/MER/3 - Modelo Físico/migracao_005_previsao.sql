@@ -0,0 +1,54 @@
+-- Tabelas da previsão em lote (ETL/previsao_lote.py): o modelo escolhido para
+-- cada série mensal de exame_realizado (UF x tipo de exame) e a previsão dos
+-- próximos meses. As ordens gravadas são o ponto de partida da busca seguinte.
+-- Executar uma vez (depois da migracao_004): psql -d <banco> -f migracao_005_previsao.sql
+
+BEGIN;
+
+-- Modelo SARIMAX escolhido por série; status: ok, tempo_esgotado, erro, curta
+CREATE TABLE IF NOT EXISTS modelo_previsao (
+    id_uf           INTEGER          NOT NULL,
+    id_tipo_exame   INTEGER          NOT NULL,
+    p               SMALLINT,
+    d               SMALLINT,
+    q               SMALLINT,
+    p_sazonal       SMALLINT,
+    d_sazonal       SMALLINT,
+    q_sazonal       SMALLINT,
+    periodo         SMALLINT         NOT NULL DEFAULT 12,
+    aic             DOUBLE PRECISION,
+    bic             DOUBLE PRECISION,
+    meses           INTEGER          NOT NULL,
+    ultimo_ano      SMALLINT         NOT NULL,
+    ultimo_mes      SMALLINT         NOT NULL,
+    sha256_serie    CHAR(64),
+    status          VARCHAR(20)      NOT NULL,
+    segundos        DOUBLE PRECISION NOT NULL,
+    ajustado_em     TIMESTAMP        NOT NULL DEFAULT now(),
+    CONSTRAINT pk_modelo_previsao
+        PRIMARY KEY (id_uf, id_tipo_exame),
+    CONSTRAINT fk_modelo_previsao_uf
+        FOREIGN KEY (id_uf)
+        REFERENCES unidade_da_federacao (id_uf),
+    CONSTRAINT fk_modelo_previsao_tipo
+        FOREIGN KEY (id_tipo_exame)
+        REFERENCES tipo_exame (id_tipo_exame)
+);
+
+-- Previsão mensal por série, com o intervalo de 95%
+CREATE TABLE IF NOT EXISTS previsao_exame (
+    id_uf               INTEGER          NOT NULL,
+    id_tipo_exame       INTEGER          NOT NULL,
+    ano                 SMALLINT         NOT NULL,
+    mes                 SMALLINT         NOT NULL,
+    quantidade_prevista DOUBLE PRECISION NOT NULL,
+    limite_inferior     DOUBLE PRECISION,
+    limite_superior     DOUBLE PRECISION,
+    CONSTRAINT pk_previsao_exame
+        PRIMARY KEY (id_uf, id_tipo_exame, ano, mes),
+    CONSTRAINT fk_previsao_modelo
+        FOREIGN KEY (id_uf, id_tipo_exame)
+        REFERENCES modelo_previsao (id_uf, id_tipo_exame)
+);
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- Diagnóstico dos modelos da previsão em lote (ETL/previsao_lote.py): o
+-- p-valor do teste de Ljung-Box nos resíduos e a forma como as ordens foram
+-- obtidas. Num reajuste as ordens gravadas são reaproveitadas; a busca só é
+-- refeita quando o AIC por mês ou o Ljung-Box pioram.
+-- Executar uma vez (depois da migracao_005): psql -d <banco> -f migracao_006_diagnostico_previsao.sql
+
+BEGIN;
+
+-- busca: completa (auto_arima), reajuste (ordens anteriores), vizinhanca (ordens ±1)
+ALTER TABLE modelo_previsao
+    ADD COLUMN IF NOT EXISTS ljung_box_p DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS busca       VARCHAR(20);
+
+COMMIT;
@@ -1,4 +1,12 @@
 import streamlit as st
+import pandas as pd
+
+# Copy-on-Write: assign/rename sobre os DataFrames do cache de dados.py não
+# copiam dados nem alteram o original (padrão a partir do pandas 3, antes
+# precisa ser ligado). Ligado só aqui, no ponto de entrada do painel, para não
+# mudar o pandas de quem importa os módulos (ETL, scripts).
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(layout="wide")
 st.logo("assets/radiologia-df-logo.png",size="large", icon_image="assets/logo-icon.png")
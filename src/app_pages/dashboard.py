@@ -2,18 +2,25 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from dados import carregar_dataset
+from kpis import carregar_kpis
+from previsao import carregar_previsao_mamografia
+from backtest import carregar_ranking_previsao
+from previsao_rapida import PREVISORES, SERIE_MAMOGRAFIA_DF, opcoes_series, prever_serie
 from funcoes import (
     gerar_grafico_proporcao_funcionamento,
     gerar_dataset_escassez_SUS,
-    kpi_exame_mais_requisitado,
+    mostrar_kpi_exame_mais_requisitado,
     gerar_grafico_previsao_mamografias,
-    kpi_ra_mais_vulneravel,
-    kpi_mes_com_mais_mamografias,
-    kpi_links_sem_https,
+    mostrar_ranking_previsao,
+    mostrar_kpi_ra_mais_vulneravel,
+    mostrar_kpi_mes_com_mais_mamografias,
+    mostrar_kpi_links_sem_https,
     paginas_com_mais_erros,
     distribuição_wave_bp,
     distribuicao_wave_aria_bp,
     grafico_barras_tempo_espera_df_vs_uf,
+    grafico_ranking_espera_ufs,
     grafico_tendencia_profissionais_radiologia,
 )
 
@@ -21,26 +28,25 @@ st.set_page_config(layout="wide")
 
 st.header("Métricas Gerais:")
 
+kpis = carregar_kpis()
+
 with st.container():
     col1, col2, col3, col4 = st.columns([1,1,1,1])
     with col1:
         with st.container(border=True):
-            kpi_exame_mais_requisitado(pd.read_csv("data_sets/historico_subgrupos_exames_img_mais_requisitados.csv"))
+            mostrar_kpi_exame_mais_requisitado(kpis["exame_mais_requisitado"])
 
     with col2:
         with st.container(border=True):
-            kpi_ra_mais_vulneravel(
-                pd.read_csv("data_sets/distribuição_geo_equipamentos.csv"), 
-                pd.read_csv("data_sets/pop_df_com_plano_saude_por_ra.csv")
-            )
+            mostrar_kpi_ra_mais_vulneravel(kpis["ra_mais_vulneravel"])
 
     with col3:
         with st.container(border=True):
-            kpi_mes_com_mais_mamografias(pd.read_csv("data_sets/demanda_historica_Exames_Mamografia.csv"))
+            mostrar_kpi_mes_com_mais_mamografias(kpis["mes_com_mais_mamografias"])
 
     with col4:
         with st.container(border=True):
-            kpi_links_sem_https(pd.read_csv("data_sets/Dataset_acessibilidade_usabilidade_tratado.csv"))
+            mostrar_kpi_links_sem_https(kpis["links_sem_https"])
 
 st.divider()
 
@@ -51,14 +57,17 @@ with st.container():
 
     with col1:  
         with st.container(border=True):
-            gerar_grafico_proporcao_funcionamento(pd.read_csv("data_sets/qtd_equip_img_SUS_por_tipo.csv"))
+            gerar_grafico_proporcao_funcionamento(carregar_dataset("equipamentos_tipo"))
         with st.container(border=True):            
-            gerar_dataset_escassez_SUS(pd.read_csv("data_sets/qtd_equip_img_SUS_por_tipo.csv"))
+            gerar_dataset_escassez_SUS(carregar_dataset("equipamentos_tipo"))
 
     with col2:
         with st.container(border=True):
             grafico_barras_tempo_espera_df_vs_uf()
 
+    with st.container(border=True):
+        grafico_ranking_espera_ufs()
+
 st.divider()
 
 st.header("Análises de Acessibilidade do Portal DataSUS:")
@@ -68,15 +77,15 @@ with st.container():
 
     with col1:
         with st.container(border=True):
-            paginas_com_mais_erros(pd.read_csv("data_sets/Dataset_acessibilidade_usabilidade_tratado.csv"))
+            paginas_com_mais_erros(carregar_dataset("wave"))
 
     with col2:
         with st.container(border=True):
-            distribuição_wave_bp(pd.read_csv("data_sets/Dataset_acessibilidade_usabilidade_tratado.csv"))
+            distribuição_wave_bp(carregar_dataset("wave"))
 
     with col3:
         with st.container(border=True):
-            distribuicao_wave_aria_bp(pd.read_csv("data_sets/Dataset_acessibilidade_usabilidade_tratado.csv"))
+            distribuicao_wave_aria_bp(carregar_dataset("wave"))
 
 st.divider()
 
@@ -84,7 +93,24 @@ st.header("Análises de Séries Temporais:")
 
 with st.container():
     with st.container(border=True):
-            gerar_grafico_previsao_mamografias(pd.read_csv("data_sets/previsao_1_ano.csv"))
+            gerar_grafico_previsao_mamografias(carregar_previsao_mamografia())
+            mostrar_ranking_previsao(carregar_ranking_previsao())
+    with st.container(border=True):
+        st.subheader("Previsão Rápida de Outras Séries")
+        col_serie, col_metodo = st.columns([3, 2])
+        with col_serie:
+            serie_escolhida = st.selectbox("Série", opcoes_series(), key="serie_previsao_rapida")
+        with col_metodo:
+            metodo = st.selectbox(
+                "Método",
+                list(PREVISORES),
+                format_func=lambda m: PREVISORES[m][0],
+                key="metodo_previsao_rapida",
+            )
+        descartar_ultimo = False
+        if serie_escolhida != SERIE_MAMOGRAFIA_DF:
+            descartar_ultimo = st.checkbox("Desconsiderar o último ano (pode estar incompleto)", value=True)
+        gerar_grafico_previsao_mamografias(prever_serie(serie_escolhida, metodo, descartar_ultimo))
     with st.container(border=True):
-        grafico_tendencia_profissionais_radiologia(pd.read_csv("data_sets/historico_anual_numero_auxiliares_e_tecnicos_em_radiologia_SUS - Página1 (2).csv"),pd.read_csv("data_sets/historico_anual_numero_cirurgioes_dentistas_radiologistas_SUS - denstista_radio_profissinoais.csv.csv"), pd.read_csv("data_sets/historico_anual_numero_medicos_radiologistas_e_diagnostico_imagem_SUS - cnes_cnv_proc02df001944189_6_37_247.csv.csv"))
+        grafico_tendencia_profissionais_radiologia(carregar_dataset("profissionais_auxiliares"), carregar_dataset("profissionais_dentistas"), carregar_dataset("profissionais_medicos"))
 
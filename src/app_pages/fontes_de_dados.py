@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 
+from dados import carregar_dataset
+
 st.title("Fontes de Dados")
 
 # Lista das bases de dados
@@ -49,10 +51,10 @@ for i in range(0, len(fontes_dados), cols_por_linha):
                     url=fonte["link"]
                 )
 
-df_distribuicao = pd.read_csv("data_sets/distribuição_geo_equipamentos.csv")
-df_populacao_plano = pd.read_csv("data_sets/pop_df_com_plano_saude_por_ra.csv")
-df_demanda_radiologia = pd.read_csv("data_sets/historico_subgrupos_exames_img_mais_requisitados.csv")
-df_erros_acessibilidade = pd.read_csv("data_sets/Dataset_acessibilidade_usabilidade_tratado.csv")
+df_distribuicao = carregar_dataset("equipamentos_ra")
+df_populacao_plano = carregar_dataset("populacao_plano_ra")
+df_demanda_radiologia = carregar_dataset("exames_subgrupos")
+df_erros_acessibilidade = carregar_dataset("wave")
 
 st.title("Dados Brutos")
 st.write(
@@ -1,14 +1,17 @@
 import streamlit as st
-import json
 import pandas as pd
 import plotly.express as px
 
+from dados import carregar_dataset, carregar_geometria_ra
+from entidades import canonico, canonicos
+from geometria import NIVEL_PADRAO, RA_FIELD_GJ
+
 st.title("Mapa de equipamentos de imagem por Região Administrativa - DF")
 
 with st.expander("Como usar o mapa?"):
     st.markdown("""
 ### Guia rápido
-- Use o **menu suspenso** acima do mapa para escolher o tipo de equipamento.
+- Use o **menu suspenso** no canto superior esquerdo do mapa para escolher o tipo de equipamento.
 - Passe o mouse sobre uma Região Administrativa para ver os valores.
 - O mapa pode ser **arrastado, ampliado e reduzido** normalmente.
 - Clique no ícone do Plotly para salvar ou visualizar em tela cheia.
@@ -16,14 +19,13 @@ with st.expander("Como usar o mapa?"):
 
 st.divider()
 
-GEOJSON_PATH = "data_sets/Limite_RA_20190.json"    # arquivo das RAs do DF
-RA_FIELD_GJ   = "ra"    # campo de nome da RA no GeoJSON
-CSV_PATH      = "data_sets/distribuição_geo_equipamentos.csv"
+NIVEL_GEOMETRIA = NIVEL_PADRAO    # resolução das fronteiras das RAs (alta, media ou baixa)
 
-df = pd.read_csv(CSV_PATH)
+df = carregar_dataset("equipamentos_ra")
 
-# cópia do df pra trabalhar
-base = df.copy()
+# o df vem do cache compartilhado e é usado só para leitura; as RAs seguem
+# o nome canônico, o mesmo gravado no GeoJSON preparado
+base = df.assign(ra=canonicos("ra", df["ra"]).fillna(df["ra"]))
 
 # seleção das métricas, no caso equipamentos
 metricas_equip = [
@@ -33,48 +35,24 @@ metricas_equip = [
 if not metricas_equip:
     raise ValueError("Não encontrei colunas numéricas além de 'ra'. Verifique seu DataFrame.")
 
-# label bonitinho pras colunas
-metric_labels = {
-    "qtd_gama_camara": "Gama Câmara",
-    "qtd_mamografo_comando_simples": "Mamógrafo Comando Simples",
-    "qtd_mamografo_estereotaxia": "Mamógrafo Estereotaxia",
-    "qtd_raio_X_100_mA": "Raio X até 100 mA",
-    "qtd_raio_X_100_500_mA": "Raio X de 100 a 500 mA",
-    "qtd_raio_X_mais_500_mA": "Raio X mais de 500mA",
-    "qtd_raio_X_dentario": "Raio X Dentário",
-    "qtd_raio_X_fluoroscopia": "Raio X com Fluoroscopia",
-    "qtd_raio_X_densitometria_ossea": "Raio X para Densitometria Ossea",
-    "qtd_raio_X_hemodinamica": "Raio X para Hemodinâmica",
-    "qtd_ressonancia_magnetica": "Ressonância Magnética",
-    "qtd_tomógrafo_computadorizado": "Tomógrafo Computadorizado",
-    "qtd_ultrassom_doppler_colorido": "Ultrassom Doppler Colorido",
-    "qtd_ultrassom_ecografo": "Ultrassom Ecografo",
-    "qtd_ultrassom_convencional": "Ultrassom Convencional",
-    "qtd_processadora_de_filme_mamografia": "Processadora de Filme Exclusiva Mamografia",
-    "qtd_mamografo_computadorizado": "Mamógrafo Computadorizado",
-    "qtd_pet_ct": "PET/CT"
-}
-
-# Se existir alguma métrica sem label definido, usa o próprio nome da coluna
+# label das colunas: nome canônico do tipo de equipamento (entidades.py);
+# coluna sem tipo conhecido usa o próprio nome
 def get_label(col):
-    return metric_labels.get(col, col)
-
-# carregamento do geoJSON
-with open(GEOJSON_PATH, "r", encoding="utf-8") as f:
-    gj = json.load(f)
+    return canonico("tipo_equipamento", col) or col
 
-# criação de um dicionário com label como chave e coluna como valor
-opcoes_dict = {get_label(col): col for col in metricas_equip}
+# carregamento do geoJSON já simplificado (lido uma vez por processo)
+gj = carregar_geometria_ra(NIVEL_GEOMETRIA)
 
-# selectbox mostra os labels bonitinhos
-label_selecionado = st.selectbox(
-    "Selecione o tipo de equipamento:",
-    options=list(opcoes_dict.keys()),
-    index=0
-)
+# texto do hover para cada equipamento
+def get_hovertemplate(label):
+    return (
+        f"<b>%{{properties.{RA_FIELD_GJ}}}</b><br>"
+        f"Total de equipamentos {label}: %{{z}}<extra></extra>"
+    )
 
-# recuperação da coluna correspondente
-metrica_selecionada = opcoes_dict[label_selecionado]
+# o mapa abre com o primeiro equipamento; os demais vão embutidos na figura
+metrica_selecionada = metricas_equip[0]
+label_selecionado = get_label(metrica_selecionada)
 
 # criação do mapa
 fig = px.choropleth_mapbox(
@@ -99,9 +77,37 @@ fig.update_layout(
 )
 
 # Hover com o equipamento selecionado
-fig.data[0].hovertemplate = (
-    f"<b>%{{properties.{RA_FIELD_GJ}}}</b><br>"
-    f"Total de equipamentos {label_selecionado}: %{{z}}<extra></extra>"
+fig.data[0].hovertemplate = get_hovertemplate(label_selecionado)
+
+# Menu suspenso dentro da figura: a troca de equipamento acontece no navegador,
+# só substituindo os valores (z), sem rerun do Streamlit e sem reenviar a geometria
+botoes = [
+    dict(
+        label=get_label(col),
+        method="update",
+        args=[
+            {"z": [base[col].tolist()], "hovertemplate": [get_hovertemplate(get_label(col))]},
+            {"coloraxis.colorbar.title.text": get_label(col)}
+        ]
+    )
+    for col in metricas_equip
+]
+
+fig.update_layout(
+    updatemenus=[
+        dict(
+            buttons=botoes,
+            direction="down",
+            active=0,
+            showactive=True,
+            x=0.01,
+            xanchor="left",
+            y=0.99,
+            yanchor="top",
+            bgcolor="white",
+            font=dict(size=14)
+        )
+    ]
 )
 
 st.plotly_chart(fig, width='stretch', config={"displayModeBar": True})
\ No newline at end of file
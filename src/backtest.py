@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dados import carregar_json, gravar_atomico
+from previsao import PASTA_MODELOS, ajustar_sarimax, serie_mamografia, statsmodels_disponivel
+from previsao_rapida import PREVISORES
+
+# Backtest com origem móvel dos modelos de previsão da demanda de mamografias
+# do DF (no lugar da divisão única 80/20 do notebook "SARIMAX .ipynb"). Em cada
+# origem, de MESES_TREINO_MINIMO meses até HORIZONTE_BACKTEST meses antes do
+# fim da série, cada modelo é ajustado com os meses até a origem e prevê os
+# HORIZONTE_BACKTEST meses seguintes (todos os horizontes com as mesmas
+# origens); MAE, RMSE e MAPE (as métricas do notebook) são agregados num
+# ranking gravado em data_sets/modelos/ e exibido no painel abaixo da previsão.
+# As dobras rodam em paralelo (BACKTEST_PROCESSOS). O cache guarda só os
+# valores previstos de cada dobra bem-sucedida (não os modelos ajustados), pelo
+# sha256 dos dados usados nela: com um mês novo, só as dobras novas (e as que
+# falharam antes) são ajustadas. Os regressores exógenos do período de teste
+# são os observados (Pandemia e, se houver a coluna, SESDF), como no notebook.
+# Para executar antes do deploy (depois do python src/previsao.py):
+#   python src/backtest.py
+
+# incrementar quando mudar algum modelo ou a métrica (invalida o cache das dobras)
+VERSAO_BACKTEST = 2
+
+MESES_TREINO_MINIMO = 48
+HORIZONTE_BACKTEST = 12
+PERIODO_SAZONAL = 12
+
+PROCESSOS = int(os.getenv("BACKTEST_PROCESSOS", str(os.cpu_count() or 1)))
+
+# chave da dobra -> valores previstos (nenhum modelo serializado)
+CACHE_DOBRAS = os.path.join(PASTA_MODELOS, "dobras_backtest.json")
+RANKING_PREVISAO = os.path.join(PASTA_MODELOS, "ranking_previsao.json")
+
+
+def _ets(treino: pd.DataFrame, futuro: pd.DataFrame) -> np.ndarray:
+    # Holt-Winters aditivo com tendência amortecida
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    modelo = ExponentialSmoothing(
+        treino["Exames"].to_numpy(),
+        trend="add",
+        damped_trend=True,
+        seasonal="add",
+        seasonal_periods=PERIODO_SAZONAL,
+    )
+    return modelo.fit().forecast(len(futuro))
+
+
+def _sarimax(exogenas: tuple):
+    def prever_dobra(treino: pd.DataFrame, futuro: pd.DataFrame) -> np.ndarray:
+        resultado = ajustar_sarimax(treino, exogenas=exogenas)
+        exog = futuro[list(exogenas)].fillna(0).to_numpy()
+        return np.asarray(resultado.forecast(steps=len(futuro), exog=exog))
+    return prever_dobra
+
+
+def _rapido(nome: str):
+    # previsões só com NumPy de previsao_rapida.py (as usadas no painel)
+    def prever_dobra(treino: pd.DataFrame, futuro: pd.DataFrame) -> np.ndarray:
+        return PREVISORES[nome][1](treino["Exames"].to_numpy(dtype=float), len(futuro), PERIODO_SAZONAL)
+    return prever_dobra
+
+
+# nome -> (rótulo no painel, colunas exógenas exigidas, previsão de uma dobra)
+MODELOS = {
+    "sarimax_pandemia": ("SARIMAX (Pandemia)", ["Pandemia"], _sarimax(("Pandemia",))),
+    "sarimax_pandemia_sesdf": ("SARIMAX (Pandemia e SESDF)", ["Pandemia", "SESDF"], _sarimax(("Pandemia", "SESDF"))),
+    "ets": ("ETS (Holt-Winters amortecido)", [], _ets),
+    "holt_winters": ("Holt-Winters (NumPy)", [], _rapido("holt_winters")),
+    "media_movel_sazonal": ("Média móvel sazonal", [], _rapido("media_movel_sazonal")),
+    "sazonal_ingenuo": ("Sazonal ingênuo", [], _rapido("sazonal_ingenuo")),
+}
+
+
+def modelos_aplicaveis(serie: pd.DataFrame) -> list:
+    return [nome for nome, (_, exogenas, _) in MODELOS.items() if set(exogenas) <= set(serie.columns)]
+
+
+def origens(serie: pd.DataFrame) -> list:
+    # índice do primeiro mês de teste de cada dobra; só dobras com o horizonte
+    # completo, senão os horizontes curtos pesariam mais nas médias
+    return list(range(MESES_TREINO_MINIMO, len(serie) - HORIZONTE_BACKTEST + 1))
+
+
+def chave_dobra(modelo: str, treino: pd.DataFrame, futuro: pd.DataFrame) -> str:
+    # treino inteiro e exógenas do teste: qualquer revisão dos dados invalida a dobra
+    conteudo = "\n".join([
+        f"{modelo}:{VERSAO_BACKTEST}",
+        treino.to_csv(index=False, date_format="%Y-%m"),
+        futuro.drop(columns="Exames").to_csv(index=False, date_format="%Y-%m"),
+    ])
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def prever_dobra(modelo: str, treino: pd.DataFrame, futuro: pd.DataFrame):
+    # roda nos processos do pool; None quando o ajuste falha (não vai para o
+    # cache: a dobra é ajustada de novo na próxima execução)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            previsao = MODELOS[modelo][2](treino, futuro)
+    except Exception as e:
+        print(f"[AVISO] {modelo} com treino até {treino['DATE'].max():%Y-%m}: {e}")
+        return None
+    return [float(v) for v in previsao]
+
+
+def _ler_cache() -> dict:
+    if not os.path.exists(CACHE_DOBRAS):
+        return {}
+    with open(CACHE_DOBRAS, encoding="utf-8") as f:
+        cache = json.load(f)
+    return cache["dobras"] if cache.get("versao") == VERSAO_BACKTEST else {}
+
+
+def _gravar_cache(dobras: dict) -> None:
+    def escrever(caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump({"versao": VERSAO_BACKTEST, "dobras": dobras}, f)
+
+    gravar_atomico(CACHE_DOBRAS, escrever)
+
+
+def executar_dobras(serie: pd.DataFrame, modelos: list) -> pd.DataFrame:
+    # uma linha por modelo, origem e horizonte: real e previsto (dobras que
+    # falharam ficam de fora)
+    dobras = []
+    for modelo in modelos:
+        for origem in origens(serie):
+            treino = serie.iloc[:origem]
+            futuro = serie.iloc[origem:origem + HORIZONTE_BACKTEST]
+            dobras.append((modelo, origem, treino, futuro, chave_dobra(modelo, treino, futuro)))
+
+    cache = _ler_cache()
+    pendentes = [d for d in dobras if d[4] not in cache]
+    print(f"{len(dobras)} dobras ({len(modelos)} modelos x {len(origens(serie))} origens), "
+          f"{len(dobras) - len(pendentes)} no cache, {len(pendentes)} para ajustar")
+
+    if pendentes:
+        argumentos = [(modelo, treino, futuro) for modelo, _, treino, futuro, _ in pendentes]
+        if PROCESSOS <= 1 or len(pendentes) <= 1:
+            previsoes = [prever_dobra(*a) for a in argumentos]
+        else:
+            with ProcessPoolExecutor(max_workers=min(PROCESSOS, len(pendentes))) as pool:
+                previsoes = list(pool.map(prever_dobra, *zip(*argumentos), chunksize=4))
+        cache.update({d[4]: p for d, p in zip(pendentes, previsoes) if p is not None})
+
+    # só as dobras da série atual ficam no cache
+    _gravar_cache({d[4]: cache[d[4]] for d in dobras if d[4] in cache})
+
+    linhas = []
+    for modelo, origem, _, futuro, chave in dobras:
+        if chave not in cache:
+            continue
+        linhas.append(pd.DataFrame({
+            "modelo": modelo,
+            "origem": origem,
+            "horizonte": np.arange(1, len(futuro) + 1),
+            "real": futuro["Exames"].to_numpy(),
+            "previsto": cache[chave],
+        }))
+    if not linhas:
+        return pd.DataFrame(columns=["modelo", "origem", "horizonte", "real", "previsto"])
+    return pd.concat(linhas, ignore_index=True)
+
+
+def montar_ranking(erros: pd.DataFrame, origens_por_modelo: int) -> pd.DataFrame:
+    # MAE, RMSE e MAPE só sobre as origens e horizontes previstos por todos os
+    # modelos (uma dobra que falhou num modelo sai da comparação dos outros),
+    # menor MAE primeiro; o MAPE ignora meses sem exames. Falhas: dobras que o
+    # modelo não conseguiu ajustar
+    modelos = erros["modelo"].nunique()
+    comuns = erros.groupby(["origem", "horizonte"])["modelo"].transform("nunique") == modelos
+    falhas = origens_por_modelo - erros.groupby("modelo")["origem"].nunique()
+
+    erros = erros[comuns]
+    erros = erros.assign(
+        erro_abs=(erros["real"] - erros["previsto"]).abs(),
+        erro_quad=(erros["real"] - erros["previsto"]) ** 2,
+        erro_perc=(erros["real"] - erros["previsto"]).abs() / erros["real"].where(erros["real"] != 0) * 100,
+    )
+    grupos = erros.groupby("modelo")
+    ranking = pd.DataFrame({
+        "Dobras": grupos["origem"].nunique(),
+        "Falhas": falhas,
+        "MAE": grupos["erro_abs"].mean(),
+        "RMSE": np.sqrt(grupos["erro_quad"].mean()),
+        "MAPE (%)": grupos["erro_perc"].mean(),
+        "MAE 1 mês": erros[erros["horizonte"] == 1].groupby("modelo")["erro_abs"].mean(),
+        f"MAE {HORIZONTE_BACKTEST} meses": erros[erros["horizonte"] == HORIZONTE_BACKTEST].groupby("modelo")["erro_abs"].mean(),
+    }).dropna(subset=["MAE"])
+    ranking.insert(0, "Modelo", [MODELOS[m][0] for m in ranking.index])
+    return ranking.sort_values("MAE").reset_index(drop=True)
+
+
+def gerar_ranking() -> dict:
+    serie = serie_mamografia()
+    modelos = modelos_aplicaveis(serie)
+    if not statsmodels_disponivel():
+        modelos = [m for m in modelos if m in PREVISORES]
+
+    resultado = {
+        "versao": VERSAO_BACKTEST,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ultimo_mes": serie["DATE"].max().strftime("%Y-%m"),
+        "horizonte": HORIZONTE_BACKTEST,
+    }
+
+    indices = origens(serie)
+    if indices:
+        erros = executar_dobras(serie, modelos)
+        # modelo que falhou em todas as dobras não entra no ranking
+        for modelo in sorted(set(modelos) - set(erros["modelo"])):
+            print(f"[AVISO] {modelo} falhou em todas as {len(indices)} dobras e ficou fora do ranking")
+        ranking = montar_ranking(erros, len(indices))
+        resultado.update({
+            "primeira_origem": serie["DATE"].iloc[indices[0]].strftime("%Y-%m"),
+            "ultima_origem": serie["DATE"].iloc[indices[-1]].strftime("%Y-%m"),
+            "ranking": ranking.round(2).to_dict("records"),
+        })
+    else:
+        # série curta demais para uma dobra: ranking vazio, com o motivo
+        resultado.update({
+            "ranking": [],
+            "mensagem": (
+                f"O backtest precisa de pelo menos {MESES_TREINO_MINIMO + HORIZONTE_BACKTEST} meses "
+                f"de histórico; a série tem {len(serie)}."
+            ),
+        })
+
+    def escrever(caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    gravar_atomico(RANKING_PREVISAO, escrever)
+    return resultado
+
+
+def carregar_ranking_previsao():
+    # ranking gravado por `python src/backtest.py`, ou None
+    if not os.path.exists(RANKING_PREVISAO):
+        return None
+    resultado = carregar_json(RANKING_PREVISAO)
+    return resultado if resultado.get("versao") == VERSAO_BACKTEST else None
+
+
+if __name__ == "__main__":
+    os.makedirs(PASTA_MODELOS, exist_ok=True)
+    resultado = gerar_ranking()
+    if "mensagem" in resultado:
+        print(f"[AVISO] {resultado['mensagem']} Ranking vazio em {RANKING_PREVISAO}")
+    else:
+        print(pd.DataFrame(resultado["ranking"]).to_string(index=False))
+        print(f"Ranking com origens de {resultado['primeira_origem']} a {resultado['ultima_origem']} em {RANKING_PREVISAO}")
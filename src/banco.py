@@ -0,0 +1,282 @@
+import os
+import re
+from contextlib import contextmanager
+
+import streamlit as st
+import pandas as pd
+
+from entidades import canonicos, grafias
+
+# Fonte de dados PostgreSQL (esquema carregado pelos scripts de ETL).
+# Ativada com RADIOLOGIA_FONTE=banco; a conexão usa DATABASE_URL ou, se vazia,
+# as variáveis padrão do libpq (PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD).
+
+FONTE_DADOS = os.getenv("RADIOLOGIA_FONTE", "csv").strip().lower()
+
+# tempo (s) que o resultado de uma consulta fica em cache, compartilhado entre sessões
+TTL_CONSULTAS = int(os.getenv("RADIOLOGIA_TTL_BANCO", "600"))
+
+NOME_EXAME_MAMOGRAFIA = "Diagnóstico por Mamografia"
+
+# nome canônico do tipo_equipamento (entidades.py) -> coluna do CSV de distribuição por RA
+COLUNAS_EQUIPAMENTO = {
+    "Gama Câmara": "qtd_gama_camara",
+    "Mamógrafo com Comando Simples": "qtd_mamografo_comando_simples",
+    "Mamógrafo com Estereotaxia": "qtd_mamografo_estereotaxia",
+    "Raio X até 100 mA": "qtd_raio_X_100_mA",
+    "Raio X de 100 a 500 mA": "qtd_raio_X_100_500_mA",
+    "Raio X mais de 500 mA": "qtd_raio_X_mais_500_mA",
+    "Raio X Dentário": "qtd_raio_X_dentario",
+    "Raio X com Fluoroscopia": "qtd_raio_X_fluoroscopia",
+    "Raio X para Densitometria Óssea": "qtd_raio_X_densitometria_ossea",
+    "Raio X para Hemodinâmica": "qtd_raio_X_hemodinamica",
+    "Tomógrafo Computadorizado": "qtd_tomógrafo_computadorizado",
+    "Ressonância Magnética": "qtd_ressonancia_magnetica",
+    "Ultrassom Doppler Colorido": "qtd_ultrassom_doppler_colorido",
+    "Ultrassom Ecógrafo": "qtd_ultrassom_ecografo",
+    "Ultrassom Convencional": "qtd_ultrassom_convencional",
+    "Processadora de Filme Exclusiva para Mamografia": "qtd_processadora_de_filme_mamografia",
+    "Mamógrafo Computadorizado": "qtd_mamografo_computadorizado",
+    "PET/CT": "qtd_pet_ct",
+}
+
+# nome da categoria_profissional -> (dataset, coluna de período, coluna de valor)
+CATEGORIAS_PROFISSIONAIS = {
+    "Auxiliar de Radiologia Revelação": ("profissionais_auxiliares", "Data", "Auxiliar de Radiologia Revelação"),
+    "Tecnico em Radiologia e Imagenologia": ("profissionais_auxiliares", "Data", "Tecnico em Radiologia e Imagenologia"),
+    "Cirurgião dentista - radiologista": ("profissionais_dentistas", "Ocupações de Nível Superior", "Cirurgião dentista - radiologista"),
+    "Radiologistas": ("profissionais_medicos", "Ano/mês compet.", "Radiologistas"),
+}
+
+OID_NUMERIC = 1700
+
+MESES_ABREV = ["jan.", "fev.", "mar.", "abr.", "mai.", "jun.", "jul.", "ago.", "set.", "out.", "nov.", "dez."]
+
+# consultas pré-agregadas: o banco devolve só o que o gráfico precisa
+# (os planos são conferidos por Entregáveis/Unidade 3/ETL/verificar_planos.py,
+# que repete estas consultas; alterações devem ser feitas nos dois)
+SQL_EQUIPAMENTOS_RA = """
+    SELECT ra.nome AS ra, te.nome AS equipamento, SUM(er.quantidade) AS quantidade
+    FROM regiao_administrativa ra
+    LEFT JOIN equipamento_registrado er
+           ON er.id_ra = ra.id_ra
+          AND er.ano = (SELECT MAX(ano) FROM equipamento_registrado)
+    LEFT JOIN tipo_equipamento te ON te.id_tipo_equipamento = er.id_tipo_equipamento
+    GROUP BY ra.nome, te.nome;
+"""
+
+SQL_POPULACAO_RA = """
+    SELECT ra.nome AS "Local",
+           p.populacao_total AS "Total",
+           p.populacao_sem_plano_saude AS "Nao",
+           p.populacao_plano_saude AS "Sim"
+    FROM populacao p
+    JOIN regiao_administrativa ra ON ra.id_ra = p.id_ra
+    WHERE p.ano = (SELECT MAX(ano) FROM populacao);
+"""
+
+SQL_EXAMES_MENSAIS = """
+    SELECT make_date(er.ano, er.mes, 1) AS "DATE", SUM(er.quantidade) AS "Exames"
+    FROM exame_realizado er
+    JOIN tipo_exame te ON te.id_tipo_exame = er.id_tipo_exame
+    JOIN unidade_da_federacao uf ON uf.id_uf = er.id_uf
+    WHERE uf.sigla = %s AND lower(te.nome) = ANY(%s)
+    GROUP BY er.ano, er.mes
+    ORDER BY er.ano, er.mes;
+"""
+
+SQL_WAVE = """
+    SELECT pp.id_pagina AS "TELA",
+           pp.url AS "Links",
+           mw.errors AS "Errors",
+           mw.contrast_errors AS "Contrast Errors",
+           mw.alerts AS "Alerts",
+           mw.aim_score AS "AIM Score"
+    FROM metrica_wave mw
+    JOIN pagina_portal pp ON pp.id_pagina = mw.id_pagina
+    WHERE mw.data_coleta = (SELECT MAX(data_coleta) FROM metrica_wave)
+    ORDER BY pp.id_pagina;
+"""
+
+SQL_EQUIPAMENTOS_TIPO = """
+    SELECT nome AS equipamento,
+           quantidade_publico + quantidade_privado AS existentes,
+           quantidade_publico AS "existentes_SUS",
+           quantidade_funcionando_sus AS "em_uso_SUS"
+    FROM tipo_equipamento
+    ORDER BY id_tipo_equipamento;
+"""
+
+SQL_PROFISSIONAIS = """
+    SELECT cp.nome AS categoria, pr.ano, pr.mes, SUM(pr.quantidade) AS quantidade
+    FROM profissional_registrado pr
+    JOIN categoria_profissional cp ON cp.id_categoria = pr.id_categoria
+    JOIN unidade_da_federacao uf ON uf.id_uf = pr.id_uf
+    WHERE uf.sigla = %s
+    GROUP BY cp.nome, pr.ano, pr.mes
+    ORDER BY pr.ano, pr.mes;
+"""
+
+SQL_ESPERA_NACIONAL = """
+    SELECT uf.sigla AS "UF",
+           ee.ano,
+           ee.qtd_tempo_espera_0_10 AS "0 - 10 dias",
+           ee.qtd_tempo_espera_11_20 AS "11 - 20 dias",
+           ee.qtd_tempo_espera_21_30 AS "21 - 30 dias",
+           ee.qtd_tempo_espera_30_mais AS "> 30 dias"
+    FROM espera_exame ee
+    JOIN unidade_da_federacao uf ON uf.id_uf = ee.id_uf
+    JOIN tipo_exame te ON te.id_tipo_exame = ee.id_tipo_exame
+    WHERE lower(te.nome) = ANY(%s)
+    ORDER BY uf.sigla, ee.ano;
+"""
+
+# KPIs do topo do painel: views materializadas (migracao_004_visoes_kpi.sql),
+# uma linha cada, atualizadas pelo ETL ao fim de cada carga
+VISOES_KPI = {
+    "exame_mais_requisitado": "kpi_exame_mais_requisitado",
+    "ra_mais_vulneravel": "kpi_ra_mais_vulneravel",
+    "mes_com_mais_mamografias": "kpi_mes_com_mais_mamografias",
+    "links_sem_https": "kpi_links_sem_https",
+}
+
+
+def banco_ativo() -> bool:
+    return FONTE_DADOS == "banco"
+
+
+@st.cache_resource(show_spinner=False)
+def _pool():
+    # importado aqui para o modo CSV não depender do psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
+
+    return ThreadedConnectionPool(
+        minconn=1,
+        maxconn=int(os.getenv("RADIOLOGIA_POOL_MAX", "8")),
+        dsn=os.getenv("DATABASE_URL", ""),
+    )
+
+
+@contextmanager
+def conexao():
+    pool = _pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        # consultas só de leitura: rollback devolve a conexão limpa ao pool
+        conn.rollback()
+        pool.putconn(conn)
+
+
+def consultar(sql: str, parametros: tuple = ()) -> pd.DataFrame:
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, parametros)
+            colunas = [c.name for c in cur.description]
+            # NUMERIC vem como Decimal; vira float para os gráficos tratarem como número
+            decimais = [c.name for c in cur.description if c.type_code == OID_NUMERIC]
+            linhas = cur.fetchall()
+
+    df = pd.DataFrame(linhas, columns=colunas)
+    return df.astype({c: "float64" for c in decimais})
+
+
+def _equipamentos_ra() -> pd.DataFrame:
+    # a carga só grava quantidades > 0: RA sem equipamento vem com uma linha
+    # sem tipo (LEFT JOIN) e fica com zero em todas as colunas
+    df = consultar(SQL_EQUIPAMENTOS_RA)
+    df = df.assign(
+        ra=canonicos("ra", df["ra"]).fillna(df["ra"]),
+        coluna=canonicos("tipo_equipamento", df["equipamento"]).map(COLUNAS_EQUIPAMENTO),
+    )
+    largo = (
+        df.dropna(subset=["coluna"])
+        .pivot_table(index="ra", columns="coluna", values="quantidade", aggfunc="sum", fill_value=0)
+        .reindex(pd.Index(sorted(df["ra"].unique()), name="ra"), fill_value=0)
+    )
+    colunas = [c for c in COLUNAS_EQUIPAMENTO.values() if c in largo.columns]
+    return largo[colunas].astype(int).reset_index().rename_axis(columns=None)
+
+
+def _demanda_mamografia() -> pd.DataFrame:
+    # o banco pode ter o nome gravado em qualquer grafia conhecida do tipo de exame
+    df = consultar(SQL_EXAMES_MENSAIS, ("DF", grafias("tipo_exame", NOME_EXAME_MAMOGRAFIA)))
+    return df.assign(DATE=pd.to_datetime(df["DATE"]), Exames=df["Exames"].astype(int))
+
+
+def _profissionais(dataset: str) -> pd.DataFrame:
+    df = consultar(SQL_PROFISSIONAIS, ("DF",))
+
+    categorias = {
+        nome: coluna
+        for nome, (nome_dataset, _, coluna) in CATEGORIAS_PROFISSIONAIS.items()
+        if nome_dataset == dataset
+    }
+    coluna_periodo = next(
+        periodo for nome_dataset, periodo, _ in CATEGORIAS_PROFISSIONAIS.values()
+        if nome_dataset == dataset
+    )
+
+    df = df[df["categoria"].isin(categorias)]
+    largo = df.pivot_table(index=["ano", "mes"], columns="categoria", values="quantidade", aggfunc="sum")
+    largo = largo.rename(columns=categorias).reset_index()
+
+    # mesmo formato de período do CSV do CNES ("2007/ago.")
+    periodo = largo["ano"].astype(str) + "/" + largo["mes"].map(lambda m: MESES_ABREV[int(m) - 1])
+    largo = largo.drop(columns=["ano", "mes"]).assign(**{coluna_periodo: periodo})
+
+    return largo[[coluna_periodo] + [c for c in categorias.values() if c in largo.columns]]
+
+
+# datasets que têm equivalente no banco; os demais continuam vindo dos CSVs
+CONSULTAS_DATASETS = {
+    "equipamentos_ra": _equipamentos_ra,
+    "populacao_plano_ra": lambda: consultar(SQL_POPULACAO_RA),
+    "demanda_mamografia": _demanda_mamografia,
+    "wave": lambda: consultar(SQL_WAVE),
+    "equipamentos_tipo": lambda: consultar(SQL_EQUIPAMENTOS_TIPO),
+    "profissionais_auxiliares": lambda: _profissionais("profissionais_auxiliares"),
+    "profissionais_dentistas": lambda: _profissionais("profissionais_dentistas"),
+    "profissionais_medicos": lambda: _profissionais("profissionais_medicos"),
+}
+
+
+# resultado em cache por TTL_CONSULTAS segundos, compartilhado entre sessões
+@st.cache_resource(show_spinner=False, ttl=TTL_CONSULTAS, max_entries=32)
+def carregar_dataset_banco(nome: str) -> pd.DataFrame:
+    return CONSULTAS_DATASETS[nome]()
+
+
+def carregar_espera_banco() -> pd.DataFrame:
+    # mesmo formato largo dos CSVs por UF, com a coluna UF
+    df = consultar(SQL_ESPERA_NACIONAL, (grafias("tipo_exame", NOME_EXAME_MAMOGRAFIA),))
+    return df.rename(columns={"ano": "Ano Resultado"})
+
+
+def _linha_kpi(cur, visao: str):
+    cur.execute(f"SELECT * FROM {visao};")
+    linha = cur.fetchone()
+    if linha is None:
+        return None
+
+    # mesmos tipos simples das funções calcular_kpi_* (NUMERIC vem como Decimal)
+    return {
+        c.name: float(v) if c.type_code == OID_NUMERIC and v is not None else v
+        for c, v in zip(cur.description, linha)
+    }
+
+
+@st.cache_resource(show_spinner=False, ttl=TTL_CONSULTAS)
+def carregar_kpis_banco() -> dict:
+    # nome do KPI -> valores da única linha da view (None se a view estiver vazia)
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            kpis = {nome: _linha_kpi(cur, visao) for nome, visao in VISOES_KPI.items()}
+
+    # mesmo rótulo curto do CSV de subgrupos ("Diagnóstico por Radiologia" -> "Radiologia")
+    exame = kpis["exame_mais_requisitado"]
+    if exame is not None:
+        exame["subgrupo"] = re.sub(r"^Diagn[oó]stico por ", "", exame["subgrupo"])
+
+    return kpis
@@ -0,0 +1,250 @@
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+
+import streamlit as st
+import pandas as pd
+
+from banco import CONSULTAS_DATASETS, TTL_CONSULTAS, banco_ativo, carregar_dataset_banco, carregar_espera_banco
+from geometria import GEOJSON_ORIGINAL, NIVEIS_GEOMETRIA, caminho_geometria, simplificar_geojson
+
+# datasets usados pelas páginas do painel
+DATASETS = {
+    "exames_subgrupos": {
+        "caminho": "data_sets/historico_subgrupos_exames_img_mais_requisitados.csv",
+    },
+    "equipamentos_ra": {
+        "caminho": "data_sets/distribuição_geo_equipamentos.csv",
+    },
+    "populacao_plano_ra": {
+        "caminho": "data_sets/pop_df_com_plano_saude_por_ra.csv",
+    },
+    "demanda_mamografia": {
+        "caminho": "data_sets/demanda_historica_Exames_Mamografia.csv",
+    },
+    "previsao_mamografia": {
+        "caminho": "data_sets/previsao_1_ano.csv",
+    },
+    "wave": {
+        "caminho": "data_sets/Dataset_acessibilidade_usabilidade_tratado.csv",
+    },
+    "equipamentos_tipo": {
+        "caminho": "data_sets/qtd_equip_img_SUS_por_tipo.csv",
+    },
+    "profissionais_auxiliares": {
+        "caminho": "data_sets/historico_anual_numero_auxiliares_e_tecnicos_em_radiologia_SUS - Página1 (2).csv",
+    },
+    "profissionais_dentistas": {
+        "caminho": "data_sets/historico_anual_numero_cirurgioes_dentistas_radiologistas_SUS - denstista_radio_profissinoais.csv.csv",
+    },
+    "profissionais_medicos": {
+        "caminho": "data_sets/historico_anual_numero_medicos_radiologistas_e_diagnostico_imagem_SUS - cnes_cnv_proc02df001944189_6_37_247.csv.csv",
+    },
+}
+
+CAMINHO_ESTADOS = "data_sets/estados/mamografia_atend{uf}.csv"
+OPCOES_ESTADOS = {"sep": ";"}
+
+INTERVALOS_ESPERA = ["0 - 10 dias", "11 - 20 dias", "21 - 30 dias", "> 30 dias"]
+
+UFS = [
+    "AC","AL","AM","AP","BA","CE","DF","ES","GO","MA","MG","MS","MT","PA",
+    "PB","PE","PI","PR","RJ","RN","RO","RR","RS","SC","SE","SP","TO"
+]
+
+# snapshots Parquet gerados por `python src/snapshots.py`
+PASTA_SNAPSHOTS = "data_sets/parquet"
+MANIFESTO_SNAPSHOTS = os.path.join(PASTA_SNAPSHOTS, "manifesto.json")
+
+
+def hash_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _hash_arquivo(caminho: str, mtime: float) -> str:
+    return hash_arquivo(caminho)
+
+
+def hash_fonte(caminho: str) -> str:
+    # sha256 do arquivo, recalculado só quando o mtime muda
+    return _hash_arquivo(caminho, os.path.getmtime(caminho))
+
+
+def _snapshot_valido(caminho: str, opcoes: dict):
+    # usa o Parquet só se o pyarrow estiver instalado e o CSV de origem não
+    # tiver mudado desde a geração do snapshot; senão volta para o CSV
+    if importlib.util.find_spec("pyarrow") is None or not os.path.exists(MANIFESTO_SNAPSHOTS):
+        return None
+
+    entrada = carregar_json(MANIFESTO_SNAPSHOTS)["arquivos"].get(caminho)
+    if not entrada or entrada["opcoes"] != opcoes or not os.path.exists(entrada["snapshot"]):
+        return None
+
+    if entrada["sha256"] != hash_fonte(caminho):
+        return None
+
+    return entrada["snapshot"]
+
+
+# o mtime entra na chave do cache: o arquivo só é lido de novo quando muda
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _ler_csv(caminho: str, mtime: float, opcoes: tuple) -> pd.DataFrame:
+    return pd.read_csv(caminho, **dict(opcoes))
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _ler_parquet(caminho: str, mtime: float) -> pd.DataFrame:
+    return pd.read_parquet(caminho, memory_map=True)
+
+
+def carregar_csv(caminho: str, **opcoes) -> pd.DataFrame:
+    # o DataFrame devolvido é o mesmo para todas as sessões: as funções que o
+    # recebem devem tratá-lo como somente leitura (usar assign/rename, nunca
+    # df[col] = ... ou df.columns = ...)
+    snapshot = _snapshot_valido(caminho, opcoes)
+    if snapshot:
+        return _ler_parquet(snapshot, os.path.getmtime(snapshot))
+
+    mtime = os.path.getmtime(caminho)
+    return _ler_csv(caminho, mtime, tuple(sorted(opcoes.items())))
+
+
+def _aviso_banco(erro: Exception) -> None:
+    print(f"[AVISO] Banco de dados indisponível ({erro}). Usando os CSVs de data_sets/.")
+
+
+def carregar_dataset(nome: str) -> pd.DataFrame:
+    if nome not in DATASETS:
+        raise KeyError(f"Dataset desconhecido: {nome}. Opções: {list(DATASETS)}")
+
+    # modo banco (RADIOLOGIA_FONTE=banco): datasets com consulta equivalente
+    # vêm do PostgreSQL; em caso de falha, volta para o CSV
+    if banco_ativo() and nome in CONSULTAS_DATASETS:
+        try:
+            return carregar_dataset_banco(nome)
+        except Exception as e:
+            _aviso_banco(e)
+
+    config = DATASETS[nome]
+    opcoes = {k: v for k, v in config.items() if k != "caminho"}
+    return carregar_csv(config["caminho"], **opcoes)
+
+
+def carregar_mamografia_uf(uf: str) -> pd.DataFrame:
+    return carregar_csv(CAMINHO_ESTADOS.format(uf=uf.lower()), **OPCOES_ESTADOS)
+
+
+def _tabela_espera(largo: pd.DataFrame) -> dict:
+    # largo: uma linha por UF e ano, com as colunas UF, "Ano Resultado" e os intervalos
+    cols = [c for c in INTERVALOS_ESPERA if c in largo.columns]
+
+    largo = largo.assign(**{
+        c: pd.to_numeric(largo[c], errors="coerce")
+        for c in cols + ["Ano Resultado"]
+    })
+    largo = largo.dropna(subset=["Ano Resultado"])
+
+    tabela = (
+        largo.melt(id_vars=["UF", "Ano Resultado"], value_vars=cols, var_name="intervalo", value_name="qtd")
+        .rename(columns={"Ano Resultado": "ano"})
+    )
+    tabela = tabela.assign(
+        ano=tabela["ano"].astype(int),
+        intervalo=pd.Categorical(tabela["intervalo"], categories=INTERVALOS_ESPERA, ordered=True),
+        qtd=tabela["qtd"].fillna(0)
+    )
+    tabela = tabela[["UF", "ano", "intervalo", "qtd"]].sort_values(["UF", "ano", "intervalo"], ignore_index=True)
+
+    # distribuição dos 3 anos mais recentes de cada UF, pré-agregada
+    anos = tabela[["UF", "ano"]].drop_duplicates()
+    anos = anos[anos.groupby("UF")["ano"].rank(ascending=False, method="first") <= 3]
+
+    dist = (
+        tabela.merge(anos, on=["UF", "ano"])
+        .groupby(["UF", "intervalo"], observed=True)["qtd"].sum()
+        .reset_index()
+    )
+    dist = dist.assign(pct=dist["qtd"] / dist.groupby("UF")["qtd"].transform("sum") * 100)
+
+    ultimos_3_anos = {
+        uf: grupo.drop(columns="UF").reset_index(drop=True)
+        for uf, grupo in dist.groupby("UF")
+    }
+
+    return {"tabela": tabela, "ultimos_3_anos": ultimos_3_anos}
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _montar_espera_nacional(mtimes: tuple) -> dict:
+    # tabela longa UF x ano x intervalo com todas as UFs, montada uma vez por processo
+    partes = [carregar_mamografia_uf(uf).assign(UF=uf) for uf in UFS]
+    return _tabela_espera(pd.concat(partes, ignore_index=True))
+
+
+@st.cache_resource(show_spinner=False, ttl=TTL_CONSULTAS)
+def _montar_espera_banco() -> dict:
+    return _tabela_espera(carregar_espera_banco())
+
+
+def _mtimes_estados() -> tuple:
+    return tuple(os.path.getmtime(CAMINHO_ESTADOS.format(uf=uf.lower())) for uf in UFS)
+
+
+def _espera() -> dict:
+    if banco_ativo():
+        try:
+            return _montar_espera_banco()
+        except Exception as e:
+            _aviso_banco(e)
+
+    return _montar_espera_nacional(_mtimes_estados())
+
+
+def carregar_espera_nacional() -> pd.DataFrame:
+    return _espera()["tabela"]
+
+
+def distribuicao_espera_uf(uf: str) -> pd.DataFrame:
+    # colunas: intervalo, qtd, pct (% de exames em cada intervalo nos últimos 3 anos)
+    return _espera()["ultimos_3_anos"][uf.upper()]
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _ler_json(caminho: str, mtime: float) -> dict:
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_json(caminho: str) -> dict:
+    return _ler_json(caminho, os.path.getmtime(caminho))
+
+
+def gravar_atomico(caminho: str, escrever) -> None:
+    # escrever(caminho_temporario) grava o conteúdo; a troca com os.replace faz
+    # quem lê (carregar_json, outros processos) nunca ver o arquivo pela metade
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    escrever(temporario)
+    os.replace(temporario, caminho)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _simplificar_original(nivel: str, mtime: float) -> dict:
+    tolerancia, casas = NIVEIS_GEOMETRIA[nivel]
+    return simplificar_geojson(carregar_json(GEOJSON_ORIGINAL), tolerancia, casas)
+
+
+def carregar_geometria_ra(nivel: str) -> dict:
+    caminho = caminho_geometria(nivel)
+    if os.path.exists(caminho):
+        return carregar_json(caminho)
+
+    # geometria ainda não preparada (python src/geometria.py):
+    # simplifica o original uma vez por processo
+    return _simplificar_original(nivel, os.path.getmtime(GEOJSON_ORIGINAL))
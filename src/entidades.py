@@ -0,0 +1,185 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Índice canônico das entidades que aparecem com grafias diferentes nos
+# datasets, no banco e no painel (RAs, UFs, tipos de equipamento e de exame).
+# Cada entidade tem um nome canônico e uma lista de apelidos; as chaves
+# normalizadas (sem acento, minúsculas, espaços simplificados) são calculadas
+# uma vez, na importação. Toda junção por nome deve passar por aqui.
+# O mesmo arquivo existe em Entregáveis/Unidade 3/ETL/entidades.py;
+# alterações devem ser feitas nos dois.
+
+# nome canônico -> apelidos (grafias vistas nas fontes, colunas dos CSVs)
+RAS = {
+    "Águas Claras": [],
+    "Arniqueira": [],
+    "Brazlândia": ["Brasilândia"],
+    "Candangolândia": [],
+    "Ceilândia": [],
+    "Cruzeiro": [],
+    "Fercal": [],
+    "Gama": [],
+    "Guará": [],
+    "Itapoã": [],
+    "Jardim Botânico": [],
+    "Lago Norte": [],
+    "Lago Sul": [],
+    "Núcleo Bandeirante": [],
+    "Paranoá": [],
+    "Park Way": [],
+    "Planaltina": [],
+    "Plano Piloto": ["Brasília"],
+    "Recanto das Emas": [],
+    "Riacho Fundo": ["Riacho Fundo I"],
+    "Riacho Fundo II": [],
+    "SCIA": ["SCIA/Estrutural", "Estrutural"],
+    "SIA": ["Setor de Indústria e Abastecimento"],
+    "Samambaia": [],
+    "Santa Maria": [],
+    "São Sebastião": [],
+    "Sobradinho": ["Sobradinho I"],
+    "Sobradinho II": [],
+    "Sol Nascente/Pôr do Sol": ["Sol Nascente", "Pôr do Sol"],
+    "Sudoeste/Octogonal": ["Sudoeste", "Octogonal"],
+    "Taguatinga": [],
+    "Varjão": [],
+    "Vicente Pires": [],
+}
+
+UFS = {
+    "AC": ["Acre"], "AL": ["Alagoas"], "AM": ["Amazonas"], "AP": ["Amapá"],
+    "BA": ["Bahia"], "CE": ["Ceará"], "DF": ["Distrito Federal"], "ES": ["Espírito Santo"],
+    "GO": ["Goiás"], "MA": ["Maranhão"], "MG": ["Minas Gerais"], "MS": ["Mato Grosso do Sul"],
+    "MT": ["Mato Grosso"], "PA": ["Pará"], "PB": ["Paraíba"], "PE": ["Pernambuco"],
+    "PI": ["Piauí"], "PR": ["Paraná"], "RJ": ["Rio de Janeiro"], "RN": ["Rio Grande do Norte"],
+    "RO": ["Rondônia"], "RR": ["Roraima"], "RS": ["Rio Grande do Sul"], "SC": ["Santa Catarina"],
+    "SE": ["Sergipe"], "SP": ["São Paulo"], "TO": ["Tocantins"],
+}
+
+TIPOS_EQUIPAMENTO = {
+    "Gama Câmara": ["qtd_gama_camara"],
+    "Mamógrafo com Comando Simples": ["Mamógrafo Comando Simples", "qtd_mamografo_comando_simples"],
+    "Mamógrafo com Estereotaxia": ["Mamógrafo Estereotaxia", "qtd_mamografo_estereotaxia"],
+    "Raio X até 100 mA": ["qtd_raio_X_100_mA"],
+    "Raio X de 100 a 500 mA": ["qtd_raio_X_100_500_mA"],
+    "Raio X mais de 500 mA": ["Raio X mais de 500mA", "qtd_raio_X_mais_500_mA"],
+    "Raio X Dentário": ["qtd_raio_X_dentario"],
+    "Raio X com Fluoroscopia": ["qtd_raio_X_fluoroscopia"],
+    "Raio X para Densitometria Óssea": ["qtd_raio_X_densitometria_ossea"],
+    "Raio X para Hemodinâmica": ["qtd_raio_X_hemodinamica"],
+    "Tomógrafo Computadorizado": ["qtd_tomógrafo_computadorizado"],
+    "Ressonância Magnética": ["qtd_ressonancia_magnetica"],
+    "Ultrassom Doppler Colorido": ["qtd_ultrassom_doppler_colorido"],
+    "Ultrassom Ecógrafo": ["qtd_ultrassom_ecografo"],
+    "Ultrassom Convencional": ["qtd_ultrassom_convencional"],
+    "Processadora de Filme Exclusiva para Mamografia": [
+        "Processadora de Filme Mamografia",
+        "Processadora de Filme Exclusiva Mamografia",
+        "qtd_processadora_de_filme_mamografia",
+    ],
+    "Mamógrafo Computadorizado": ["qtd_mamografo_computadorizado"],
+    "PET/CT": ["qtd_pet_ct"],
+}
+
+TIPOS_EXAME = {
+    "Diagnóstico por Endoscopia": ["Endoscopia"],
+    "Diagnóstico por Mamografia": ["Mamografia"],
+    "Diagnóstico por Radiologia": ["Radiologia"],
+    "Diagnóstico por Radiologia Intervencionista": ["Radiologia intervencionista"],
+    "Diagnóstico por Ressonância Magnética": ["Ressonancia magnetica"],
+    "Diagnóstico por Tomografia": ["Tomografia"],
+    "Diagnóstico por Ultrassonografia": ["Diagnostico por Ultrasonografia", "Ultrasonografia"],
+}
+
+ENTIDADES = {
+    "ra": RAS,
+    "uf": UFS,
+    "tipo_equipamento": TIPOS_EQUIPAMENTO,
+    "tipo_exame": TIPOS_EXAME,
+}
+
+
+def _sem_acento(texto: str) -> str:
+    n = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in n if not unicodedata.combining(c))
+
+
+def normalizar_nome(texto):
+    # "  Sol Nascente/  Pôr do Sol" -> "sol nascente/por do sol"
+    if not isinstance(texto, str):
+        return None
+    n = _sem_acento(texto).lower()
+    n = re.sub(r"\s*/\s*", "/", n)
+    return " ".join(n.replace("_", " ").split())
+
+
+def _montar_indice() -> dict:
+    indice = {}
+    for tipo, entidades in ENTIDADES.items():
+        chaves = {}
+        for nome, apelidos in entidades.items():
+            for grafia in [nome] + apelidos:
+                chave = normalizar_nome(grafia)
+                if chaves.get(chave, nome) != nome:
+                    raise ValueError(f"Apelido '{grafia}' de {tipo} aponta para '{chaves[chave]}' e '{nome}'.")
+                chaves[chave] = nome
+        indice[tipo] = chaves
+    return indice
+
+
+# tipo -> chave normalizada -> nome canônico
+INDICE = _montar_indice()
+
+# tipo -> grafia exata do índice (nome canônico ou apelido) -> nome canônico;
+# fixo, montado na importação
+_EXATOS = {
+    tipo: {grafia: nome for nome, apelidos in entidades.items() for grafia in [nome] + apelidos}
+    for tipo, entidades in ENTIDADES.items()
+}
+
+# grafias fora do índice (caixa, acentos, espaços, texto desconhecido) ficam
+# num cache limitado, para o processo do painel não crescer com a entrada
+TAMANHO_CACHE_GRAFIAS = 4096
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_GRAFIAS)
+def _canonico_normalizado(tipo: str, texto: str):
+    return INDICE[tipo].get(normalizar_nome(texto))
+
+
+def canonico(tipo: str, texto):
+    # nome canônico ou None se a grafia não for conhecida
+    exatos = _EXATOS[tipo]
+    if texto in exatos:
+        return exatos[texto]
+    if not isinstance(texto, str):
+        return None
+    return _canonico_normalizado(tipo, texto)
+
+
+def canonicos(tipo: str, serie: pd.Series) -> pd.Series:
+    # versão vetorizada de canonico (<NA> para grafias desconhecidas), alinhada
+    # ao índice da série; cada valor distinto é resolvido uma vez
+    categorias = serie.astype("string").astype("category")
+    nomes = [canonico(tipo, c) for c in categorias.cat.categories]
+    # código -1 (valor faltante) aponta para o None acrescentado no fim
+    nomes = np.array(nomes + [None], dtype=object)
+    return pd.Series(nomes[categorias.cat.codes.to_numpy()], index=serie.index, dtype="string")
+
+
+def chave_entidade(tipo: str, texto):
+    # chave de junção: a do nome canônico quando a grafia é conhecida
+    nome = canonico(tipo, texto)
+    return normalizar_nome(nome if nome is not None else texto)
+
+
+def grafias(tipo: str, nome: str) -> list:
+    # nome canônico e apelidos da entidade, com e sem acento, em minúsculas
+    # (filtros no banco com lower(nome) = ANY(...), que não ignora acentos)
+    nome = canonico(tipo, nome) or nome
+    todas = [nome] + ENTIDADES[tipo].get(nome, [])
+    return sorted({g.lower() for g in todas} | {_sem_acento(g).lower() for g in todas})
@@ -3,8 +3,28 @@ import pandas as pd
 import plotly.express as px
 import numpy as np
 
-#funções que geram kpi
-def kpi_exame_mais_requisitado(df):
+from dados import UFS, carregar_espera_nacional, distribuicao_espera_uf
+from entidades import canonicos
+from periodos import parse_datas_mensais
+
+MESES_PT = {
+    1: "Janeiro",
+    2: "Fevereiro",
+    3: "Março",
+    4: "Abril",
+    5: "Maio",
+    6: "Junho",
+    7: "Julho",
+    8: "Agosto",
+    9: "Setembro",
+    10: "Outubro",
+    11: "Novembro",
+    12: "Dezembro"
+}
+
+#funções que calculam os kpis: devolvem um dicionário com tipos simples
+#(int, float, str ou None), no mesmo formato das views kpi_* do banco
+def calcular_kpi_exame_mais_requisitado(df):
     # renomeia colunas para nomes mais curtos pra caber na kpi
     df = df.rename(columns={
         "Diagnostico por radiologia": "Radiologia",
@@ -19,7 +39,7 @@ def kpi_exame_mais_requisitado(df):
     colunas_subgrupo = [c for c in df.columns if c not in ["Ano atendimento", "Total"]]
 
     # Ano mais recente e ano anterior
-    ano_recente = df["Ano atendimento"].max()
+    ano_recente = int(df["Ano atendimento"].max())
     ano_anterior = ano_recente - 1
 
     # Linha do ano mais recente
@@ -27,61 +47,49 @@ def kpi_exame_mais_requisitado(df):
 
     # Subgrupo com maior número de exames no ano mais recente
     subgrupo_topo = linha_recente.idxmax()
-    valor_recente = linha_recente.max()
+    valor_recente = int(linha_recente.max())
 
     # Linha do ano anterior (se existir)
     linha_anterior = df.loc[df["Ano atendimento"] == ano_anterior, colunas_subgrupo]
 
     if not linha_anterior.empty:
-        valor_anterior = linha_anterior[subgrupo_topo].iloc[0]
-        diferenca_absoluta = valor_recente - valor_anterior
+        valor_anterior = int(linha_anterior[subgrupo_topo].iloc[0])
         if valor_anterior != 0:
-            diferenca_percentual = (diferenca_absoluta / valor_anterior) * 100
+            diferenca_percentual = ((valor_recente - valor_anterior) / valor_anterior) * 100
         else:
             diferenca_percentual = None
     else:
         valor_anterior = None
-        diferenca_absoluta = None
         diferenca_percentual = None
 
-    # Texto da variação (delta)
-    if diferenca_absoluta is None or diferenca_percentual is None:
-        texto_delta = "Sem dado do ano anterior"
-    else:
-        texto_delta = f"{diferenca_percentual:+.1f}% em relação ao ano de {ano_anterior}".replace(",", ".")
-
-    # Métrica no topo do dashboard
-    st.metric(
-        label=f"Grupo de exames de imagem mais realizado no SUS em {ano_recente}",
-        value=f"{subgrupo_topo}",
-        delta=texto_delta,
-        help=("Esta métrica refere-se ao grupo de exames de imagem mais requisitado," 
-        "ou seja, aquele com o maior número de registros de realizações encontrados "
-        "nas bases de dados do Ministério da Saúde no ano vigente \n\n"
-        "Última Atualização em 03/12/2025"),
-        delta_color="normal" 
-    )
+    return {
+        "ano": ano_recente,
+        "subgrupo": subgrupo_topo,
+        "quantidade": valor_recente,
+        "ano_anterior": ano_anterior,
+        "quantidade_anterior": valor_anterior,
+        "variacao_percentual": diferenca_percentual,
+    }
 
-def kpi_ra_mais_vulneravel(df1,df2):
-    equip = df1
-    pop = df2
+def calcular_kpi_ra_mais_vulneravel(df1,df2):
+    # os DataFrames recebidos não são alterados (podem vir do cache compartilhado)
+    equip_cols = [c for c in df1.columns if c != "ra"]
 
-    #padronização nomes das RAs
-    equip["ra"] = equip["ra"].str.strip().str.lower()
+    #nome canônico das RAs (entidades.py) e soma do total de equipamentos por RA
+    equip = df1.assign(
+        ra=canonicos("ra", df1["ra"]).fillna(df1["ra"].str.strip()),
+        total_equipamentos=df1[equip_cols].sum(axis=1)
+    )
 
     #renomeação coluna local pra ra
-    pop = pop.rename(columns={"Local": "ra"})
-    pop["ra"] = pop["ra"].str.strip().str.lower()
+    pop = df2.rename(columns={"Local": "ra"})
 
     # remoção linha agregada do DF, se existir
-    pop = pop[pop["ra"] != "df"]
-
-    # Soma do total de equipamentos por RA
-    equip_cols = [c for c in equip.columns if c != "ra"]
-    equip["total_equipamentos"] = equip[equip_cols].sum(axis=1)
+    pop = pop[canonicos("uf", pop["ra"]).isna()]
+    pop = pop.assign(ra=canonicos("ra", pop["ra"]).fillna(pop["ra"].str.strip()))
 
     # Calculo da proporção de pessoas sem plano
-    pop["prop_sem_plano"] = pop["Nao"] / pop["Total"]
+    pop = pop.assign(prop_sem_plano=pop["Nao"] / pop["Total"])
 
     # Junção das duas bases
     df = equip.merge(pop[["ra", "prop_sem_plano"]], on="ra", how="left")
@@ -97,66 +105,108 @@ def kpi_ra_mais_vulneravel(df1,df2):
 
     ra_pior = df.loc[df["score"].idxmin()]
 
-    ra_nome = ra_pior["ra"].title()
-    total_equip = int(ra_pior["total_equipamentos"])
-    prop_sem_plano = ra_pior["prop_sem_plano"] * 100
-
-    st.metric(
-        label="Região Administrativa com situação de saúde mais vulnerável",
-        value=f"{ra_nome}",
-        delta=f"{prop_sem_plano:.1f}% sem plano de saúde",
-        help=(
-            "Esta métrica refere-se à Região Administrativa mais vulnerável do Distrito Federal, "
-            "ou seja, aquela que possui o menor número de equipamentos de imagem em sua área "
-            "e o maior percentual de pessoas sem plano de saúde.\n\n"
-            "Última atualização: 03/12/2025."
-        ),
-        delta_color="off"
-    )
-
-def kpi_mes_com_mais_mamografias(df):
-
-    MESES_PT = {
-        1: "Janeiro",
-        2: "Fevereiro",
-        3: "Março",
-        4: "Abril",
-        5: "Maio",
-        6: "Junho",
-        7: "Julho",
-        8: "Agosto",
-        9: "Setembro",
-        10: "Outubro",
-        11: "Novembro",
-        12: "Dezembro"
+    return {
+        "ra": ra_pior["ra"],
+        "total_equipamentos": int(ra_pior["total_equipamentos"]),
+        "prop_sem_plano": float(ra_pior["prop_sem_plano"]),
     }
 
-    df["DATE"] = pd.to_datetime(df["DATE"])
+def calcular_kpi_mes_com_mais_mamografias(df):
+    datas = pd.to_datetime(df["DATE"])
+    df = df.assign(DATE=datas, ano=datas.dt.year, mes=datas.dt.month)
 
-    df["ano"] = df["DATE"].dt.year
-    df["mes"] = df["DATE"].dt.month
-
-    ano_atual = df["ano"].max()
+    ano_atual = int(df["ano"].max())
     ano_anterior = ano_atual - 1
 
     df_atual = df[df["ano"] == ano_atual]
 
     # Mês com mais mamografias no ano atual
     linha_top_atual = df_atual.loc[df_atual["Exames"].idxmax()]
-    mes_top_atual = int(linha_top_atual["mes"])
-    mes_nome_atual = MESES_PT[mes_top_atual]
-    exames_atual = int(linha_top_atual["Exames"])
 
     # busca do mês com MAIS exames no ano anterior
     df_anterior = df[df["ano"] == ano_anterior]
 
     if not df_anterior.empty:
         linha_top_anterior = df_anterior.loc[df_anterior["Exames"].idxmax()]
-        mes_top_anterior = int(linha_top_anterior["mes"])
-        mes_nome_anterior = MESES_PT[mes_top_anterior]
+        mes_anterior = int(linha_top_anterior["mes"])
         exames_anterior = int(linha_top_anterior["Exames"])
-        
-        diff = exames_atual - exames_anterior
+    else:
+        mes_anterior = None
+        exames_anterior = None
+
+    return {
+        "ano": ano_atual,
+        "mes": int(linha_top_atual["mes"]),
+        "exames": int(linha_top_atual["Exames"]),
+        "ano_anterior": ano_anterior,
+        "mes_anterior": mes_anterior,
+        "exames_anterior": exames_anterior,
+    }
+
+def calcular_kpi_links_sem_https(df):
+    col = "Links"
+
+    # normalização de valores
+    links = df[col].astype(str).str.strip().str.lower()
+
+    # links que começam com HTTPS (válidos)
+    mask_https = links.str.startswith("https://", na=False)
+
+    total = len(df)
+    com_https = int(mask_https.sum())
+    sem_https = total - com_https
+
+    return {
+        "total": total,
+        "sem_https": sem_https,
+        "perc_sem_https": (sem_https / total) * 100 if total > 0 else 0.0,
+    }
+
+#funções que exibem os kpis a partir dos valores calculados
+def mostrar_kpi_exame_mais_requisitado(kpi):
+    # Texto da variação (delta)
+    if kpi["variacao_percentual"] is None:
+        texto_delta = "Sem dado do ano anterior"
+    else:
+        texto_delta = f"{kpi['variacao_percentual']:+.1f}% em relação ao ano de {kpi['ano_anterior']}".replace(",", ".")
+
+    # Métrica no topo do dashboard
+    st.metric(
+        label=f"Grupo de exames de imagem mais realizado no SUS em {kpi['ano']}",
+        value=f"{kpi['subgrupo']}",
+        delta=texto_delta,
+        help=("Esta métrica refere-se ao grupo de exames de imagem mais requisitado," 
+        "ou seja, aquele com o maior número de registros de realizações encontrados "
+        "nas bases de dados do Ministério da Saúde no ano vigente \n\n"
+        "Última Atualização em 03/12/2025"),
+        delta_color="normal" 
+    )
+
+def mostrar_kpi_ra_mais_vulneravel(kpi):
+    prop_sem_plano = kpi["prop_sem_plano"] * 100
+
+    st.metric(
+        label="Região Administrativa com situação de saúde mais vulnerável",
+        value=f"{kpi['ra']}",
+        delta=f"{prop_sem_plano:.1f}% sem plano de saúde",
+        help=(
+            "Esta métrica refere-se à Região Administrativa mais vulnerável do Distrito Federal, "
+            "ou seja, aquela que possui o menor número de equipamentos de imagem em sua área "
+            "e o maior percentual de pessoas sem plano de saúde.\n\n"
+            "Última atualização: 03/12/2025."
+        ),
+        delta_color="off"
+    )
+
+def mostrar_kpi_mes_com_mais_mamografias(kpi):
+    mes_nome_atual = MESES_PT[kpi["mes"]]
+    ano_anterior = kpi["ano_anterior"]
+
+    if kpi["exames_anterior"] is not None:
+        mes_nome_anterior = MESES_PT[kpi["mes_anterior"]]
+        exames_anterior = kpi["exames_anterior"]
+
+        diff = kpi["exames"] - exames_anterior
         diff_pct = (diff / exames_anterior) * 100 if exames_anterior > 0 else None
 
         if diff_pct is not None:
@@ -164,13 +214,11 @@ def kpi_mes_com_mais_mamografias(df):
         else:
             delta_text = f"{diff:+} exames vs. {mes_nome_anterior}/{ano_anterior}"
     else:
-        exames_anterior = None
-        diff = 0
         delta_text = "Sem dados do ano anterior"
   
     # KPI final
     st.metric(
-        label=f"Mês com mais mamografias em {ano_atual}",
+        label=f"Mês com mais mamografias em {kpi['ano']}",
         value=f"{mes_nome_atual}",
         delta=delta_text,
         help=(
@@ -181,25 +229,10 @@ def kpi_mes_com_mais_mamografias(df):
         delta_color="normal"
     )
 
-def kpi_links_sem_https(df):
-    col = "Links"
-
-    # normalização de valores
-    df[col] = df[col].astype(str).str.strip().str.lower()
-
-    # links que começam com HTTPS (válidos)
-    mask_https = df[col].str.startswith("https://", na=False)
-
-    total = len(df)
-    com_https = mask_https.sum()
-    sem_https = total - com_https
-
-    perc_sem_https = (sem_https / total) * 100 if total > 0 else 0
-    perc_com_https = (com_https / total) * 100 if total > 0 else 0
-
+def mostrar_kpi_links_sem_https(kpi):
     st.metric(
         label="Páginas que NÃO implementam HTTPS",
-        value=f"{perc_sem_https:.1f}% sem criptografia",
+        value=f"{kpi['perc_sem_https']:.1f}% sem criptografia",
         help=("Esta métrica representa a porcentagem de páginas do portal DataSUS" 
         " que encontram-se vulneráveis por não adotarem o protocolo HTTPS no ano vigente \n\n"
         "Última Atualização em 03/12/2025"),
@@ -210,10 +243,13 @@ def kpi_links_sem_https(df):
 def gerar_grafico_proporcao_funcionamento(df):
     st.subheader("Proporção de Funcionamento dos Equipamentos do SUS no DF:")
 
-    df["parados"] = df["existentes_SUS"] - df["em_uso_SUS"]
+    parados = df["existentes_SUS"] - df["em_uso_SUS"]
 
-    df["pct_em_uso"] = (df["em_uso_SUS"] / df["existentes_SUS"]) * 100
-    df["pct_parados"] = (df["parados"] / df["existentes_SUS"]) * 100
+    df = df.assign(
+        parados=parados,
+        pct_em_uso=(df["em_uso_SUS"] / df["existentes_SUS"]) * 100,
+        pct_parados=(parados / df["existentes_SUS"]) * 100
+    )
 
     #filtro
     equip_sel = st.selectbox("Selecione o equipamento desejado",  
@@ -275,12 +311,15 @@ def gerar_grafico_proporcao_funcionamento(df):
     st.write("Última atualização em: dd/mm/aaaa")
 
 def gerar_dataset_escassez_SUS(df):
-    df["privado"] = df["existentes"] - df["existentes_SUS"]
-    df["publico"] = df["existentes_SUS"]
-
-    df["Desigualdade Percentual"] = ((df["privado"] - df["publico"]) / df["publico"]) * 100
-
-    df_rank = df[["equipamento", "privado", "publico", "Desigualdade Percentual"]].copy()
+    privado = df["existentes"] - df["existentes_SUS"]
+    publico = df["existentes_SUS"]
+
+    df_rank = pd.DataFrame({
+        "equipamento": df["equipamento"],
+        "privado": privado,
+        "publico": publico,
+        "Desigualdade Percentual": ((privado - publico) / publico) * 100
+    })
 
     df_rank = df_rank.sort_values("Desigualdade Percentual", ascending=False)
 
@@ -301,49 +340,85 @@ def gerar_dataset_escassez_SUS(df):
 
     st.write("Última atualização em: dd/mm/aaaa")
 
-def gerar_grafico_previsao_mamografias(df):
-    st.subheader("Projeção do Número de Mamografias no DF para 2026 com Modelo Estatístico de Séries Temporais SARIMAX (ARIMA Sazonal com Regressão Exógena)")
-    df_prev = df
-    df_prev["DATE"] = pd.to_datetime(df_prev["DATE"])
-
-    data_corte = pd.to_datetime("2025-10-01")
+def gerar_grafico_previsao_mamografias(dados_previsao):
+    # dados_previsao: dicionário de previsao.carregar_previsao_mamografia ou de
+    # previsao_rapida.prever_serie (que também traz "titulo" e "modelo")
+    df_antes = dados_previsao["historico"]
+    df_depois = dados_previsao["previsao"]
+    ano_final = df_depois["DATE"].max().year if not df_depois.empty else df_antes["DATE"].max().year
+    modelo = dados_previsao.get("modelo", "SARIMAX")
 
-    # Separar histórico e futuro
-    df_antes = df_prev[df_prev["DATE"] < data_corte]
-    df_depois = df_prev[df_prev["DATE"] >= data_corte]
+    if "titulo" in dados_previsao:
+        st.subheader(f"Projeção de {dados_previsao['titulo']} até {ano_final} ({modelo})")
+    else:
+        st.subheader(f"Projeção do Número de Mamografias no DF para {ano_final} com Modelo Estatístico de Séries Temporais SARIMAX (ARIMA Sazonal com Regressão Exógena)")
 
     fig = px.line()
 
     fig.add_scatter(
         x=df_antes["DATE"],
         y=df_antes["Exames"],
-        name="Histórico / Ajustado",
+        name="Histórico",
         line=dict(color="#1f77b4", width=2)
     )
 
     fig.add_scatter(
         x=df_depois["DATE"],
         y=df_depois["Exames"],
-        name="Previsão SARIMAX",
+        name=f"Previsão {modelo}",
         line=dict(color="red", width=2)
     )
 
     fig.update_layout(
         width=900,
         height=359,
-        title="Previsão de Demanda de Exames de Mamografia até 2026",
+        title=f"Previsão de {dados_previsao.get('titulo', 'Demanda de Exames de Mamografia')} até {ano_final}",
         xaxis_title="Data",
         yaxis_title="Quantidade de Exames"
     )
 
     st.plotly_chart(fig, use_container_width=True)
 
-    st.write("Última Atualização em 03/12/2025")
+    if dados_previsao["ajustado_em"]:
+        ajustado_em = pd.to_datetime(dados_previsao["ajustado_em"]).strftime("%d/%m/%Y")
+        st.write(f"Modelo ajustado em {ajustado_em}")
+    else:
+        st.write("Última Atualização em 03/12/2025")
+
+    if dados_previsao["atualizando"]:
+        st.caption("Novos meses disponíveis: o modelo está sendo reajustado e a previsão será atualizada em breve.")
+
+def mostrar_ranking_previsao(ranking):
+    # ranking: dicionário de backtest.carregar_ranking_previsao (None antes do primeiro backtest)
+    if ranking is None:
+        return
+
+    with st.expander("Comparação dos modelos de previsão (backtest com origem móvel)"):
+        if "mensagem" in ranking:
+            # série curta demais para o backtest
+            st.info(ranking["mensagem"])
+            return
+
+        st.dataframe(
+            pd.DataFrame(ranking["ranking"]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "MAPE (%)": st.column_config.NumberColumn("MAPE (%)", format="%.1f%%"),
+            },
+        )
+        primeira_origem = pd.to_datetime(ranking["primeira_origem"]).strftime("%m/%Y")
+        ultima_origem = pd.to_datetime(ranking["ultima_origem"]).strftime("%m/%Y")
+        st.caption(
+            f"Erros das previsões de 1 a {ranking['horizonte']} meses à frente, com o modelo ajustado "
+            f"só com os dados anteriores a cada mês de {primeira_origem} a {ultima_origem}. Menor MAE primeiro; meses em que "
+            f"algum modelo falhou (Falhas) ficam fora da comparação de todos."
+        )
 
 def paginas_com_mais_erros(df):
     st.subheader("Ranking das Páginas do Portal DataSUS com Maior Número de Erros de Acessibilidade Segundo o WAVE - Accessibility Evaluation Tool")
     # Limpeza de espaços no nome das colunas
-    df.columns = df.columns.str.strip()
+    df = df.rename(columns=str.strip)
 
     # Remoção de colunas completamente vazias
     colunas_vazias = [c for c in df.columns if df[c].isna().all()]
@@ -393,7 +468,7 @@ def distribuição_wave_bp(df):
     # LIMPEZA LEVE
     # ----------------------------------------
     # Remove espaços no nome das colunas (ex.: 'Links ' -> 'Links')
-    df.columns = df.columns.str.strip()
+    df = df.rename(columns=str.strip)
 
     # Remove colunas completamente vazias (ex.: 'Unnamed: 9')
     empty_cols = [c for c in df.columns if df[c].isna().all()]
@@ -456,7 +531,7 @@ def distribuicao_wave_aria_bp(df):
     # LIMPEZA LEVE
     # ----------------------------------------
     # Remove espaços no nome das colunas (ex.: 'Links ' -> 'Links')
-    df.columns = df.columns.str.strip()
+    df = df.rename(columns=str.strip)
 
     # Remove colunas completamente vazias (ex.: 'Unnamed: 9')
     empty_cols = [c for c in df.columns if df[c].isna().all()]
@@ -519,61 +594,23 @@ def distribuicao_wave_aria_bp(df):
 
     st.write("Última atualização em: dd/mm/aaaa")
 
-def carregar_mamografia_uf(uf: str) -> pd.DataFrame:
-    caminho = f"data_sets/estados/mamografia_atend{uf.lower()}.csv"
-    df = pd.read_csv(caminho, sep=";")
-    return df
-
-def preparar_distribuicao_tempo(df: pd.DataFrame) -> pd.DataFrame:
-    cols_intervalo = ["0 - 10 dias", "11 - 20 dias", "21 - 30 dias", "> 30 dias"]
-
-    cols_intervalo = [c for c in cols_intervalo if c in df.columns]
-
-    for c in cols_intervalo:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    df["Ano Resultado"] = pd.to_numeric(df["Ano Resultado"], errors="coerce")
-    df = df.dropna(subset=["Ano Resultado"])
-
-    df = df.sort_values("Ano Resultado")
-    df_3anos = df.tail(3)
-
-    soma = df_3anos[cols_intervalo].sum()
-    total = soma.sum()
-
-    dist = soma.reset_index()
-    dist.columns = ["intervalo", "qtd"]
-    dist["pct"] = (dist["qtd"] / total) * 100
-
-    return dist
-
 def grafico_barras_tempo_espera_df_vs_uf():
     st.subheader("Comparação DF X Brasil em Tempo de Espera para Realização de Mamografias nos últimos 3 anos")
-    ufs_disponiveis = [
-        "AC","AL","AM","AP","BA","CE","ES","GO","MA","MG","MS","MT","PA","PB",
-        "PE","PI","PR","RJ","RN","RO","RR","RS","SC","SE","SP","TO"
-    ]
+    ufs_disponiveis = [uf for uf in UFS if uf != "DF"]
 
-    uf_escolhida = st.selectbox(
-        "Selecione a UF para comparação",
+    ufs_escolhidas = st.multiselect(
+        "Selecione as UFs para comparação",
         options=ufs_disponiveis,
-        help=("Selecione a Unidade da Federação para comparação do tempo de espera (intervalo de tempo entre a solicitação do exame até a realização efetiva) com o Distrito Federal nos últimos 3 anos"),
-        width=250,
-        index=24  
+        default=["SP"],
+        help=("Selecione as Unidades da Federação para comparação do tempo de espera (intervalo de tempo entre a solicitação do exame até a realização efetiva) com o Distrito Federal nos últimos 3 anos"),
+        width=350
     )
 
-    # Carrega dados
-    df_df = carregar_mamografia_uf("DF")
-    df_uf = carregar_mamografia_uf(uf_escolhida)
-
-    # Prepara distribuição percentual
-    dist_df = preparar_distribuicao_tempo(df_df)
-    dist_uf = preparar_distribuicao_tempo(df_uf)
-
-    dist_df["UF"] = "DF"
-    dist_uf["UF"] = uf_escolhida
-
-    df_comp = pd.concat([dist_df, dist_uf], ignore_index=True)
+    # Distribuição percentual já agregada por UF (tabela nacional em cache)
+    df_comp = pd.concat(
+        [distribuicao_espera_uf(uf).assign(UF=uf) for uf in ["DF"] + ufs_escolhidas],
+        ignore_index=True
+    )
 
     fig = px.bar(
         df_comp,
@@ -588,7 +625,7 @@ def grafico_barras_tempo_espera_df_vs_uf():
             "pct": "Percentual de exames (%)",
             "UF": "Unidade da Federação"
         },
-        title=f"Tempo de espera para Realização de mamografias DF vs {uf_escolhida}"
+        title=f"Tempo de espera para Realização de mamografias DF vs {', '.join(ufs_escolhidas) or 'demais UFs'}"
     )
 
     fig.update_traces(
@@ -610,33 +647,79 @@ def grafico_barras_tempo_espera_df_vs_uf():
 
     st.write("Última atualização em: dd/mm/aaaa")
 
-def parse_data_mensal(s: str):
+def grafico_ranking_espera_ufs():
+    st.subheader("Ranking Nacional das UFs pelo Percentual de Mamografias com Espera Superior a 30 Dias")
 
-    MES_MAP = {
-    "jan.": 1, "fev.": 2, "mar.": 3, "abr.": 4, "mai.": 5, "jun.": 6,
-    "jul.": 7, "ago.": 8, "set.": 9, "out.": 10, "nov.": 11, "dez.": 12
-    }
+    # tabela longa UF x ano x intervalo já montada e em cache
+    tabela = carregar_espera_nacional()
+
+    ano_min = int(tabela["ano"].min())
+    ano_max = int(tabela["ano"].max())
+
+    ano_ini, ano_fim = st.slider(
+        "Período considerado",
+        min_value=ano_min,
+        max_value=ano_max,
+        value=(max(ano_min, ano_max - 2), ano_max),
+        width=400,
+        help="Selecione o intervalo de anos usado no cálculo do percentual de exames com espera superior a 30 dias"
+    )
+
+    # um único groupby para todas as UFs
+    periodo = tabela[tabela["ano"].between(ano_ini, ano_fim)]
+    qtd = periodo.groupby(["UF", "intervalo"], observed=True)["qtd"].sum().unstack("intervalo")
+    total = qtd.sum(axis=1)
+
+    ranking = pd.DataFrame({
+        "UF": qtd.index,
+        "pct_30_mais": (qtd["> 30 dias"] / total.where(total > 0)) * 100
+    }).dropna().sort_values("pct_30_mais")
+
+    ranking = ranking.assign(destaque=np.where(ranking["UF"] == "DF", "DF", "Demais UFs"))
+
+    fig = px.bar(
+        ranking,
+        x="pct_30_mais",
+        y="UF",
+        color="destaque",
+        orientation="h",
+        text="pct_30_mais",
+        color_discrete_map={
+            "DF": "#A6313E",
+            "Demais UFs": "#1A9988"
+        },
+        labels={
+            "pct_30_mais": "Exames com espera > 30 dias (%)",
+            "UF": "Unidade da Federação",
+            "destaque": ""
+        },
+        title=f"Percentual de mamografias com espera superior a 30 dias ({ano_ini}-{ano_fim})"
+    )
 
-    if pd.isna(s):
-        return pd.NaT
-    try:
-        ano, mes = str(s).split("/")
-        mes = mes.strip()
-        m = MES_MAP.get(mes)
-        return pd.Timestamp(int(ano), m, 1)
-    except Exception:
-        return pd.NaT
+    fig.update_traces(
+        texttemplate="%{x:.1f}%",
+        textposition="outside"
+    )
+
+    fig.update_layout(
+        xaxis_title="Exames com espera > 30 dias (%)",
+        yaxis_title="",
+        yaxis={"categoryorder": "array", "categoryarray": ranking["UF"].tolist()},
+        showlegend=False,
+        height=700
+    )
+    fig.update_xaxes(range=[0, 100])
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.write("Última atualização em: dd/mm/aaaa")
 
 def grafico_tendencia_profissionais_radiologia(df1,df2,df3):
     st.subheader("Tendência temporal de profissionais de radiologia por categoria (2007-2025)")
-    df_aux = df1
-    df_dent = df2
-    df_med = df3
-
     # tratamento de data
-    df_aux["data"] = df_aux["Data"].apply(parse_data_mensal)
-    df_dent["data"] = df_dent["Ocupações de Nível Superior"].apply(parse_data_mensal)
-    df_med["data"] = df_med["Ano/mês compet."].apply(parse_data_mensal)
+    df_aux = df1.assign(data=parse_datas_mensais(df1["Data"]))
+    df_dent = df2.assign(data=parse_datas_mensais(df2["Ocupações de Nível Superior"]))
+    df_med = df3.assign(data=parse_datas_mensais(df3["Ano/mês compet."]))
 
     # Remoção linhas sem data por segurança
     df_aux = df_aux.dropna(subset=["data"])
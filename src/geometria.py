@@ -0,0 +1,189 @@
+import json
+import os
+
+import numpy as np
+
+from entidades import canonico
+
+# Preparação das geometrias das RAs para o mapa.
+# O GeoJSON original (~3 MB) é simplificado uma única vez em alguns níveis de
+# resolução e salvo em data_sets/geometria/. Para executar:
+#   python src/geometria.py
+
+GEOJSON_ORIGINAL = "data_sets/Limite_RA_20190.json"
+PASTA_GEOMETRIA = "data_sets/geometria"
+RA_FIELD_GJ = "ra"
+
+# nível: (tolerância de Douglas-Peucker em graus, casas decimais da quantização)
+# 0.0001 grau ~ 11 m no DF
+NIVEIS_GEOMETRIA = {
+    "alta": (0.0001, 5),
+    "media": (0.0005, 4),
+    "baixa": (0.002, 3),
+}
+
+NIVEL_PADRAO = "media"
+
+
+def nome_ra_canonico(nome: str) -> str:
+    return canonico("ra", nome) or nome
+
+
+def caminho_geometria(nivel: str) -> str:
+    nome = os.path.splitext(os.path.basename(GEOJSON_ORIGINAL))[0]
+    return os.path.join(PASTA_GEOMETRIA, f"{nome}_{nivel}.json")
+
+
+def _douglas_peucker(pontos: np.ndarray, tolerancia: float) -> np.ndarray:
+    # versão iterativa; devolve a máscara dos pontos mantidos (extremos sempre ficam)
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, len(pontos) - 1)]
+
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2:
+            continue
+
+        a, b = pontos[ini], pontos[fim]
+        meio = pontos[ini + 1:fim]
+        ab = b - a
+        comprimento = np.hypot(ab[0], ab[1])
+
+        if comprimento == 0:
+            dist = np.hypot(meio[:, 0] - a[0], meio[:, 1] - a[1])
+        else:
+            dist = np.abs(ab[0] * (meio[:, 1] - a[1]) - ab[1] * (meio[:, 0] - a[0])) / comprimento
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerancia:
+            idx = ini + 1 + i
+            manter[idx] = True
+            pilha.append((ini, idx))
+            pilha.append((idx, fim))
+
+    return manter
+
+
+def _encontrar_juncoes(aneis: list) -> set:
+    # Um vértice é junção quando aparece em anéis diferentes com vizinhos
+    # diferentes, ou seja, onde uma fronteira compartilhada começa ou termina.
+    # Cortar os anéis nesses pontos garante que as duas RAs vizinhas
+    # simplifiquem exatamente o mesmo trecho de fronteira.
+    vizinhos = {}
+    juncoes = set()
+
+    for anel in aneis:
+        n = len(anel) - 1  # o último ponto repete o primeiro
+        for i in range(n):
+            p = anel[i]
+            par = frozenset((anel[i - 1], anel[i + 1]))
+            anterior = vizinhos.setdefault(p, par)
+            if anterior != par:
+                juncoes.add(p)
+
+    return juncoes
+
+
+def _simplificar_trecho(trecho: list, tolerancia: float, cache: dict) -> list:
+    # orientação canônica: o mesmo trecho percorrido nos dois sentidos
+    # (uma vez por RA vizinha) gera exatamente o mesmo resultado
+    invertido = trecho[::-1]
+    chave = min(tuple(trecho), tuple(invertido))
+
+    if chave not in cache:
+        pontos = np.asarray(chave, dtype=float)
+        manter = _douglas_peucker(pontos, tolerancia)
+        cache[chave] = [chave[i] for i in np.flatnonzero(manter)]
+
+    simplificado = cache[chave]
+    return simplificado if chave == tuple(trecho) else simplificado[::-1]
+
+
+def _simplificar_anel(anel: list, juncoes: set, tolerancia: float, cache: dict) -> list:
+    n = len(anel) - 1
+    cortes = [i for i in range(n) if anel[i] in juncoes]
+
+    if not cortes:
+        # anel isolado (sem vizinhos): fixa o primeiro ponto e o mais distante dele
+        pontos = np.asarray(anel[:n], dtype=float)
+        oposto = int(np.argmax(np.hypot(*(pontos - pontos[0]).T)))
+        cortes = [0, oposto] if oposto > 0 else [0]
+
+    # rotaciona o anel para começar em uma junção e corta em trechos
+    inicio = cortes[0]
+    rotacionado = anel[inicio:n] + anel[:inicio + 1]
+    posicoes = [c - inicio for c in cortes] + [n]
+
+    resultado = [rotacionado[0]]
+    for a, b in zip(posicoes[:-1], posicoes[1:]):
+        trecho = rotacionado[a:b + 1]
+        resultado.extend(_simplificar_trecho(trecho, tolerancia, cache)[1:])
+
+    # anel degenerado: mantém o original para não abrir buracos no mapa
+    if len(resultado) < 4:
+        return anel
+    return resultado
+
+
+def simplificar_geojson(gj: dict, tolerancia: float, casas_decimais: int) -> dict:
+    # quantização prévia dos vértices: pontos que só diferem por ruído de
+    # precisão passam a ser o mesmo vértice compartilhado
+    def quantizar(anel):
+        return [(round(x, 7), round(y, 7)) for x, y in anel]
+
+    geometrias = []
+    for feature in gj["features"]:
+        geom = feature["geometry"]
+        if geom["type"] == "Polygon":
+            poligonos = [geom["coordinates"]]
+        else:
+            poligonos = geom["coordinates"]
+        geometrias.append([[quantizar(anel) for anel in pol] for pol in poligonos])
+
+    aneis = [anel for pols in geometrias for pol in pols for anel in pol]
+    juncoes = _encontrar_juncoes(aneis)
+    cache = {}
+
+    features = []
+    for feature, pols in zip(gj["features"], geometrias):
+        coords = []
+        for pol in pols:
+            novo_pol = []
+            for anel in pol:
+                simplificado = _simplificar_anel(anel, juncoes, tolerancia, cache)
+                novo_pol.append([[round(x, casas_decimais), round(y, casas_decimais)] for x, y in simplificado])
+            coords.append(novo_pol)
+
+        features.append({
+            "type": "Feature",
+            # o mapa só usa o nome da RA, gravado já no nome canônico
+            "properties": {RA_FIELD_GJ: nome_ra_canonico(feature["properties"][RA_FIELD_GJ])},
+            "geometry": {"type": "MultiPolygon", "coordinates": coords},
+        })
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+def preparar_geometrias(caminho_origem: str = GEOJSON_ORIGINAL) -> dict:
+    with open(caminho_origem, "r", encoding="utf-8") as f:
+        gj = json.load(f)
+
+    os.makedirs(PASTA_GEOMETRIA, exist_ok=True)
+
+    tamanhos = {}
+    for nivel, (tolerancia, casas) in NIVEIS_GEOMETRIA.items():
+        simplificado = simplificar_geojson(gj, tolerancia, casas)
+        caminho = caminho_geometria(nivel)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(simplificado, f, ensure_ascii=False, separators=(",", ":"))
+        tamanhos[nivel] = os.path.getsize(caminho)
+
+    return tamanhos
+
+
+if __name__ == "__main__":
+    original = os.path.getsize(GEOJSON_ORIGINAL)
+    print(f"GeoJSON original: {original / 1024:.0f} KB")
+    for nivel, tamanho in preparar_geometrias().items():
+        print(f"  {nivel}: {tamanho / 1024:.0f} KB ({original / tamanho:.0f}x menor)")
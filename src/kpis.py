@@ -0,0 +1,109 @@
+import json
+import os
+from datetime import datetime
+
+import streamlit as st
+
+from banco import banco_ativo, carregar_kpis_banco
+from dados import DATASETS, PASTA_SNAPSHOTS, carregar_dataset, carregar_json, hash_fonte
+from funcoes import (
+    calcular_kpi_exame_mais_requisitado,
+    calcular_kpi_ra_mais_vulneravel,
+    calcular_kpi_mes_com_mais_mamografias,
+    calcular_kpi_links_sem_https,
+)
+
+# Valores dos quatro KPIs do topo do painel. No modo banco vêm das views
+# materializadas kpi_* (uma linha por KPI, atualizadas pelo ETL); KPI sem
+# linha na view é calculado a partir dos datasets.
+# No modo CSV vêm do snapshot data_sets/parquet/kpis.json, que guarda o
+# sha256 dos CSVs usados: se algum deles mudar, os KPIs são recalculados uma
+# vez e o snapshot é regravado. Para gerar o snapshot antes do deploy:
+#   python src/kpis.py
+
+# incrementar quando mudar o cálculo de algum KPI (invalida snapshots antigos)
+VERSAO_SNAPSHOT_KPIS = 1
+
+SNAPSHOT_KPIS = os.path.join(PASTA_SNAPSHOTS, "kpis.json")
+
+# KPI -> (datasets de entrada, cálculo em funcoes.py)
+CALCULOS_KPI = {
+    "exame_mais_requisitado": (["exames_subgrupos"], calcular_kpi_exame_mais_requisitado),
+    "ra_mais_vulneravel": (["equipamentos_ra", "populacao_plano_ra"], calcular_kpi_ra_mais_vulneravel),
+    "mes_com_mais_mamografias": (["demanda_mamografia"], calcular_kpi_mes_com_mais_mamografias),
+    "links_sem_https": (["wave"], calcular_kpi_links_sem_https),
+}
+
+
+def calcular_kpi(nome: str) -> dict:
+    datasets, calcular = CALCULOS_KPI[nome]
+    return calcular(*[carregar_dataset(d) for d in datasets])
+
+
+def hashes_fontes() -> dict:
+    # CSV de origem -> sha256 (só relê o arquivo quando o mtime muda)
+    caminhos = sorted({DATASETS[d]["caminho"] for datasets, _ in CALCULOS_KPI.values() for d in datasets})
+    return {caminho: hash_fonte(caminho) for caminho in caminhos}
+
+
+def gerar_snapshot_kpis(fontes: dict) -> dict:
+    snapshot = {
+        "versao": VERSAO_SNAPSHOT_KPIS,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "fontes": fontes,
+        "kpis": {nome: calcular_kpi(nome) for nome in CALCULOS_KPI},
+    }
+
+    # grava em um arquivo temporário e troca: quem lê nunca vê o JSON pela metade
+    os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+    temporario = f"{SNAPSHOT_KPIS}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, SNAPSHOT_KPIS)
+
+    return snapshot
+
+
+def _snapshot_valido(fontes: dict):
+    if not os.path.exists(SNAPSHOT_KPIS):
+        return None
+
+    snapshot = carregar_json(SNAPSHOT_KPIS)
+    if snapshot.get("versao") != VERSAO_SNAPSHOT_KPIS or snapshot.get("fontes") != fontes:
+        return None
+    return snapshot["kpis"]
+
+
+# chave do cache: os hashes das fontes; um CSV alterado gera um novo snapshot
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _reconstruir_snapshot(fontes: tuple) -> dict:
+    try:
+        return gerar_snapshot_kpis(dict(fontes))["kpis"]
+    except OSError as e:
+        # pasta sem permissão de escrita: os valores ficam só no cache do processo
+        print(f"[AVISO] Não foi possível gravar {SNAPSHOT_KPIS} ({e}).")
+        return {nome: calcular_kpi(nome) for nome in CALCULOS_KPI}
+
+
+def _kpis_csv() -> dict:
+    fontes = hashes_fontes()
+    return _snapshot_valido(fontes) or _reconstruir_snapshot(tuple(fontes.items()))
+
+
+def carregar_kpis() -> dict:
+    # nome do KPI -> dicionário no formato das funções calcular_kpi_*
+    if not banco_ativo():
+        return _kpis_csv()
+
+    kpis = {}
+    try:
+        kpis = carregar_kpis_banco()
+    except Exception as e:
+        print(f"[AVISO] KPIs indisponíveis no banco ({e}). Calculando a partir dos datasets.")
+
+    return {nome: kpis.get(nome) or calcular_kpi(nome) for nome in CALCULOS_KPI}
+
+
+if __name__ == "__main__":
+    snapshot = gerar_snapshot_kpis(hashes_fontes())
+    print(f"{len(snapshot['kpis'])} KPIs em {SNAPSHOT_KPIS}")
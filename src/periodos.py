@@ -0,0 +1,78 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Conversão vetorizada dos períodos mensais que aparecem nos datasets:
+#   "2007/ago."     (ano/mês abreviado - TABNET/CNES)
+#   "JANEIRO/2020"  (mês por extenso/ano - SIA)
+# O mesmo arquivo existe em Entregáveis/Unidade 3/ETL/periodos.py;
+# alterações devem ser feitas nos dois.
+
+MESES = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+
+def _numero_mes(texto) -> float:
+    # aplicada só nos valores distintos (categorias), não em cada linha
+    if not isinstance(texto, str):
+        return np.nan
+    chave = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    chave = chave.strip().lower().rstrip(".")
+    return MESES.get(chave, np.nan)
+
+
+def _parse_valores(texto: pd.Series) -> tuple:
+    partes = texto.str.split("/", n=1, expand=True).reindex(columns=[0, 1])
+
+    esquerda = partes[0].str.strip()
+    direita = partes[1].str.strip()
+
+    num_esquerda = pd.to_numeric(esquerda, errors="coerce")
+    num_direita = pd.to_numeric(direita, errors="coerce")
+
+    # "2007/ago." tem o ano à esquerda; "JANEIRO/2020", à direita
+    ano_esquerda = num_esquerda.notna()
+    ano = num_esquerda.where(ano_esquerda, num_direita).astype("float64")
+    texto_mes = direita.where(ano_esquerda, esquerda)
+    mes = texto_mes.map(_numero_mes).astype("float64")
+
+    validos = ano.notna() & mes.notna() & (ano % 1 == 0)
+    return ano.where(validos).to_numpy(), mes.where(validos).to_numpy()
+
+
+def parse_ano_mes(serie: pd.Series) -> pd.DataFrame:
+    # devolve DataFrame com colunas ano e mes (Int64, <NA> quando inválido),
+    # alinhado ao índice da série recebida.
+    # Os períodos se repetem muito, então o texto é tratado só nos valores
+    # distintos (categorias) e o resultado é distribuído pelos códigos.
+    categorias = serie.astype("string").str.strip().astype("category")
+    unicos = pd.Series(categorias.cat.categories, dtype="string")
+
+    ano, mes = _parse_valores(unicos)
+    # código -1 (valor faltante) aponta para o NaN acrescentado no fim
+    ano = np.append(ano, np.nan)
+    mes = np.append(mes, np.nan)
+    codigos = categorias.cat.codes.to_numpy()
+
+    return pd.DataFrame({
+        "ano": pd.array(ano[codigos]).astype("Int64"),
+        "mes": pd.array(mes[codigos]).astype("Int64"),
+    }, index=serie.index)
+
+
+def parse_datas_mensais(serie: pd.Series) -> pd.Series:
+    # primeiro dia do mês como datetime64 (NaT quando inválido)
+    periodos = parse_ano_mes(serie)
+    return pd.to_datetime(
+        pd.DataFrame({
+            "year": periodos["ano"].astype("float64"),
+            "month": periodos["mes"].astype("float64"),
+            "day": 1,
+        }),
+        errors="coerce"
+    )
@@ -0,0 +1,242 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+import pandas as pd
+
+from dados import carregar_dataset, carregar_json, gravar_atomico
+
+# Previsão da demanda mensal de mamografias no DF com SARIMAX e o regressor
+# exógeno Pandemia (mesmo modelo do notebook "SARIMAX .ipynb" da Unidade 4).
+# O modelo ajustado é gravado em data_sets/modelos/ com o sha256 da série
+# usada no ajuste; o painel só lê a previsão gravada. Quando a série muda
+# (mês novo no CSV ou no exame_realizado), o reajuste roda em segundo plano,
+# uma vez por processo, e o painel continua mostrando a última previsão
+# (ou a previsão estática de previsao_1_ano.csv) até ele terminar.
+# Precisa do statsmodels; sem ele o painel usa só a previsão estática.
+# Para ajustar antes do deploy:
+#   python src/previsao.py
+
+PASTA_MODELOS = "data_sets/modelos"
+
+# incrementar quando mudar a especificação do modelo (invalida os modelos gravados)
+VERSAO_MODELO = 1
+
+HORIZONTE_PREVISAO = 12
+
+# ordens escolhidas pelo auto_arima do notebook para a série do DF
+ORDEM = (0, 1, 1)
+ORDEM_SAZONAL = (0, 0, 1, 12)
+
+# meses marcados com Pandemia = 1 em demanda_historica_Exames_Mamografia.csv;
+# usados quando a série vem do banco, que não tem a coluna
+INICIO_PANDEMIA = pd.Timestamp("2020-05-01")
+FIM_PANDEMIA = pd.Timestamp("2020-09-01")
+
+SERIE_MAMOGRAFIA_DF = "mamografia_df"
+
+
+def statsmodels_disponivel() -> bool:
+    return importlib.util.find_spec("statsmodels") is not None
+
+
+def serie_mamografia() -> pd.DataFrame:
+    # colunas DATE (início do mês), Exames e Pandemia, um mês por linha
+    df = carregar_dataset("demanda_mamografia")
+    datas = pd.to_datetime(df["DATE"])
+
+    if "Pandemia" in df.columns:
+        pandemia = df["Pandemia"].astype(int)
+    else:
+        pandemia = datas.between(INICIO_PANDEMIA, FIM_PANDEMIA).astype(int)
+
+    colunas = {"DATE": datas, "Exames": df["Exames"].astype(float), "Pandemia": pandemia}
+    # SESDF (segundo regressor do notebook) só quando a fonte tiver a coluna
+    if "SESDF" in df.columns:
+        colunas["SESDF"] = df["SESDF"].astype(float)
+    return pd.DataFrame(colunas).sort_values("DATE", ignore_index=True)
+
+
+def hash_serie(serie: pd.DataFrame) -> str:
+    # muda com um mês novo ou com a revisão de um mês já carregado
+    conteudo = serie[["DATE", "Exames", "Pandemia"]].to_csv(index=False, date_format="%Y-%m")
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def caminhos_modelo(nome: str) -> tuple:
+    # (modelo serializado, metadados com a previsão)
+    base = os.path.join(PASTA_MODELOS, f"sarimax_{nome}")
+    return f"{base}.pkl", f"{base}.json"
+
+
+def ajustar_sarimax(
+    serie: pd.DataFrame,
+    ordem: tuple = ORDEM,
+    ordem_sazonal: tuple = ORDEM_SAZONAL,
+    exogenas: tuple = ("Pandemia",),
+):
+    # importado aqui para o painel não depender do statsmodels
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    mensal = serie.set_index("DATE").asfreq("MS")
+    modelo = SARIMAX(
+        endog=mensal["Exames"],
+        exog=mensal[list(exogenas)].fillna(0),
+        order=ordem,
+        seasonal_order=ordem_sazonal,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return modelo.fit(disp=False)
+
+
+def prever(resultado, horizonte: int = HORIZONTE_PREVISAO, exogenas_futuras: pd.DataFrame = None) -> pd.DataFrame:
+    # Pandemia zerada no futuro (sem pandemia); os demais regressores do ajuste
+    # (ex.: SESDF) não têm valor neutro e vêm de exogenas_futuras, uma linha
+    # por mês previsto
+    ultima_data = resultado.model.data.row_labels[-1]
+    datas = pd.date_range(ultima_data + pd.DateOffset(months=1), periods=horizonte, freq="MS")
+
+    exog = pd.DataFrame(index=datas)
+    for coluna in resultado.model.exog_names:
+        if coluna == "Pandemia":
+            exog[coluna] = 0
+        elif exogenas_futuras is not None and coluna in exogenas_futuras.columns and len(exogenas_futuras) >= horizonte:
+            exog[coluna] = exogenas_futuras[coluna].to_numpy()[:horizonte]
+        else:
+            raise ValueError(f"Faltam os {horizonte} valores futuros do regressor '{coluna}' em exogenas_futuras.")
+
+    previsao = resultado.forecast(steps=horizonte, exog=exog)
+    return pd.DataFrame({"DATE": datas, "Exames": previsao.to_numpy()})
+
+
+def treinar_e_salvar(nome: str, serie: pd.DataFrame) -> dict:
+    resultado = ajustar_sarimax(serie)
+    previsao = prever(resultado)
+
+    metadados = {
+        "versao": VERSAO_MODELO,
+        "serie": nome,
+        "sha256_dados": hash_serie(serie),
+        "ultimo_mes": serie["DATE"].max().strftime("%Y-%m"),
+        "meses": len(serie),
+        "ordem": list(ORDEM),
+        "ordem_sazonal": list(ORDEM_SAZONAL),
+        "aic": float(resultado.aic),
+        "ajustado_em": datetime.now().isoformat(timespec="seconds"),
+        "previsao": {
+            "DATE": previsao["DATE"].dt.strftime("%Y-%m-%d").tolist(),
+            "Exames": previsao["Exames"].tolist(),
+        },
+    }
+
+    os.makedirs(PASTA_MODELOS, exist_ok=True)
+    caminho_modelo, caminho_metadados = caminhos_modelo(nome)
+
+    def escrever_modelo(caminho):
+        with open(caminho, "wb") as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def escrever_metadados(caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(metadados, f, ensure_ascii=False, indent=2)
+
+    # metadados por último: só apontam para um modelo já gravado
+    gravar_atomico(caminho_modelo, escrever_modelo)
+    gravar_atomico(caminho_metadados, escrever_metadados)
+    return metadados
+
+
+def carregar_modelo(nome: str):
+    # resultado do statsmodels gravado por treinar_e_salvar (para prever outros horizontes)
+    caminho_modelo, _ = caminhos_modelo(nome)
+    with open(caminho_modelo, "rb") as f:
+        return pickle.load(f)
+
+
+def carregar_metadados(nome: str):
+    _, caminho_metadados = caminhos_modelo(nome)
+    if not os.path.exists(caminho_metadados):
+        return None
+
+    metadados = carregar_json(caminho_metadados)
+    if metadados.get("versao") != VERSAO_MODELO:
+        return None
+    return metadados
+
+
+# reajustes fora da requisição, um de cada vez
+_REAJUSTES = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sarimax")
+
+
+def _treinar_em_segundo_plano(nome: str, serie: pd.DataFrame) -> dict:
+    try:
+        metadados = treinar_e_salvar(nome, serie)
+    except Exception as e:
+        print(f"[AVISO] Falha ao reajustar o modelo {nome} ({e}). Mantendo a previsão anterior.")
+        # fica no Future: carregar_previsao_mamografia tira do cache e tenta de novo
+        raise
+    print(f"Modelo {nome} reajustado até {metadados['ultimo_mes']} (AIC {metadados['aic']:.1f}).")
+    return metadados
+
+
+# um reajuste por série e versão dos dados em cada processo
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _agendar_treino(nome: str, sha256_dados: str, _serie: pd.DataFrame) -> Future:
+    return _REAJUSTES.submit(_treinar_em_segundo_plano, nome, _serie)
+
+
+def _previsao_estatica(historico: pd.DataFrame) -> pd.DataFrame:
+    # meses de previsao_1_ano.csv (exportado do notebook) depois do histórico
+    df = carregar_dataset("previsao_mamografia")
+    df = df.assign(DATE=pd.to_datetime(df["DATE"]))
+    return df.loc[df["DATE"] > historico["DATE"].max(), ["DATE", "Exames"]].reset_index(drop=True)
+
+
+def carregar_previsao_mamografia() -> dict:
+    # {"historico": DATE/Exames, "previsao": DATE/Exames,
+    #  "ajustado_em": data do ajuste ou None, "atualizando": reajuste em andamento}
+    serie = serie_mamografia()
+    historico = serie[["DATE", "Exames"]]
+    sha256_dados = hash_serie(serie)
+
+    metadados = carregar_metadados(SERIE_MAMOGRAFIA_DF)
+    atualizado = metadados is not None and metadados["sha256_dados"] == sha256_dados
+
+    atualizando = False
+    if not atualizado and statsmodels_disponivel():
+        tarefa = _agendar_treino(SERIE_MAMOGRAFIA_DF, sha256_dados, serie)
+        atualizando = not tarefa.done()
+        if not atualizando and tarefa.exception() is not None:
+            # reajuste que falhou não fica no cache: a próxima requisição tenta de novo
+            _agendar_treino.clear(SERIE_MAMOGRAFIA_DF, sha256_dados, serie)
+
+    if metadados is None:
+        return {
+            "historico": historico,
+            "previsao": _previsao_estatica(historico),
+            "ajustado_em": None,
+            "atualizando": atualizando,
+        }
+
+    previsao = pd.DataFrame(metadados["previsao"])
+    return {
+        "historico": historico,
+        "previsao": previsao.assign(DATE=pd.to_datetime(previsao["DATE"])),
+        "ajustado_em": metadados["ajustado_em"],
+        "atualizando": atualizando,
+    }
+
+
+if __name__ == "__main__":
+    metadados = treinar_e_salvar(SERIE_MAMOGRAFIA_DF, serie_mamografia())
+    print(
+        f"Modelo {SERIE_MAMOGRAFIA_DF}: {metadados['meses']} meses até {metadados['ultimo_mes']}, "
+        f"AIC {metadados['aic']:.1f}, previsão de {HORIZONTE_PREVISAO} meses em {PASTA_MODELOS}"
+    )
@@ -0,0 +1,167 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from dados import carregar_dataset, carregar_espera_nacional, UFS
+from entidades import canonico
+from previsao import serie_mamografia
+
+# Previsões de referência só com NumPy, rápidas o bastante para rodar dentro
+# da requisição do painel (poucos milissegundos por série): sazonal ingênuo,
+# média móvel sazonal e Holt-Winters aditivo. Servem para as séries que o
+# usuário escolhe no painel (mamografias de qualquer UF, subgrupos de exame);
+# o SARIMAX fica nos ajustes em lote (previsao.py, ETL/previsao_lote.py).
+# Séries anuais (período 1) não têm componente sazonal: os métodos viram
+# ingênuo, média móvel e Holt com tendência.
+
+HORIZONTE_MENSAL = 12
+HORIZONTE_ANUAL = 3
+
+# anos (ciclos sazonais) na média móvel sazonal
+CICLOS_MEDIA_MOVEL = 3
+
+# grade de suavizações testada pelo Holt-Winters (todas de uma vez, vetorizado);
+# fica a combinação com menor erro quadrático das previsões um passo à frente
+GRADE_ALFA = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+GRADE_BETA = np.array([0.0, 0.05, 0.1, 0.2, 0.4])
+GRADE_GAMA = np.array([0.0, 0.1, 0.3, 0.5])
+
+SERIE_MAMOGRAFIA_DF = "Mamografias no DF (mensal)"
+
+
+def _periodo_efetivo(y: np.ndarray, periodo: int, ciclos: int = 1) -> int:
+    # sem ciclos completos suficientes a série é tratada como não sazonal
+    return periodo if len(y) >= ciclos * periodo else 1
+
+
+def sazonal_ingenuo(y: np.ndarray, horizonte: int, periodo: int) -> np.ndarray:
+    # repete o último ciclo
+    m = _periodo_efetivo(y, periodo)
+    return np.resize(y[-m:], horizonte)
+
+
+def media_movel_sazonal(y: np.ndarray, horizonte: int, periodo: int) -> np.ndarray:
+    # média de cada posição do ciclo nos últimos CICLOS_MEDIA_MOVEL ciclos
+    m = _periodo_efetivo(y, periodo)
+    ciclos = max(1, min(CICLOS_MEDIA_MOVEL, len(y) // m))
+    ultimos = y[len(y) - ciclos * m:].reshape(ciclos, m)
+    return np.resize(ultimos.mean(axis=0), horizonte)
+
+
+def holt_winters(y: np.ndarray, horizonte: int, periodo: int) -> np.ndarray:
+    # Holt-Winters aditivo; cada linha dos vetores é uma combinação da grade
+    m = _periodo_efetivo(y, periodo, ciclos=2)
+    if len(y) < 3:
+        return np.full(horizonte, y[-1])
+
+    alfa, beta, gama = (
+        g.ravel()
+        for g in np.meshgrid(GRADE_ALFA, GRADE_BETA, GRADE_GAMA if m > 1 else [0.0], indexing="ij")
+    )
+
+    # início: nível e tendência dos dois primeiros ciclos, sazonalidade do primeiro
+    if m > 1:
+        nivel0 = y[:m].mean()
+        tendencia0 = (y[m:2 * m].mean() - nivel0) / m
+        estacoes0 = y[:m] - nivel0
+    else:
+        nivel0, tendencia0, estacoes0 = y[0], y[1] - y[0], np.zeros(1)
+
+    nivel = np.full(alfa.size, nivel0)
+    tendencia = np.full(alfa.size, tendencia0)
+    estacoes = np.tile(estacoes0, (alfa.size, 1))
+    sse = np.zeros(alfa.size)
+
+    for t in range(m if m > 1 else 1, len(y)):
+        s = estacoes[:, t % m]
+        sse += (y[t] - (nivel + tendencia + s)) ** 2
+        nivel_novo = alfa * (y[t] - s) + (1 - alfa) * (nivel + tendencia)
+        tendencia = beta * (nivel_novo - nivel) + (1 - beta) * tendencia
+        estacoes[:, t % m] = gama * (y[t] - nivel_novo) + (1 - gama) * s
+        nivel = nivel_novo
+
+    melhor = np.argmin(sse)
+    passos = np.arange(1, horizonte + 1)
+    return nivel[melhor] + passos * tendencia[melhor] + estacoes[melhor, (len(y) - 1 + passos) % m]
+
+
+# nome -> (rótulo no painel, função)
+PREVISORES = {
+    "holt_winters": ("Holt-Winters", holt_winters),
+    "media_movel_sazonal": ("Média móvel sazonal", media_movel_sazonal),
+    "sazonal_ingenuo": ("Sazonal ingênuo", sazonal_ingenuo),
+}
+
+
+def _rotulo_subgrupo(coluna: str) -> str:
+    # "0210 Diagnostico por radiologia intervencionista" -> nome canônico do tipo de exame
+    nome = re.sub(r"^\d+\s+", "", coluna)
+    return canonico("tipo_exame", nome) or nome
+
+
+def _subgrupos() -> dict:
+    # rótulo -> coluna do CSV de subgrupos
+    df = carregar_dataset("exames_subgrupos")
+    colunas = [c for c in df.columns if c not in ["Ano atendimento", "Total"]]
+    return {f"{_rotulo_subgrupo(c)} no DF (anual)": c for c in colunas}
+
+
+def opcoes_series() -> list:
+    return (
+        [SERIE_MAMOGRAFIA_DF]
+        + list(_subgrupos())
+        + [f"Mamografias em {uf} (anual)" for uf in UFS]
+    )
+
+
+def _anual(anos: pd.Series, valores: pd.Series) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "DATE": pd.to_datetime(pd.to_numeric(anos).astype(int).astype(str), format="%Y"),
+        "Exames": pd.to_numeric(valores, errors="coerce").astype(float),
+    })
+    return df.dropna().sort_values("DATE", ignore_index=True)
+
+
+def carregar_serie(rotulo: str):
+    # (DATE/Exames, período sazonal)
+    if rotulo == SERIE_MAMOGRAFIA_DF:
+        return serie_mamografia()[["DATE", "Exames"]], 12
+
+    subgrupos = _subgrupos()
+    if rotulo in subgrupos:
+        df = carregar_dataset("exames_subgrupos")
+        return _anual(df["Ano atendimento"], df[subgrupos[rotulo]]), 1
+
+    uf = re.fullmatch(r"Mamografias em (\w\w) \(anual\)", rotulo)
+    if uf is None:
+        raise KeyError(f"Série desconhecida: {rotulo}")
+    tabela = carregar_espera_nacional()
+    totais = tabela[tabela["UF"] == uf.group(1)].groupby("ano", as_index=False)["qtd"].sum()
+    return _anual(totais["ano"], totais["qtd"]), 1
+
+
+def prever_serie(rotulo: str, metodo: str, descartar_ultimo: bool = False) -> dict:
+    # mesmo formato de previsao.carregar_previsao_mamografia, para o gráfico de previsão
+    historico, periodo = carregar_serie(rotulo)
+    if descartar_ultimo and len(historico) > 1:
+        historico = historico.iloc[:-1]
+
+    nome_metodo, prever = PREVISORES[metodo]
+    if periodo == 12:
+        horizonte, frequencia = HORIZONTE_MENSAL, "MS"
+    else:
+        horizonte, frequencia = HORIZONTE_ANUAL, "YS"
+
+    valores = prever(historico["Exames"].to_numpy(dtype=float), horizonte, periodo)
+    datas = pd.date_range(historico["DATE"].iloc[-1], periods=horizonte + 1, freq=frequencia)[1:]
+
+    return {
+        "historico": historico,
+        # contagens não ficam negativas
+        "previsao": pd.DataFrame({"DATE": datas, "Exames": np.maximum(valores, 0)}),
+        "ajustado_em": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "atualizando": False,
+        "titulo": rotulo.rsplit(" (", 1)[0],
+        "modelo": nome_metodo,
+    }
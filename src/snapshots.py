@@ -0,0 +1,122 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from dados import (
+    CAMINHO_ESTADOS,
+    DATASETS,
+    MANIFESTO_SNAPSHOTS,
+    OPCOES_ESTADOS,
+    PASTA_SNAPSHOTS,
+    hash_arquivo,
+)
+from kpis import SNAPSHOT_KPIS, gerar_snapshot_kpis, hashes_fontes
+
+# Gera snapshots Parquet tipados de todos os CSVs de data_sets/ e o manifesto
+# usado por dados.carregar_csv, e depois o snapshot dos KPIs (kpis.py).
+# Precisa do pyarrow. Para executar:
+#   python src/snapshots.py
+# Quando o snapshot não existe ou o CSV muda, o painel volta a ler o CSV.
+
+VERSAO_MANIFESTO = 1
+
+# regras de tipagem além da inferência do read_csv
+NORMALIZACAO = {
+    "demanda_mamografia": {"datas": ["DATE"]},
+    "previsao_mamografia": {"datas": ["DATE"]},
+    # linhas "Ignorado" e "Total" saem junto com o ano não numérico
+    "estados": {"numericas": "todas", "obrigatorias": ["Ano Resultado"]},
+}
+
+
+def arquivos_fonte() -> list:
+    arquivos = []
+    for nome, config in DATASETS.items():
+        opcoes = {k: v for k, v in config.items() if k != "caminho"}
+        arquivos.append((nome, config["caminho"], opcoes))
+
+    padrao = CAMINHO_ESTADOS.format(uf="*")
+    for caminho in sorted(glob.glob(padrao)):
+        arquivos.append(("estados", caminho, dict(OPCOES_ESTADOS)))
+
+    return arquivos
+
+
+def normalizar_tipos(df: pd.DataFrame, regras: dict) -> pd.DataFrame:
+    numericas = regras.get("numericas", [])
+    if numericas == "todas":
+        numericas = list(df.columns)
+
+    convertidas = {}
+    for col in df.columns:
+        if col in numericas:
+            convertidas[col] = pd.to_numeric(df[col], errors="coerce")
+        elif col in regras.get("datas", []):
+            convertidas[col] = pd.to_datetime(df[col], errors="coerce")
+        elif not pd.api.types.is_numeric_dtype(df[col]):
+            # texto que é todo numérico vira número (como o to_numeric das funções)
+            numeros = pd.to_numeric(df[col], errors="coerce")
+            if numeros.notna().sum() == df[col].notna().sum() and numeros.notna().any():
+                convertidas[col] = numeros
+
+    df = df.assign(**convertidas)
+
+    if regras.get("obrigatorias"):
+        df = df.dropna(subset=regras["obrigatorias"]).reset_index(drop=True)
+
+    # colunas inteiras sem faltantes ficam como int64
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]) and df[col].notna().all() and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype("int64")
+
+    return df
+
+
+def caminho_snapshot(caminho_csv: str) -> str:
+    relativo = os.path.relpath(caminho_csv, "data_sets")
+    nome = os.path.splitext(relativo)[0].replace(os.sep, "__")
+    return os.path.join(PASTA_SNAPSHOTS, f"{nome}.parquet")
+
+
+def gerar_snapshots() -> dict:
+    os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+
+    arquivos = {}
+    for nome, caminho, opcoes in arquivos_fonte():
+        df = pd.read_csv(caminho, **opcoes)
+        df = normalizar_tipos(df, NORMALIZACAO.get(nome, {}))
+
+        destino = caminho_snapshot(caminho)
+        df.to_parquet(destino, index=False)
+
+        arquivos[caminho] = {
+            "dataset": nome,
+            "snapshot": destino,
+            "sha256": hash_arquivo(caminho),
+            "opcoes": opcoes,
+            "linhas": len(df),
+            "tipos": {col: str(tipo) for col, tipo in df.dtypes.items()},
+        }
+        print(f"  {caminho} -> {destino} ({len(df)} linhas)")
+
+    manifesto = {
+        "versao": VERSAO_MANIFESTO,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "arquivos": arquivos,
+    }
+    with open(MANIFESTO_SNAPSHOTS, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    return manifesto
+
+
+if __name__ == "__main__":
+    print("Gerando snapshots Parquet...")
+    manifesto = gerar_snapshots()
+    print(f"{len(manifesto['arquivos'])} arquivos em {PASTA_SNAPSHOTS}")
+
+    snapshot = gerar_snapshot_kpis(hashes_fontes())
+    print(f"{len(snapshot['kpis'])} KPIs em {SNAPSHOT_KPIS}")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# os módulos do painel são importados como no `streamlit run src/app.py`:
+# src/ no caminho de importação e caminhos de dados relativos à raiz
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+os.chdir(RAIZ)
@@ -0,0 +1,71 @@
+import copy
+import warnings
+
+import pandas as pd
+import pytest
+
+import funcoes
+from dados import carregar_dataset
+from previsao import carregar_previsao_mamografia
+
+# As funções de funcoes.py não podem alterar os DataFrames que recebem:
+# carregar_dataset devolve o DataFrame do cache compartilhado, então qualquer
+# alteração no lugar apareceria nas outras páginas e sessões. Cada função é
+# chamada com os datasets do painel e as entradas são comparadas com uma cópia
+# profunda feita antes da chamada (os elementos do Streamlit são descartados
+# fora do `streamlit run`). Para executar da raiz do repositório:
+#   python -m pytest -q
+
+# função -> datasets passados como argumentos, na ordem
+FUNCOES_DATASETS = {
+    "calcular_kpi_exame_mais_requisitado": ["exames_subgrupos"],
+    "calcular_kpi_ra_mais_vulneravel": ["equipamentos_ra", "populacao_plano_ra"],
+    "calcular_kpi_mes_com_mais_mamografias": ["demanda_mamografia"],
+    "calcular_kpi_links_sem_https": ["wave"],
+    "gerar_grafico_proporcao_funcionamento": ["equipamentos_tipo"],
+    "gerar_dataset_escassez_SUS": ["equipamentos_tipo"],
+    "paginas_com_mais_erros": ["wave"],
+    "distribuição_wave_bp": ["wave"],
+    "distribuicao_wave_aria_bp": ["wave"],
+    "grafico_tendencia_profissionais_radiologia": [
+        "profissionais_auxiliares",
+        "profissionais_dentistas",
+        "profissionais_medicos",
+    ],
+}
+
+
+def chamar_e_comparar(funcao, argumentos: list) -> None:
+    copias = copy.deepcopy(argumentos)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        funcao(*argumentos)
+
+    for original, copia in zip(argumentos, copias):
+        pd.testing.assert_frame_equal(original, copia)
+
+
+@pytest.mark.parametrize("nome", list(FUNCOES_DATASETS))
+def test_funcao_nao_altera_datasets(nome):
+    argumentos = [carregar_dataset(d) for d in FUNCOES_DATASETS[nome]]
+    chamar_e_comparar(getattr(funcoes, nome), argumentos)
+
+
+def test_grafico_previsao_nao_altera_dados():
+    dados = carregar_previsao_mamografia()
+    copia = copy.deepcopy(dados)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        funcoes.gerar_grafico_previsao_mamografias(dados)
+
+    for chave in ["historico", "previsao"]:
+        pd.testing.assert_frame_equal(dados[chave], copia[chave])
+
+
+def test_comparacao_detecta_alteracao():
+    # a verificação precisa falhar quando a função altera a entrada
+    def altera(df):
+        df["nova"] = 1
+
+    with pytest.raises(AssertionError):
+        chamar_e_comparar(altera, [pd.DataFrame({"a": [1, 2]})])